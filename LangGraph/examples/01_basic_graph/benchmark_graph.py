@@ -0,0 +1,255 @@
+"""
+Basic Graph Benchmark
+
+`graph.py` does almost no work of its own: two string concatenations and a
+coin flip per run. What it costs to run is LangGraph's own overhead, which
+makes it the baseline to re-check after every LangGraph upgrade. The nodes'
+printing is switched off (BASIC_GRAPH_PRINT=0) so it isn't measured.
+
+The graph is run in four modes:
+
+    invoke   graph.invoke, one run at a time
+    batch    graph.batch over --batch-size inputs per call
+    ainvoke  await graph.ainvoke, one run at a time on an event loop
+    stream   graph.stream, consuming every update
+
+For each mode it reports runs/sec, run latency (p50/p99) and the overhead
+per step: run time minus the time the node functions themselves take,
+divided by the two steps of a run. A tracemalloc pass reports the memory
+one run allocates at its peak and the bytes each run leaves behind (this
+should stay near 0). Then `invoke` runs in 1, 2, 4, ... processes at once
+to show how throughput scales across cores.
+
+`--save` writes the results as JSON. `--baseline` compares against such a
+file and exits with status 1 when a mode's step overhead grew by more than
+`--max-regression`. This turns the benchmark into a regression check for
+dependency bumps.
+
+Usage:
+    python benchmark_graph.py
+    python benchmark_graph.py --runs 20000 --processes 1 2 4 8
+    python benchmark_graph.py --save baseline.json
+    python benchmark_graph.py --baseline baseline.json --max-regression 0.25
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+from importlib import metadata
+from pathlib import Path
+
+# graph.py reads this once at import, so it is set before the import below; worker processes inherit it
+os.environ["BASIC_GRAPH_PRINT"] = "0"
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from graph import decide_mood, graph, node_1, node_2, node_3
+from llm_metrics import Histogram
+
+INPUT = {"graph_state": "Hi, this is Lance."}
+
+# node_1, then node_2 or node_3
+STEPS_PER_RUN = 2
+
+MODES = ("invoke", "batch", "ainvoke", "stream")
+
+
+def sync_call(mode: str, batch_size: int):
+    """One call of `mode` and the number of graph runs it makes"""
+    if mode == "invoke":
+        return (lambda: graph.invoke(INPUT)), 1
+    if mode == "batch":
+        inputs = [INPUT] * batch_size
+        return (lambda: graph.batch(inputs)), batch_size
+    if mode == "stream":
+        # The updates are produced either way; a zero-length deque just drops them
+        return (lambda: deque(graph.stream(INPUT), maxlen=0)), 1
+    if mode == "ainvoke":
+        # Only for the tracemalloc pass: includes the event loop's own per-call work
+        loop = asyncio.new_event_loop()
+        return (lambda: loop.run_until_complete(graph.ainvoke(INPUT))), 1
+    raise ValueError(f"unknown mode {mode!r}")
+
+
+def time_mode(mode: str, runs: int, batch_size: int, warmup: int) -> Histogram:
+    """Latency of each call in nanoseconds, exported as microseconds"""
+    histogram = Histogram(scale=1e-3)
+    if mode == "ainvoke":
+        async def timed():
+            for _ in range(warmup):
+                await graph.ainvoke(INPUT)
+            for _ in range(runs):
+                start = time.perf_counter_ns()
+                await graph.ainvoke(INPUT)
+                histogram.record(time.perf_counter_ns() - start)
+        asyncio.run(timed())
+        return histogram
+
+    call, per_call = sync_call(mode, batch_size)
+    for _ in range(max(1, warmup // per_call)):
+        call()
+    for _ in range(max(1, runs // per_call)):
+        start = time.perf_counter_ns()
+        call()
+        histogram.record(time.perf_counter_ns() - start)
+    return histogram
+
+
+def node_work_ns(runs: int) -> float:
+    """Mean time of a run's node and routing functions called directly, without the graph"""
+    state = dict(INPUT)
+    start = time.perf_counter_ns()
+    for _ in range(runs):
+        after_1 = {**state, **node_1(state)}
+        (node_2 if decide_mood(after_1) == "node_2" else node_3)(after_1)
+    return (time.perf_counter_ns() - start) / runs
+
+
+def allocations(mode: str, runs: int, batch_size: int):
+    """(peak bytes one call allocates, bytes retained per graph run after `runs` runs)"""
+    call, per_call = sync_call(mode, batch_size)
+    call()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+        calls = max(1, runs // per_call)
+        for _ in range(calls - 1):
+            call()
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - base, (after - base) / (calls * per_call)
+
+
+def _worker(runs: int, warmup: int, seed: int, barrier, results) -> None:
+    random.seed(seed)
+    for _ in range(warmup):
+        graph.invoke(INPUT)
+    # Start together, so the processes really compete for cores
+    barrier.wait()
+    start = time.perf_counter()
+    for _ in range(runs):
+        graph.invoke(INPUT)
+    results.put(time.perf_counter() - start)
+
+
+def scale_processes(processes: int, runs: int, warmup: int, seed: int) -> float:
+    """Combined invoke runs/sec of `processes` processes running `runs` each"""
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(processes)
+    results = context.Queue()
+    workers = [context.Process(target=_worker, args=(runs, warmup, seed + i, barrier, results))
+               for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    elapsed = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return processes * runs / max(elapsed)
+
+
+def check_regressions(results: dict, baseline: dict, max_regression: float) -> list:
+    """Modes whose step overhead grew by more than `max_regression` over the baseline"""
+    regressions = []
+    for mode, current in results["modes"].items():
+        previous = baseline.get("modes", {}).get(mode)
+        if not previous or previous["step_overhead_us"] <= 0:
+            continue
+        growth = current["step_overhead_us"] / previous["step_overhead_us"] - 1
+        if growth > max_regression:
+            regressions.append(f"{mode}: {previous['step_overhead_us']:.1f} -> "
+                               f"{current['step_overhead_us']:.1f} us/step (+{growth:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5_000, help="graph runs per mode")
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--alloc-runs", type=int, default=500, help="runs in the tracemalloc pass")
+    parser.add_argument("--processes", type=int, nargs="*", default=[1, 2, 4],
+                        help="process counts to scale invoke across (none to skip)")
+    parser.add_argument("--process-runs", type=int, default=2_000, help="invoke runs per process")
+    parser.add_argument("--seed", type=int, default=0, help="seeds decide_mood's coin flip")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from --save to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="allowed growth of step overhead over the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    try:
+        langgraph_version = metadata.version("langgraph")
+    except metadata.PackageNotFoundError:
+        langgraph_version = "unknown"
+    print(f"langgraph {langgraph_version}, Python {platform.python_version()}, "
+          f"{args.runs} runs per mode, batch size {args.batch_size}\n")
+
+    work_us = node_work_ns(args.runs) / 1000
+    results = {"langgraph": langgraph_version, "python": platform.python_version(),
+               "node_work_us": work_us, "modes": {}, "processes": {}}
+
+    print(f"{'mode':<9}{'runs/s':>10}{'p50 us':>10}{'p99 us':>10}{'us/step':>10}{'peak KiB':>10}{'kept B/run':>12}")
+    for mode in args.modes:
+        histogram = time_mode(mode, args.runs, args.batch_size, args.warmup)
+        per_call = args.batch_size if mode == "batch" else 1
+        run_us = histogram.mean / per_call
+        step_us = (run_us - work_us) / STEPS_PER_RUN
+        peak, retained = allocations(mode, args.alloc_runs, args.batch_size)
+        results["modes"][mode] = {
+            "runs_per_sec": 1e6 / run_us,
+            "run_us_mean": run_us,
+            "call_us_p50": histogram.percentile(50),
+            "call_us_p99": histogram.percentile(99),
+            "step_overhead_us": step_us,
+            "peak_bytes": peak,
+            "retained_bytes_per_run": retained,
+        }
+        print(f"{mode:<9}{1e6 / run_us:>10.0f}{histogram.percentile(50):>10.1f}{histogram.percentile(99):>10.1f}"
+              f"{step_us:>10.1f}{peak / 1024:>10.1f}{retained:>12.1f}")
+    print(f"\nNode functions alone: {work_us:.2f} us per run. Batch latencies are per call of "
+          f"{args.batch_size} runs; peak KiB is per call.")
+
+    if args.processes:
+        print(f"\n{'processes':<11}{'runs/s':>10}{'speed-up':>10}{'efficiency':>12}")
+        single = None
+        for processes in args.processes:
+            throughput = scale_processes(processes, args.process_runs, args.warmup, args.seed)
+            single = single or throughput / processes
+            speedup = throughput / single
+            results["processes"][str(processes)] = throughput
+            print(f"{processes:<11}{throughput:>10.0f}{speedup:>10.2f}{speedup / processes:>12.0%}")
+        print(f"\n{os.cpu_count()} CPUs; speed-up is against one process, as measured on the first row.")
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+        print(f"\nSaved results to {args.save}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = check_regressions(results, baseline, args.max_regression)
+        print(f"\nAgainst {args.baseline} (langgraph {baseline.get('langgraph', 'unknown')}):")
+        if regressions:
+            for line in regressions:
+                print(f"  REGRESSION {line}")
+            sys.exit(1)
+        print(f"  no mode's step overhead grew by more than {args.max_regression:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,31 +6,47 @@ This example demonstrates how to build a simple state machine with nodes
 and edges, including conditional branching.
 
 Installations:
-    pip install langgraph typing-extensions ipython
+    pip install langgraph typing-extensions
 
 No environment variables required for this example.
+GRAPH_VIEW=mermaid|ascii|png|mermaid.ink draws the graph first (off by default).
+BASIC_GRAPH_PRINT=0 silences the nodes, as benchmark_graph.py does.
+
+Importing the module only compiles `graph`; running it as a script also invokes it once.
 """
 
 from typing_extensions import TypedDict
+import os
 import random
+import sys
+from pathlib import Path
 from typing import Literal
 
-from IPython.display import Image, display
 from langgraph.graph import StateGraph, START, END
 
+# Shared helpers (graph_runtime) live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from graph_runtime import show_graph
+
+# Whether the nodes print their names; read once at import, so a benchmark sets it before importing
+PRINT_NODES = os.environ.get("BASIC_GRAPH_PRINT", "1") != "0"
+
 class State(TypedDict):
     graph_state: str
 
 def node_1(state):
-    print("---Node 1---")
+    if PRINT_NODES:
+        print("---Node 1---")
     return {"graph_state": state['graph_state'] +" I am"}
 
 def node_2(state):
-    print("---Node 2---")
+    if PRINT_NODES:
+        print("---Node 2---")
     return {"graph_state": state['graph_state'] +" happy!"}
 
 def node_3(state):
-    print("---Node 3---")
+    if PRINT_NODES:
+        print("---Node 3---")
     return {"graph_state": state['graph_state'] +" sad!"}
 
 def decide_mood(state) -> Literal["node_2", "node_3"]:
@@ -62,8 +78,13 @@ builder.add_edge("node_3", END)
 # Add
 graph = builder.compile()
 
-# View
-display(Image(graph.get_graph().draw_mermaid_png()))
+def main():
+    # View (opt-in: GRAPH_VIEW=mermaid prints it without a network round trip)
+    show_graph(graph)
+
+    result = graph.invoke({"graph_state": "Hi, this is Lance."})
+    print(result)
+
 
-result = graph.invoke({"graph_state": "Hi, this is Lance."})
-print(result)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
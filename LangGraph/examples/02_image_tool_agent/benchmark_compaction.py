@@ -0,0 +1,157 @@
+"""
+History Compaction Benchmark
+
+Replays a scripted 50-turn session of the image agent's ReAct loop through
+`add_messages`, the way the graph does, and counts the input tokens of each
+assistant call with the local tokenizer: without compaction, with truncation
+and with summaries from a scripted model.
+
+Every fourth turn reads a new document (a tool call and a long OCR result),
+the rest are short questions and answers.
+
+A second scenario asks one question that the assistant answers by reading
+--documents documents in a row, one `extract_text` call per round, so all
+the OCR results pile up under a single human message.
+
+Usage:
+    python benchmark_compaction.py
+    python benchmark_compaction.py --turns 50 --max-tokens 12000 --target-tokens 6000
+    python benchmark_compaction.py --documents 12
+"""
+
+import argparse
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.graph.message import add_messages
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from compaction import CompactionPolicy, Compactor, TokenCounter
+from llm_metrics import MetricsRegistry
+from llm_metrics.callback import estimate_cost
+
+MODEL = "claude-haiku-4-5-20251001"
+
+# The assistant's system prompt and tool schemas, sent every call
+PROMPT_TOKENS = 450
+
+SUMMARY = ("Training plan: push-ups, 400 m sprints and planks in 12 rounds, 90 s rest between sets, "
+           "protein shake after each session.")
+
+
+def document(number: int) -> str:
+    """About 2,500 tokens of OCR output"""
+    return "\n".join(f"Note {number}, line {i}: 2 sets of 12 push-ups, 400 m sprint, 90 s rest, shake at 06:{i % 60:02d}"
+                     for i in range(110))
+
+
+def run_session(turns: int, compactor, counter: TokenCounter):
+    """Input tokens of each turn's assistant calls, and the seconds spent compacting"""
+    messages = []
+    per_turn = []
+    compact_seconds = 0.0
+
+    def call():
+        nonlocal messages, compact_seconds
+        if compactor is not None:
+            start = time.perf_counter()
+            messages = add_messages(messages, compactor.compact(messages))
+            compact_seconds += time.perf_counter() - start
+        return PROMPT_TOKENS + counter.messages(messages)
+
+    for turn in range(turns):
+        tokens = 0
+        if turn % 4 == 0:
+            path = f"note_{turn // 4}.png"
+            messages = add_messages(messages, [HumanMessage(content=f"Read {path} for me, Alfred.")])
+            tokens += call()
+            call_id = f"toolu_{turn}"
+            messages = add_messages(messages, [
+                AIMessage(content="", tool_calls=[{"name": "extract_text", "args": {"img_path": path}, "id": call_id}]),
+                ToolMessage(content=document(turn // 4), name="extract_text", tool_call_id=call_id),
+            ])
+        else:
+            messages = add_messages(messages, [HumanMessage(content=f"Question {turn}: how long is the rest between sets?")])
+        tokens += call()
+        messages = add_messages(messages, [AIMessage(content="The rest between sets is 90 seconds, Master Wayne. " * 3)])
+        per_turn.append(tokens)
+    return per_turn, compact_seconds
+
+
+def run_single_question(documents: int, compactor, counter: TokenCounter):
+    """Input tokens of each assistant call while one question reads `documents` documents, and compacting seconds"""
+    messages = add_messages([], [HumanMessage(content=f"Read note_0.png to note_{documents - 1}.png and tell me "
+                                                      "which training plan has the longest rest, Alfred.")])
+    per_call = []
+    compact_seconds = 0.0
+    for number in range(documents + 1):
+        if compactor is not None:
+            start = time.perf_counter()
+            messages = add_messages(messages, compactor.compact(messages))
+            compact_seconds += time.perf_counter() - start
+        per_call.append(PROMPT_TOKENS + counter.messages(messages))
+        if number == documents:
+            break
+        call_id = f"toolu_{number}"
+        messages = add_messages(messages, [
+            AIMessage(content="", tool_calls=[{"name": "extract_text", "args": {"img_path": f"note_{number}.png"},
+                                               "id": call_id}]),
+            ToolMessage(content=document(number), name="extract_text", tool_call_id=call_id),
+        ])
+    return per_call, compact_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--max-tokens", type=int, default=12_000)
+    parser.add_argument("--target-tokens", type=int, default=6_000)
+    parser.add_argument("--keep-turns", type=int, default=2)
+    parser.add_argument("--tool-tokens", type=int, default=200)
+    parser.add_argument("--documents", type=int, default=8, help="documents read for the single question")
+    args = parser.parse_args()
+
+    counter = TokenCounter()
+    policy = CompactionPolicy(max_tokens=args.max_tokens, target_tokens=args.target_tokens,
+                              keep_turns=args.keep_turns, max_tool_tokens=args.tool_tokens)
+    registries = {"truncate": MetricsRegistry(), "summarize": MetricsRegistry()}
+    def setups():
+        return {
+            "off": None,
+            "truncate": Compactor(policy, counter, registry=registries["truncate"]),
+            "summarize": Compactor(replace(policy, mode="summarize"), counter,
+                                   summarizer=FakeListChatModel(responses=[SUMMARY]), registry=registries["summarize"]),
+        }
+
+    results = {name: run_session(args.turns, compactor, counter) for name, compactor in setups().items()}
+
+    print(f"Input tokens per turn, {args.turns} turns, compact over {args.max_tokens} down to {args.target_tokens}\n")
+    print(f"{'turn':>4}" + "".join(f"{name:>11}" for name in results))
+    for turn in range(args.turns):
+        if turn % 5 == 4 or turn == 0:
+            print(f"{turn + 1:>4}" + "".join(f"{per_turn[turn]:>11}" for per_turn, _ in results.values()))
+
+    print(f"\n{'setup':<10}{'total':>10}{'max turn':>10}{'compactions':>13}{'cost USD':>10}{'compact ms':>12}")
+    for name, (per_turn, seconds) in results.items():
+        registry = registries.get(name)
+        compactions = int(registry.counters.get(("history_compactions_total", ()), 0)) if registry else 0
+        cost = estimate_cost(MODEL, sum(per_turn), 0)
+        print(f"{name:<10}{sum(per_turn):>10}{max(per_turn):>10}{compactions:>13}{cost:>10.4f}{seconds * 1000:>12.1f}")
+
+    registries = {"truncate": MetricsRegistry(), "summarize": MetricsRegistry()}
+    results = {name: run_single_question(args.documents, compactor, counter) for name, compactor in setups().items()}
+    print(f"\nOne question reading {args.documents} documents, {args.documents + 1} assistant calls\n")
+    print(f"{'setup':<10}{'total':>10}{'last call':>11}{'compactions':>13}{'cost USD':>10}{'compact ms':>12}")
+    for name, (per_call, seconds) in results.items():
+        registry = registries.get(name)
+        compactions = int(registry.counters.get(("history_compactions_total", ()), 0)) if registry else 0
+        cost = estimate_cost(MODEL, sum(per_call), 0)
+        print(f"{name:<10}{sum(per_call):>10}{per_call[-1]:>11}{compactions:>13}{cost:>10.4f}{seconds * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
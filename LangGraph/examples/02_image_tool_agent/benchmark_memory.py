@@ -0,0 +1,111 @@
+"""
+Request Memory Benchmark
+
+Measures the peak Python heap (tracemalloc) while one page image is sent to
+the vision model, for each way of sending it. Real ChatAnthropic clients
+talk to the local Messages API stub (`vision_stub.py`).
+
+    data URL   the old extract_text: read the file, base64 it, build a data URL
+    inline     native base64 block encoded from the memory-mapped file
+    files 1st  OCR_UPLOAD_MODE=files, first call: streamed upload, then the id
+    files 2nd  the same image again: only the id is sent
+
+The default image is a 1500x1000 noise PNG (~4.5 MB), close to the largest
+image the API accepts inline; noise keeps it from compressing.
+
+Usage:
+    python benchmark_memory.py
+    python benchmark_memory.py --file scan_page.png --repeat 5
+"""
+
+import argparse
+import base64
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import HumanMessage
+from PIL import Image
+
+from documents import Page, detect_mime
+from ocr import OCR_PROMPT, ocr_page
+from vision_files import VisionFileStore
+from vision_stub import start_stub, stub_stats
+
+
+def make_image(directory):
+    path = os.path.join(directory, "noise.png")
+    Image.frombytes("RGB", (1500, 1000), os.urandom(1500 * 1000 * 3)).save(path)
+    return path
+
+
+def send_data_url(model, path):
+    """The original extract_text"""
+    with open(path, "rb") as f:
+        image_data = f.read()
+    image_base64 = base64.b64encode(image_data).decode("ascii")
+    message = HumanMessage(content=[
+        {"type": "text", "text": OCR_PROMPT},
+        {"type": "image_url", "image_url": {"url": f"data:{detect_mime(path)};base64,{image_base64}"}},
+    ])
+    return model.invoke([message]).content
+
+
+def _tiny_png():
+    buffer = io.BytesIO()
+    Image.new("L", (1, 1)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def measure(call):
+    tracemalloc.start()
+    start = time.perf_counter()
+    call()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", help="image to send (default: a generated noise PNG)")
+    parser.add_argument("--repeat", type=int, default=3, help="calls per setup; the median is reported")
+    args = parser.parse_args()
+
+    path = args.file or make_image(tempfile.mkdtemp(prefix="ocr-memory-"))
+    base_url = start_stub(latency=0.0, bandwidth=1e12, token_latency=0.0)
+    model = ChatAnthropic(anthropic_api_key="benchmark", base_url=base_url,
+                          model="claude-haiku-4-5-20251001", max_tokens=1024, max_retries=0)
+    with Image.open(path) as image:
+        page = Page(1, detect_mime(path), None, image.width, image.height, path=path)
+    size = page.size
+    # Warm up imports and the connection pool so they don't count towards the first setup
+    ocr_page(model, Page(1, "image/png", _tiny_png(), 1, 1))
+
+    print(f"{os.path.basename(path)}: {size / 1e6:.2f} MB, {args.repeat} calls per setup\n")
+    print(f"{'setup':<12}{'peak heap MB':>14}{'x file size':>13}{'MB sent':>10}{'seconds':>9}")
+
+    files = VisionFileStore.for_model(model)
+    setups = [
+        ("data URL", lambda: send_data_url(model, path)),
+        ("inline", lambda: ocr_page(model, page)),
+        ("files 1st", lambda: ocr_page(model, page, VisionFileStore.for_model(model))),
+        ("files 2nd", lambda: ocr_page(model, page, files)),
+    ]
+    ocr_page(model, page, files)  # "files 2nd" measures calls after the upload
+    for name, call in setups:
+        runs = []
+        for _ in range(args.repeat):
+            stub_stats(base_url, reset=True)
+            peak, seconds = measure(call)
+            runs.append((peak, seconds, stub_stats(base_url)["bytes_received"]))
+        peak, seconds, sent = sorted(runs)[len(runs) // 2]
+        print(f"{name:<12}{peak / 1e6:>14.1f}{peak / size:>13.2f}{sent / 1e6:>10.2f}{seconds:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
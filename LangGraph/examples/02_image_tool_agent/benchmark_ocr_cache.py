@@ -0,0 +1,99 @@
+"""
+OCR Cache Benchmark
+
+Replays the `extract_text` calls of a few agent conversations against the
+local Messages API stub (`vision_stub.py`), with the OCR cache off, in
+exact mode and in perceptual mode, and reports vision requests, cache
+lookups and wall time.
+
+The conversations ask about the same documents repeatedly, and two of the
+files are near-duplicates of a note photo: the same note saved smaller at
+JPEG quality 70, and photographed again slightly brighter and 1.5 degrees
+more tilted. A fourth note with different text checks that perceptual
+matching does not mistake one note for another.
+
+Usage:
+    python benchmark_ocr_cache.py
+    python benchmark_ocr_cache.py --distance 4 --latency 0.5
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from langchain_anthropic import ChatAnthropic
+from PIL import Image, ImageEnhance
+
+from benchmark_preprocessing import _page_image, make_samples
+from llm_cache import ResponseCache
+from llm_metrics import MetricsRegistry, to_prometheus
+from ocr import OCR_PROMPT, iter_page_text
+from ocr_cache import DEFAULT_MAX_DISTANCE, OCRCache
+from vision_stub import start_stub, stub_stats
+
+DESK = (112, 94, 76)
+
+
+def make_documents(directory):
+    note, meal_plan, scan = make_samples(directory)
+    with Image.open(note) as photo:
+        resized = os.path.join(directory, "note_resized.jpg")
+        photo.resize((photo.width * 9 // 10, photo.height * 9 // 10), Image.LANCZOS).save(resized, quality=70)
+        rescan = os.path.join(directory, "note_rescan.jpg")
+        ImageEnhance.Brightness(photo).enhance(1.1).rotate(1.5, fillcolor=DESK).save(rescan, quality=85)
+
+    other = Image.new("RGB", (3000, 4000), DESK)
+    other.paste(_page_image((2300, 3000), 52, 20), (350, 500))
+    other_note = os.path.join(directory, "other_note.jpg")
+    other.rotate(-4.0, fillcolor=DESK).save(other_note, quality=92)
+    return {"note": note, "meal_plan": meal_plan, "scan": scan, "resized": resized,
+            "rescan": rescan, "other_note": other_note}
+
+
+# extract_text calls, one list per conversation
+CONVERSATIONS = [
+    ["note", "note", "meal_plan", "note"],
+    ["scan", "scan", "meal_plan"],
+    ["resized", "note", "other_note"],
+    ["rescan", "scan", "other_note", "meal_plan"],
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub base latency per request, in seconds")
+    parser.add_argument("--distance", type=int, default=DEFAULT_MAX_DISTANCE, help="perceptual match distance, in bits")
+    args = parser.parse_args()
+
+    documents = make_documents(tempfile.mkdtemp(prefix="ocr-cache-"))
+    base_url = start_stub(latency=args.latency)
+    model = ChatAnthropic(anthropic_api_key="benchmark", base_url=base_url,
+                          model="claude-haiku-4-5-20251001", max_tokens=1024, max_retries=0)
+    calls = sum(len(conversation) for conversation in CONVERSATIONS)
+
+    print(f"{len(CONVERSATIONS)} conversations, {calls} extract_text calls, stub latency {args.latency * 1000:.0f} ms\n")
+    print(f"{'cache':<12}{'requests':>9}{'exact':>7}{'perceptual':>12}{'miss':>6}{'hit rate':>10}{'seconds':>9}")
+    registry = MetricsRegistry()
+    for setup, distance in (("off", None), ("exact", None), ("perceptual", args.distance)):
+        cache = None if setup == "off" else OCRCache(ResponseCache(), max_distance=distance,
+                                                     registry=registry if setup == "perceptual" else None,
+                                                     prompt=OCR_PROMPT)
+        stub_stats(base_url, reset=True)
+        start = time.perf_counter()
+        for conversation in CONVERSATIONS:
+            for name in conversation:
+                list(iter_page_text(model, documents[name], cache=cache))
+        seconds = time.perf_counter() - start
+        requests = stub_stats(base_url)["requests"]
+        lookups = cache.lookups if cache else {"exact": 0, "perceptual": 0, "miss": 0}
+        hit_rate = f"{cache.hit_rate:.0%}" if cache else "-"
+        print(f"{setup:<12}{requests:>9}{lookups['exact']:>7}{lookups['perceptual']:>12}{lookups['miss']:>6}"
+              f"{hit_rate:>10}{seconds:>9.2f}")
+
+    print("\nPerceptual run, as exported with LLM_METRICS=prometheus:\n")
+    print(to_prometheus(registry))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Prompt Caching Benchmark
+
+Replays a scripted conversation with the assistant against the local
+Messages API stub (`vision_stub.py`), once with the old system prompt and
+once with the cached prefix from `prompt_caching.py`, and reports each
+turn's input tokens (uncached, written to and read from the prompt cache),
+estimated cost and wall time.
+
+    rebuilt        the old prompt: tool descriptions and image path in one system
+                   message, rebuilt every turn, no cache breakpoints
+    cached prefix  static system prompt and last message marked as breakpoints,
+                   image path after the static part
+
+Every third turn adds an extract_text result of a long document to the
+history, and the loaded image changes halfway through.
+
+Usage:
+    python benchmark_prompt_cache.py --turns 12 --prefill-latency 0.0002
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from llm_metrics.callback import estimate_cost
+from prompt_caching import cache_usage, cached_system_message, with_cache_breakpoint
+from vision_stub import start_stub, stub_stats
+
+MODEL = "claude-haiku-4-5-20251001"
+
+OLD_TOOL_DESCRIPTION = """
+extract_text(img_path: str) -> str:
+    Extract text from an image file or a multi-page PDF using a multimodal model.
+
+    Args:
+        img_path: A local image or PDF file path (strings).
+
+    Returns:
+        A single string with the text of every page, each under a "--- Page N ---" header.
+divide(a: int, b: int) -> float:
+    Divide a and b
+"""
+
+SYSTEM_PROMPT = (
+    "You are a helpful butler named Alfred that serves Mr. Wayne and Batman. "
+    "You can analyse documents and run computations with the provided tools. "
+    "When several tool calls don't depend on each other's results, make them all in the same turn."
+)
+
+# About 2,500 tokens of OCR output per document
+DOCUMENT = "\n".join(f"Line {i}: 2 sets of 12 push-ups, 400 m sprint, 90 s rest, protein shake at 06:{i % 60:02d}"
+                     for i in range(120))
+
+
+def extract_text(img_path: str) -> str:
+    """
+    Extract text from an image file or a multi-page PDF using a multimodal model.
+
+    Args:
+        img_path: A local image or PDF file path.
+
+    Returns:
+        A single string with the text of every page, each under a "--- Page N ---" header.
+    """
+    return DOCUMENT
+
+
+def divide(a: int, b: int) -> float:
+    """Divide a and b - for Master Wayne's occasional calculations."""
+    return a / b
+
+
+def rebuilt_prompt(image, messages):
+    sys_msg = SystemMessage(content=f"You are a helpful butler named Alfred that serves Mr. Wayne and Batman. You can analyse documents and run computations with provided tools:\n{OLD_TOOL_DESCRIPTION} \n You have access to some optional images. Currently the loaded image is: {image}")
+    return [sys_msg] + messages
+
+
+def cached_prompt(image, messages):
+    sys_msg = cached_system_message(SYSTEM_PROMPT, f"You have access to some optional images. Currently the loaded image is: {image}")
+    return with_cache_breakpoint([sys_msg] + messages)
+
+
+def run_session(model, build_prompt, turns: int):
+    """Per-turn (cache usage, seconds) of one scripted conversation"""
+    messages = []
+    results = []
+    for turn in range(turns):
+        image = "training_plan.png" if turn < turns // 2 else "meal_plan.png"
+        if turn % 3 == 0:
+            call_id = f"toolu_{turn}"
+            messages += [
+                HumanMessage(content=f"Read {image} for me, Alfred."),
+                AIMessage(content="", tool_calls=[{"name": "extract_text", "args": {"img_path": image}, "id": call_id}]),
+                ToolMessage(content=extract_text(image), tool_call_id=call_id),
+            ]
+        else:
+            messages.append(HumanMessage(content=f"Question {turn}: how long is the rest between sets?"))
+        start = time.perf_counter()
+        response = model.invoke(build_prompt(image, messages))
+        seconds = time.perf_counter() - start
+        messages.append(response)
+        results.append((cache_usage(response), seconds))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.3, help="stub base latency per request")
+    parser.add_argument("--prefill-latency", type=float, default=0.0002, help="stub seconds per uncached input token")
+    args = parser.parse_args()
+
+    base_url = start_stub(latency=args.latency, prefill_latency=args.prefill_latency)
+    llm = ChatAnthropic(anthropic_api_key="benchmark", base_url=base_url, model=MODEL, max_tokens=1024, max_retries=0)
+    model = llm.bind_tools([divide, extract_text], parallel_tool_calls=True)
+
+    totals = {}
+    for name, build_prompt in (("rebuilt", rebuilt_prompt), ("cached prefix", cached_prompt)):
+        stub_stats(base_url, reset=True)
+        print(f"\n{name}")
+        print(f"{'turn':>4}{'uncached':>10}{'cache write':>13}{'cache read':>12}{'cost USD':>11}{'seconds':>9}")
+        cost_total = seconds_total = 0.0
+        for turn, (usage, seconds) in enumerate(run_session(model, build_prompt, args.turns), 1):
+            input_tokens = usage["uncached"] + usage["cache_write"] + usage["cache_read"]
+            cost = estimate_cost(MODEL, input_tokens, 10, cache_read_tokens=usage["cache_read"],
+                                 cache_write_tokens=usage["cache_write"])
+            cost_total += cost
+            seconds_total += seconds
+            print(f"{turn:>4}{usage['uncached']:>10}{usage['cache_write']:>13}{usage['cache_read']:>12}"
+                  f"{cost:>11.5f}{seconds:>9.2f}")
+        totals[name] = (stub_stats(base_url), cost_total, seconds_total)
+
+    print(f"\n{'setup':<15}{'input tokens':>13}{'cache read':>12}{'cost USD':>11}{'seconds':>9}")
+    for name, (stats, cost, seconds) in totals.items():
+        print(f"{name:<15}{stats['input_tokens']:>13}{stats['cache_read_tokens']:>12}{cost:>11.5f}{seconds:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
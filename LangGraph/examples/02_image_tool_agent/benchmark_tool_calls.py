@@ -0,0 +1,156 @@
+"""
+Parallel Tool Call Benchmark
+
+Runs "OCR these three receipts and divide each total by 4" through the
+same ReAct graph shape as image_tool_agent.py, and counts model turns and
+wall time. A scripted chat model stands in for the assistant (a fixed delay
+per turn). extract_text OCRs real generated receipts through ChatAnthropic
+clients talking to the local Messages API stub (`vision_stub.py`).
+
+    sequential     parallel_tool_calls=False: one tool call per model turn (the old agent)
+    parallel       all independent calls in one turn, ToolNode threads (graph.invoke)
+    parallel async the same under graph.ainvoke, extract_text as a coroutine
+    timeout        parallel, with an extract_text timeout shorter than one OCR call
+
+Usage:
+    python benchmark_tool_calls.py --model-latency 1.0 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, List, Sequence
+
+from langchain_anthropic import ChatAnthropic
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from langchain_core.tools import StructuredTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langgraph.graph import START, MessagesState, StateGraph
+from langgraph.prebuilt import tools_condition
+
+from benchmark_preprocessing import _page_image
+from ocr import aiter_page_text, iter_page_text
+from tool_scheduler import ToolLimits, ToolScheduler
+from vision_stub import start_stub, stub_stats
+
+
+class ScriptedAssistant(BaseChatModel):
+    """Asks for every receipt's text, then every division, then answers; one call per turn unless parallel"""
+
+    receipts: List[str]
+    latency: float = 1.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-assistant"
+
+    def bind_tools(self, tools: Sequence[Any], parallel_tool_calls: bool = True, **kwargs: Any) -> Runnable:
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], parallel_tool_calls=parallel_tool_calls)
+
+    def _reply(self, messages: List[BaseMessage], parallel_tool_calls: bool) -> AIMessage:
+        done = {m.tool_call_id for m in messages if isinstance(m, ToolMessage)}
+        wanted = [{"name": "extract_text", "args": {"img_path": path}, "id": f"ocr_{i}"}
+                  for i, path in enumerate(self.receipts)]
+        # Divisions need the OCR'd totals, so they only come once every receipt is read
+        if all(call["id"] in done for call in wanted):
+            wanted = [{"name": "divide", "args": {"a": 100 + 10 * i, "b": 4}, "id": f"div_{i}"}
+                      for i in range(len(self.receipts))]
+        calls = [call for call in wanted if call["id"] not in done]
+        if not calls:
+            return AIMessage(content="Each total divided by 4: 25.0, 27.5 and 30.0.")
+        return AIMessage(content="", tool_calls=calls if parallel_tool_calls else calls[:1])
+
+    def _generate(self, messages, stop=None, run_manager=None, parallel_tool_calls: bool = True, **kwargs):
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, parallel_tool_calls))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, parallel_tool_calls: bool = True, **kwargs):
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, parallel_tool_calls))])
+
+
+def make_receipts(directory: str) -> List[str]:
+    paths = []
+    for i, lines in enumerate((8, 11, 14)):
+        path = os.path.join(directory, f"receipt_{i + 1}.png")
+        _page_image((1200, 1600), 36, lines).save(path)
+        paths.append(path)
+    return paths
+
+
+def build_graph(assistant_model, vision_llm, scheduler: ToolScheduler, parallel: bool):
+    def extract_text(img_path: str) -> str:
+        """Extract text from an image file or a multi-page PDF using a multimodal model."""
+        return "\n".join(text for _, text in sorted(iter_page_text(vision_llm, img_path)))
+
+    async def aextract_text(img_path: str) -> str:
+        return "\n".join(text for _, text in sorted([page async for page in aiter_page_text(vision_llm, img_path)]))
+
+    def divide(a: int, b: int) -> float:
+        """Divide a and b"""
+        return a / b
+
+    tools = [divide, StructuredTool.from_function(func=extract_text, coroutine=aextract_text)]
+    model = assistant_model.bind_tools(tools, parallel_tool_calls=parallel)
+
+    def assistant(state: MessagesState):
+        return {"messages": [model.invoke(state["messages"])]}
+
+    async def aassistant(state: MessagesState):
+        return {"messages": [await model.ainvoke(state["messages"])]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("assistant", RunnableLambda(assistant, afunc=aassistant))
+    builder.add_node("tools", scheduler.tool_node(tools))
+    builder.add_edge(START, "assistant")
+    builder.add_conditional_edges("assistant", tools_condition)
+    builder.add_edge("tools", "assistant")
+    return builder.compile()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-latency", type=float, default=1.0, help="assistant model seconds per turn")
+    parser.add_argument("--latency", type=float, default=0.5, help="vision stub base latency per request")
+    args = parser.parse_args()
+
+    receipts = make_receipts(tempfile.mkdtemp(prefix="receipts-"))
+    base_url = start_stub(latency=args.latency)
+    vision_llm = ChatAnthropic(anthropic_api_key="benchmark", base_url=base_url,
+                               model="claude-haiku-4-5-20251001", max_tokens=1024, max_retries=0)
+    assistant = ScriptedAssistant(receipts=receipts, latency=args.model_latency)
+    question = {"messages": [HumanMessage(content="OCR these three receipts and divide each total by 4")]}
+    limits = {"extract_text": ToolLimits(max_concurrency=2, timeout=300), "divide": ToolLimits(max_concurrency=8, timeout=5)}
+
+    print(f"3 receipts, assistant {args.model_latency:.1f} s per turn, vision stub {args.latency * 1000:.0f} ms\n")
+    print(f"{'setup':<16}{'model turns':>12}{'tool calls':>11}{'vision requests':>16}{'timeouts':>9}{'seconds':>9}")
+    setups = [
+        ("sequential", False, False, limits),
+        ("parallel", True, False, limits),
+        ("parallel async", True, True, limits),
+        ("timeout", True, False, dict(limits, extract_text=ToolLimits(max_concurrency=2, timeout=args.latency / 2))),
+    ]
+    for name, parallel, use_async, setup_limits in setups:
+        scheduler = ToolScheduler(setup_limits)
+        graph = build_graph(assistant, vision_llm, scheduler, parallel)
+        stub_stats(base_url, reset=True)
+        start = time.perf_counter()
+        if use_async:
+            result = asyncio.run(graph.ainvoke(question))
+        else:
+            result = graph.invoke(question)
+        seconds = time.perf_counter() - start
+        messages = result["messages"]
+        turns = sum(isinstance(m, AIMessage) for m in messages)
+        tool_calls = sum(isinstance(m, ToolMessage) for m in messages)
+        print(f"{name:<16}{turns:>12}{tool_calls:>11}{stub_stats(base_url)['requests']:>16}"
+              f"{sum(scheduler.timeouts.values()):>9}{seconds:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Conversation Compaction for the ReAct Loop
+
+Every assistant turn resends the whole history, and `extract_text` results
+are the bulk of it: a few OCR'd pages early in a session are paid for again
+on every turn after. The `compact` node runs before the assistant and, once
+the history goes over `max_tokens`, shrinks old tool results until it is
+back under `target_tokens`:
+
+    truncate   keep the first `max_tool_tokens` tokens and note how much was cut
+    summarize  replace the result with a short summary by a chat model
+
+The last `keep_turns` turns (an assistant message and the tool results it
+asked for) stay verbatim, and so does every message that isn't a tool result.
+Turns are counted by assistant message, not by question, so the results of
+a long ReAct loop under one question are compacted too. Tool messages
+are rewritten in place, keeping their id and tool_call_id, so `add_messages`
+replaces them and every tool call still has its result.
+
+Compacting down to a target well below the trigger means it fires once in
+a while, not every turn; each time it does, the prompt cache of the history
+after the first rewritten message starts afresh.
+
+Tokens are counted locally with tiktoken's cl100k_base encoding. It is not
+Claude's tokenizer and undercounts by roughly 10-20%, so leave headroom.
+tiktoken downloads the encoding on first use; without tiktoken or a network,
+tokens are estimated as 4 characters each.
+
+Given a registry, compactions are counted as `history_compactions_total` and
+tokens removed as `history_compacted_tokens_total`.
+
+Environment Variables:
+    HISTORY_COMPACTION - truncate (default), summarize or off
+    HISTORY_MAX_TOKENS - History size that triggers compaction (default 12000)
+    HISTORY_TARGET_TOKENS - Size to compact down to (default 6000)
+    HISTORY_KEEP_TURNS - Recent turns kept verbatim (default 2)
+    HISTORY_TOOL_TOKENS - Tokens an old tool result keeps or is summarized to (default 200)
+
+Usage:
+    compactor = Compactor(CompactionPolicy(max_tokens=12_000, target_tokens=6_000))
+    builder.add_node("compact", compactor.node)
+    builder.add_edge("tools", "compact")
+    builder.add_edge("compact", "assistant")
+"""
+
+import json
+import os
+import sys
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AnyMessage, BaseMessage, HumanMessage, ToolMessage
+
+# Shared helpers (llm_cache, llm_metrics) live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from llm_metrics import MetricsRegistry
+
+COMPACTION_MODES = ("truncate", "summarize")
+DEFAULT_ENCODING = "cl100k_base"
+# Role and separators around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+# Characters per token when the encoding can't be loaded
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = (
+    "Summarize this tool result in at most {tokens} tokens for an assistant that may need it later. "
+    "Keep names, numbers, dates and amounts exactly as written.\n\n{content}"
+)
+
+
+class TokenCounter:
+    """
+    Counts message tokens with a local tiktoken encoding, loaded on first use.
+
+    If tiktoken isn't installed or can't fetch the encoding (it downloads it once), tokens
+    are estimated from the length of the text instead.
+    """
+
+    def __init__(self, encoding: str = DEFAULT_ENCODING):
+        self.encoding_name = encoding
+        self._encoding = None
+        self._loaded = False
+
+    @property
+    def encoding(self):
+        """The tiktoken encoding, or None when it can't be loaded"""
+        if not self._loaded:
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                print(f"[compaction] {self.encoding_name} unavailable ({type(e).__name__}); "
+                      f"estimating {CHARS_PER_TOKEN} characters per token", file=sys.stderr)
+            self._loaded = True
+        return self._encoding
+
+    def text(self, text: str) -> int:
+        if self.encoding is None:
+            return -(-len(text) // CHARS_PER_TOKEN)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, tokens: int) -> str:
+        if self.encoding is None:
+            return text[:tokens * CHARS_PER_TOKEN]
+        return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:tokens])
+
+    def message(self, message: BaseMessage) -> int:
+        content = message.content
+        if isinstance(content, str):
+            tokens = self.text(content)
+        else:
+            tokens = sum(self.text(block if isinstance(block, str) else block.get("text") or json.dumps(block))
+                         for block in content)
+        for call in getattr(message, "tool_calls", None) or []:
+            tokens += self.text(call["name"]) + self.text(json.dumps(call["args"]))
+        return tokens + MESSAGE_OVERHEAD_TOKENS
+
+    def messages(self, messages: Sequence[BaseMessage]) -> int:
+        return sum(self.message(m) for m in messages)
+
+
+@dataclass(frozen=True)
+class CompactionPolicy:
+    mode: str = "truncate"
+    max_tokens: int = 12_000
+    target_tokens: int = 6_000
+    keep_turns: int = 2
+    max_tool_tokens: int = 200
+
+    @classmethod
+    def from_env(cls) -> Optional["CompactionPolicy"]:
+        """A policy from HISTORY_*, or None when HISTORY_COMPACTION is off"""
+        mode = (os.environ.get("HISTORY_COMPACTION") or "truncate").lower()
+        if mode in ("off", "0", "false"):
+            return None
+        if mode not in COMPACTION_MODES:
+            raise ValueError(f"HISTORY_COMPACTION must be off or one of {', '.join(COMPACTION_MODES)}, got {mode!r}")
+        overrides = {"mode": mode}
+        if os.environ.get("HISTORY_MAX_TOKENS"):
+            overrides["max_tokens"] = int(os.environ["HISTORY_MAX_TOKENS"])
+        if os.environ.get("HISTORY_TARGET_TOKENS"):
+            overrides["target_tokens"] = int(os.environ["HISTORY_TARGET_TOKENS"])
+        if os.environ.get("HISTORY_KEEP_TURNS"):
+            overrides["keep_turns"] = int(os.environ["HISTORY_KEEP_TURNS"])
+        if os.environ.get("HISTORY_TOOL_TOKENS"):
+            overrides["max_tool_tokens"] = int(os.environ["HISTORY_TOOL_TOKENS"])
+        return replace(cls(), **overrides)
+
+
+def _text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "\n".join(block if isinstance(block, str) else block.get("text", "") for block in content)
+
+
+class Compactor:
+    """
+    Shrinks old tool results once the history goes over budget.
+
+    Args:
+        policy: When to compact, down to what, and how.
+        counter: Token counter; a cl100k_base one by default.
+        summarizer: Chat model for summarize mode.
+        registry: Optional llm_metrics registry for the compaction counters.
+    """
+
+    def __init__(self, policy: CompactionPolicy = CompactionPolicy(), counter: Optional[TokenCounter] = None,
+                 summarizer: Optional[BaseChatModel] = None, registry: Optional[MetricsRegistry] = None):
+        if policy.mode == "summarize" and summarizer is None:
+            raise ValueError("summarize mode needs a summarizer model")
+        self.policy = policy
+        self.counter = counter or TokenCounter()
+        self.summarizer = summarizer
+        self.registry = registry
+        if registry is not None:
+            registry.describe("history_compactions_total", "Times the conversation history was compacted")
+            registry.describe("history_compacted_tokens_total", "Tokens removed from the history by compaction")
+
+    def _protected_from(self, messages: Sequence[BaseMessage]) -> int:
+        """Index of the first message of the last keep_turns turns, each an assistant message and its tool results"""
+        if not self.policy.keep_turns:
+            return len(messages)
+        turns = [i for i, m in enumerate(messages) if isinstance(m, AIMessage)]
+        if len(turns) < self.policy.keep_turns:
+            return 0
+        return turns[-self.policy.keep_turns]
+
+    def _truncated(self, message: ToolMessage, tokens: int) -> str:
+        kept = self.counter.truncate(_text(message.content), self.policy.max_tool_tokens)
+        return (f"{kept}\n[... {tokens - self.policy.max_tool_tokens} more tokens of this result were removed "
+                f"to save context; call {message.name or 'the tool'} again if you need them]")
+
+    def _summaries(self, messages: List[ToolMessage]) -> List[str]:
+        prompts = [[HumanMessage(content=SUMMARY_PROMPT.format(tokens=self.policy.max_tool_tokens,
+                                                               content=_text(m.content)))] for m in messages]
+        return [f"[Summary of an earlier {m.name or 'tool'} result] {str(reply.content).strip()}"
+                for m, reply in zip(messages, self.summarizer.batch(prompts))]
+
+    def compact(self, messages: Sequence[AnyMessage]) -> List[AnyMessage]:
+        """Replacements for the tool messages to shrink, oldest first; empty when under budget"""
+        sizes = [self.counter.message(m) for m in messages]
+        total = sum(sizes)
+        if total <= self.policy.max_tokens:
+            return []
+
+        chosen = []
+        for index in range(self._protected_from(messages)):
+            message = messages[index]
+            tool_tokens = sizes[index] - MESSAGE_OVERHEAD_TOKENS
+            if not isinstance(message, ToolMessage) or tool_tokens <= self.policy.max_tool_tokens:
+                continue
+            chosen.append((message, tool_tokens))
+            # Roughly what it shrinks to, either way
+            total -= tool_tokens - self.policy.max_tool_tokens
+            if total <= self.policy.target_tokens:
+                break
+        if not chosen:
+            return []
+
+        if self.policy.mode == "summarize":
+            contents = self._summaries([message for message, _ in chosen])
+        else:
+            contents = [self._truncated(message, tokens) for message, tokens in chosen]
+        replacements = [message.model_copy(update={"content": content})
+                        for (message, _), content in zip(chosen, contents)]
+
+        if self.registry is not None:
+            removed = sum(tokens for _, tokens in chosen) - sum(self.counter.text(c) for c in contents)
+            self.registry.inc("history_compactions_total")
+            self.registry.inc("history_compacted_tokens_total", max(removed, 0))
+        return replacements
+
+    def node(self, state) -> dict:
+        """Graph node: the compacted tool messages replace the originals by id"""
+        replacements = self.compact(state["messages"])
+        return {"messages": replacements} if replacements else {}
+
+
+def compactor_from_env(summarizer: Optional[BaseChatModel] = None,
+                       registry: Optional[MetricsRegistry] = None) -> Optional[Compactor]:
+    """A Compactor configured from HISTORY_*, or None when HISTORY_COMPACTION is off"""
+    policy = CompactionPolicy.from_env()
+    if policy is None:
+        return None
+    return Compactor(policy, summarizer=summarizer if policy.mode == "summarize" else None, registry=registry)
@@ -0,0 +1,176 @@
+"""
+Document Pages for the Vision Model
+
+`iter_pages` turns a PDF or an image file into encoded pages, one at a time.
+It is `iter_page_images` (decoding, in order) followed by `encode_page`
+(preprocessing and encoding, which can run on another thread):
+
+- The MIME type comes from the file's magic bytes, not its extension.
+- PDFs are rasterized page by page with pypdfium2, at most at twice the
+  resolution that will be sent, so only one bounded page bitmap is in memory
+  at a time.
+- Multi-frame images (TIFF scans, GIFs) yield one page per frame.
+- Decoded pages are already shrunk to twice the final resolution, so a
+  page waiting for a worker holds a bounded bitmap.
+- Every page goes through `preprocessing.preprocess` and `encode` under an
+  `ImagePolicy` (grayscale, deskew, crop, pixel budget, smallest format).
+  An original file that needs none of that and is smaller is sent as is;
+  such a page refers to the file instead of holding its bytes, and
+  `Page.buffer()` maps it into memory only while it is being encoded.
+
+Installations:
+    pip install pillow pypdfium2
+
+Usage:
+    for page in iter_pages("scan.pdf", policy=ImagePolicy(max_pixels=800_000)):
+        print(page.number, page.mime_type, page.width, page.height, len(page.data))
+"""
+
+import io
+import mmap
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from PIL import Image, ImageSequence
+
+from preprocessing import ImagePolicy, encode, fit_scale, prescale, preprocess
+
+VISION_MIME_TYPES = ("image/png", "image/jpeg", "image/gif", "image/webp")
+
+# PDF pages are rendered at this resolution unless the pixel budget is lower
+DEFAULT_DPI = 200
+
+MAGIC_NUMBERS = (
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"BM", "image/bmp"),
+)
+
+
+@dataclass
+class Page:
+    number: int  # 1-based
+    mime_type: str
+    data: Optional[bytes]  # None when the page is the file at `path`, unchanged
+    width: int
+    height: int
+    path: Optional[str] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.data) if self.data is not None else os.path.getsize(self.path)
+
+    @contextmanager
+    def buffer(self):
+        """The encoded image as a bytes-like object; files are memory-mapped, not read"""
+        if self.data is not None:
+            yield self.data
+            return
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+    def open(self) -> BinaryIO:
+        """The encoded image as a file object, for uploads that stream it in chunks"""
+        return io.BytesIO(self.data) if self.data is not None else open(self.path, "rb")
+
+
+@dataclass
+class PageImage:
+    number: int  # 1-based
+    image: Image.Image
+    # (mime type, path) of a single-image file the model accepts as it is
+    original: Optional[Tuple[str, str]] = None
+
+
+def detect_mime(path: str) -> str:
+    """MIME type from the first bytes of the file"""
+    with open(path, "rb") as f:
+        head = f.read(16)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for magic, mime_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return mime_type
+    raise ValueError(f"Unsupported document type: {path}")
+
+
+def encode_page(page: PageImage, policy: Optional[ImagePolicy] = None) -> Page:
+    """Preprocess and encode a decoded page"""
+    policy = policy or ImagePolicy()
+    width, height = page.image.size
+    image = preprocess(page.image, policy)
+    mime_type, data = encode(image, policy)
+    # Keep the original when preprocessing saved neither bytes nor pixels
+    if page.original is not None and os.path.getsize(page.original[1]) <= len(data) \
+            and width * height <= image.width * image.height:
+        return Page(page.number, page.original[0], None, width, height, path=page.original[1])
+    return Page(page.number, mime_type, data, image.width, image.height)
+
+
+def _pdf_images(path: str, policy: ImagePolicy, dpi: int) -> Iterator[PageImage]:
+    try:
+        import pypdfium2
+    except ImportError as e:
+        raise ImportError("PDF input needs pypdfium2: pip install pypdfium2") from e
+
+    pdf = pypdfium2.PdfDocument(path)
+    try:
+        for index in range(len(pdf)):
+            page = pdf[index]
+            try:
+                width, height = page.get_size()  # points, 1/72 inch
+                # Render at no more than twice the final resolution, as preprocess would
+                # shrink it to anyway, leaving room for the crop
+                scale = (dpi / 72) * fit_scale(width * dpi / 72, height * dpi / 72,
+                                               policy.max_edge * 2, policy.max_pixels * 4)
+                bitmap = page.render(scale=scale, grayscale=policy.grayscale)
+                try:
+                    # to_pil shares the bitmap's buffer, which close() frees
+                    image = bitmap.to_pil().copy()
+                finally:
+                    bitmap.close()
+            finally:
+                page.close()
+            yield PageImage(index + 1, image)
+    finally:
+        pdf.close()
+
+
+def _image_images(path: str, mime_type: str, policy: ImagePolicy) -> Iterator[PageImage]:
+    with Image.open(path) as image:
+        if getattr(image, "n_frames", 1) == 1:
+            size = image.size
+            # Before the first load, so JPEGs can be decoded at the reduced size
+            image = prescale(image, policy)
+            image.load()
+            original = None
+            if mime_type in VISION_MIME_TYPES and image.size == size:
+                original = (mime_type, path)
+            yield PageImage(1, image, original)
+            return
+        for index, frame in enumerate(ImageSequence.Iterator(image)):
+            yield PageImage(index + 1, prescale(frame.copy(), policy))
+
+
+def iter_page_images(path: str, policy: Optional[ImagePolicy] = None,
+                     dpi: int = DEFAULT_DPI) -> Iterator[PageImage]:
+    """Decoded pages of a PDF or image file, in order, one at a time"""
+    policy = policy or ImagePolicy()
+    mime_type = detect_mime(path)
+    if mime_type == "application/pdf":
+        yield from _pdf_images(path, policy, dpi)
+    else:
+        yield from _image_images(path, mime_type, policy)
+
+
+def iter_pages(path: str, policy: Optional[ImagePolicy] = None, dpi: int = DEFAULT_DPI) -> Iterator[Page]:
+    """Encoded pages of a PDF or image file, in order, one at a time"""
+    for page in iter_page_images(path, policy, dpi):
+        yield encode_page(page, policy)
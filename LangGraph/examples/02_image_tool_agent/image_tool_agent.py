@@ -4,174 +4,315 @@ Image Tool Agent - Multimodal agent with vision capabilities and tool calling.
 This agent can extract text from images and perform calculations using Claude's
 vision capabilities combined with LangGraph's tool integration.
 
+Nothing is built at import: `build_react_graph(config)` compiles the graph once
+per configuration and process, and the vision and assistant clients are shared
+by every graph in the process. `react_graph` builds the default graph on first use.
+
 Installations:
-    pip install langgraph langchain-anthropic langchain-core langfuse python-dotenv
+    pip install langgraph langchain-anthropic langchain-core langfuse python-dotenv pillow pypdfium2 tiktoken
 
 Environment Variables Required:
     ANTHROPIC_API_KEY - Your Anthropic API key
     LANGFUSE_PUBLIC_KEY - (Optional) Langfuse public key for tracing
     LANGFUSE_SECRET_KEY - (Optional) Langfuse secret key for tracing
     LANGFUSE_HOST - (Optional) Langfuse host URL
+    GRAPH_VIEW - (Optional) off (default), mermaid, ascii, png or mermaid.ink to draw the graph
+    OCR_MAX_CONCURRENCY - (Optional) Pages sent to the vision model at once (default 4)
+    OCR_REQUESTS_PER_SECOND - (Optional) Rate limit for vision requests
+    OCR_IMAGE_POLICY - (Optional) original, balanced (default) or compact preprocessing
+    OCR_UPLOAD_MODE - (Optional) inline (default) or files, to upload each page image once
+    OCR_FILE_IDS_PATH - (Optional) JSON file remembering uploaded page image ids
+    OCR_CACHE - (Optional) off (default), memory or disk cache of page text
+    OCR_CACHE_MATCH - (Optional) exact (default) or perceptual, to match near-duplicate scans
+    EXTRACT_TEXT_MAX_CONCURRENCY, EXTRACT_TEXT_TIMEOUT - (Optional) extract_text calls at once (2) and seconds (300)
+    DIVIDE_MAX_CONCURRENCY, DIVIDE_TIMEOUT - (Optional) the same for divide (8, 5)
+    HISTORY_COMPACTION - (Optional) truncate (default), summarize or off, to shrink old tool results
+    HISTORY_MAX_TOKENS, HISTORY_TARGET_TOKENS - (Optional) when to compact (12000) and down to what (6000)
 """
 
 import os
-import base64
+import sys
+from dataclasses import dataclass
+from pathlib import Path
 
 from dotenv import load_dotenv
-from typing import List, TypedDict, Annotated, Optional
-from langchain_anthropic import ChatAnthropic
+from typing import TYPE_CHECKING, List, TypedDict, Annotated, Optional
 from langchain_core.messages import HumanMessage
-from langchain_core.messages import AnyMessage, SystemMessage, HumanMessage
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+from langchain_core.tools import StructuredTool
 from langgraph.graph.message import add_messages
+from langgraph.config import get_stream_writer
 from langgraph.graph import START, StateGraph
-from langgraph.prebuilt import ToolNode, tools_condition
-from IPython.display import Image, display
+from langgraph.prebuilt import tools_condition
+
+# Shared helpers (graph_runtime, llm_cache, llm_metrics) live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from graph_runtime import langfuse_handler_from_env, show_graph
+from graph_runtime.factory import clients, graphs
+from llm_cache.langchain_cache import langchain_cache_from_env
+from llm_metrics import export_from_env
+from llm_metrics.callback import metrics_handler_from_env
+from compaction import compactor_from_env
+from ocr import OCR_PROMPT, aiter_page_text, iter_page_text, vision_rate_limiter_from_env
+from ocr_cache import ocr_cache_from_env
+from preprocessing import ImagePolicy
+from prompt_caching import cache_usage, cached_system_message, with_cache_breakpoint
+from tool_scheduler import ToolLimits, ToolScheduler
+from vision_files import vision_file_store_from_env
+
+if TYPE_CHECKING:
+    from langchain_anthropic import ChatAnthropic
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Optional: Langfuse tracing (only initialize if credentials are provided)
-langfuse_handler = None
-if os.environ.get("LANGFUSE_PUBLIC_KEY") and os.environ.get("LANGFUSE_SECRET_KEY"):
-    from langfuse.langchain import CallbackHandler
-    langfuse_handler = CallbackHandler()
+# Optional: Langfuse tracing (only imported and initialized if credentials are provided)
+langfuse_handler = langfuse_handler_from_env()
+
+# Optional: response cache (LLM_CACHE=memory|disk), so re-running OCR on the same image is free
+llm_cache = langchain_cache_from_env()
+
+# Optional: per-node latency, token and cost histograms (LLM_METRICS=prometheus|jsonl)
+metrics_handler = metrics_handler_from_env()
+
+# Pages of one document sent to the vision model at once, and an optional request rate cap
+OCR_MAX_CONCURRENCY = int(os.environ.get("OCR_MAX_CONCURRENCY", "4"))
+
+# How pages are cleaned up and shrunk before upload (OCR_IMAGE_POLICY=original|balanced|compact)
+OCR_IMAGE_POLICY = ImagePolicy.from_env()
 
 class AgentState(TypedDict):
     # The document provided
     input_file: Optional[str]  # Contains file path (PDF/PNG)
     messages: Annotated[list[AnyMessage], add_messages]
 
-# Initialize our LLM
-vision_llm = ChatAnthropic(
-    anthropic_api_key=os.environ.get("ANTHROPIC_API_KEY"),
-    model="claude-haiku-4-5-20251001",
-    temperature=0.7,
-    max_tokens=1024,
-    callbacks=[langfuse_handler] if langfuse_handler else []
-)
+def _make_vision():
+    from langchain_anthropic import ChatAnthropic
+
+    # Initialize our LLM
+    vision_llm = ChatAnthropic(
+        anthropic_api_key=os.environ.get("ANTHROPIC_API_KEY"),
+        model="claude-haiku-4-5-20251001",
+        temperature=0.7,
+        max_tokens=1024,
+        callbacks=[langfuse_handler] if langfuse_handler else [],
+        cache=llm_cache,
+        rate_limiter=vision_rate_limiter_from_env()
+    )
+
+    # Optional: upload each page image once and send only its id (OCR_UPLOAD_MODE=files)
+    ocr_files = vision_file_store_from_env(vision_llm)
+
+    # Optional: page text by image content (OCR_CACHE=memory|disk), so asking about the same
+    # document again skips the vision model; lookups are counted in the metrics registry
+    ocr_cache = ocr_cache_from_env(metrics_handler.registry if metrics_handler else None, prompt=OCR_PROMPT)
+    return vision_llm, ocr_files, ocr_cache
+
+def vision_runtime():
+    """(vision model, upload store, OCR cache), built once per process and shared by every graph"""
+    return clients.get(("vision",), _make_vision)
+
+def _page_writer():
+    """LangGraph's custom stream writer inside a graph run, a no-op outside one"""
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda chunk: None
 
 def extract_text(img_path: str) -> str:
     """
-    Extract text from an image file using a multimodal model.
+    Extract text from an image file or a multi-page PDF using a multimodal model.
     
     Master Wayne often leaves notes with his training regimen or meal plans.
     This allows me to properly analyze the contents.
+
+    Args:
+        img_path: A local image or PDF file path.
+
+    Returns:
+        A single string with the text of every page, each under a "--- Page N ---" header.
     """
-    all_text = ""
+    # Pages are OCR'd concurrently; each one is streamed (stream_mode="custom") as soon as it's done
+    vision_llm, ocr_files, ocr_cache = vision_runtime()
+    write = _page_writer()
+    pages = {}
     try:
-        # Read image and encode as base64
-        with open(img_path, "rb") as image_file:
-            image_bytes = image_file.read()
-
-        image_base64 = base64.b64encode(image_bytes).decode("utf-8")
-
-        # Prepare the prompt including the base64 image data
-        message = [
-            HumanMessage(
-                content=[
-                    {
-                        "type": "text",
-                        "text": (
-                            "Extract all the text from this image. "
-                            "Return only the extracted text, no explanations."
-                        ),
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{image_base64}"
-                        },
-                    },
-                ]
-            )
-        ]
-
-        # Call the vision-capable model
-        response = vision_llm.invoke(message)
-
-        # Append extracted text
-        all_text += response.content + "\n\n"
-
-        return all_text.strip()
+        for number, text in iter_page_text(vision_llm, img_path, max_concurrency=OCR_MAX_CONCURRENCY,
+                                           policy=OCR_IMAGE_POLICY, files=ocr_files, cache=ocr_cache):
+            pages[number] = text
+            write({"extract_text": {"file": img_path, "page": number, "text": text}})
     except Exception as e:
         # A butler should handle errors gracefully
         error_msg = f"Error extracting text: {str(e)}"
         print(error_msg)
-        return ""
+
+    return _join_pages(pages)
+
+async def aextract_text(img_path: str) -> str:
+    """The same as extract_text, awaiting the vision requests instead of holding threads"""
+    vision_llm, ocr_files, ocr_cache = vision_runtime()
+    write = _page_writer()
+    pages = {}
+    try:
+        async for number, text in aiter_page_text(vision_llm, img_path, max_concurrency=OCR_MAX_CONCURRENCY,
+                                                  policy=OCR_IMAGE_POLICY, files=ocr_files, cache=ocr_cache):
+            pages[number] = text
+            write({"extract_text": {"file": img_path, "page": number, "text": text}})
+    except Exception as e:
+        print(f"Error extracting text: {str(e)}")
+    return _join_pages(pages)
+
+def _join_pages(pages: dict) -> str:
+    if len(pages) == 1:
+        return next(iter(pages.values()))
+    return "\n\n".join(f"--- Page {number} ---\n{text}" for number, text in sorted(pages.items()))
 
 def divide(a: int, b: int) -> float:
     """Divide a and b - for Master Wayne's occasional calculations."""
     return a / b
 
-# Equip with tools
+# Equip with tools. divide is CPU work and runs on a thread; extract_text waits on the
+# vision model, so under ainvoke it runs as a coroutine
 tools = [
     divide,
-    extract_text
+    StructuredTool.from_function(func=extract_text, coroutine=aextract_text)
 ]
 
-llm = ChatAnthropic(
-    anthropic_api_key=os.environ.get("ANTHROPIC_API_KEY"),
-    model="claude-haiku-4-5-20251001",
-    temperature=0.7,
-    max_tokens=1024,
-    callbacks=[langfuse_handler] if langfuse_handler else []
+# Independent tool calls of one turn run concurrently, within per-tool limits
+# (<TOOL>_MAX_CONCURRENCY, <TOOL>_TIMEOUT, e.g. EXTRACT_TEXT_TIMEOUT=120)
+tool_scheduler = ToolScheduler({
+    "extract_text": ToolLimits.from_env("extract_text", ToolLimits(max_concurrency=2, timeout=300)),
+    "divide": ToolLimits.from_env("divide", ToolLimits(max_concurrency=8, timeout=5)),
+})
+
+# The same every turn, so it is cached along with the tool schemas before it
+SYSTEM_PROMPT = (
+    "You are a helpful butler named Alfred that serves Mr. Wayne and Batman. "
+    "You can analyse documents and run computations with the provided tools. "
+    "When several tool calls don't depend on each other's results, make them all in the same turn."
 )
 
-llm_with_tools = llm.bind_tools(tools, parallel_tool_calls=False)
-
-def assistant(state: AgentState):
-    # System message
-    textual_description_of_tool="""
-extract_text(img_path: str) -> str:
-    Extract text from an image file using a multimodal model.
-
-    Args:
-        img_path: A local image file path (strings).
-
-    Returns:
-        A single string containing the concatenated text extracted from each image.
-divide(a: int, b: int) -> float:
-    Divide a and b
-"""
-    image=state["input_file"]
-    sys_msg = SystemMessage(content=f"You are a helpful butler named Alfred that serves Mr. Wayne and Batman. You can analyse documents and run computations with provided tools:\n{textual_description_of_tool} \n You have access to some optional images. Currently the loaded image is: {image}")
-
-    return {
-        "messages": [llm_with_tools.invoke([sys_msg] + state["messages"])],
-        "input_file": state["input_file"]
-    }
-
-# The graph
-builder = StateGraph(AgentState)
-
-# Define nodes: these do the work
-builder.add_node("assistant", assistant)
-builder.add_node("tools", ToolNode(tools))
-
-# Define edges: these determine how the control flow moves
-builder.add_edge(START, "assistant")
-builder.add_conditional_edges(
-    "assistant",
-    # If the latest message requires a tool, route to tools
-    # Otherwise, provide a direct response
-    tools_condition,
-)
-builder.add_edge("tools", "assistant")
-react_graph = builder.compile()
-
-# Show the agents thought process
-display(Image(react_graph.get_graph(xray=True).draw_mermaid_png()))
-
-messages = [HumanMessage(content="Divide 6790 by 5")]
-config = {"callbacks": [langfuse_handler]} if langfuse_handler else {}
-messages = react_graph.invoke(
-    input={"messages": messages, "input_file": None},
-    config=config
-)
-
-# Show the messages
-for m in messages['messages']:
-    m.pretty_print()
-
 
+@dataclass(frozen=True)
+class ReactGraphConfig:
+    """
+    What a compiled react graph depends on; graphs are cached per value.
 
+    Attributes:
+        model: Anthropic model of the assistant.
+        compaction: Shrink old tool results over the HISTORY_* budget (HISTORY_COMPACTION != off).
+    """
+    model: str = "claude-haiku-4-5-20251001"
+    compaction: bool = True
+
+    @classmethod
+    def from_env(cls) -> "ReactGraphConfig":
+        return cls(compaction=os.environ.get("HISTORY_COMPACTION", "truncate").lower() != "off")
+
+
+def chat_model(model: str) -> "ChatAnthropic":
+    """The assistant model, one client per model name and process"""
+    from langchain_anthropic import ChatAnthropic
+
+    return clients.get(("assistant", model), lambda: ChatAnthropic(
+        anthropic_api_key=os.environ.get("ANTHROPIC_API_KEY"),
+        model=model,
+        temperature=0.7,
+        max_tokens=1024,
+        callbacks=[langfuse_handler] if langfuse_handler else [],
+        cache=llm_cache
+    ))
+
+
+def _compile_react_graph(config: ReactGraphConfig):
+    llm = chat_model(config.model)
+
+    # Optional: shrink old tool results once the history goes over a token budget (HISTORY_COMPACTION)
+    compactor = None
+    if config.compaction:
+        compactor = compactor_from_env(summarizer=llm, registry=metrics_handler.registry if metrics_handler else None)
+
+    # Parallel tool calls: "OCR these three receipts" is one turn with three extract_text calls
+    llm_with_tools = llm.bind_tools(tools, parallel_tool_calls=True)
+
+    def assistant(state: AgentState):
+        # Only the loaded image changes between turns; it goes after the cache breakpoint
+        image = state["input_file"]
+        sys_msg = cached_system_message(SYSTEM_PROMPT, f"You have access to some optional images. Currently the loaded image is: {image}")
+
+        return {
+            "messages": [llm_with_tools.invoke(with_cache_breakpoint([sys_msg] + state["messages"]))],
+            "input_file": state["input_file"]
+        }
+
+    # The graph
+    builder = StateGraph(AgentState)
+
+    # Define nodes: these do the work
+    builder.add_node("assistant", assistant)
+    builder.add_node("tools", tool_scheduler.tool_node(tools))
+
+    # Define edges: these determine how the control flow moves
+    if compactor:
+        # Every assistant turn sees the history after compaction
+        builder.add_node("compact", compactor.node)
+        builder.add_edge(START, "compact")
+        builder.add_edge("compact", "assistant")
+    else:
+        builder.add_edge(START, "assistant")
+    builder.add_conditional_edges(
+        "assistant",
+        # If the latest message requires a tool, route to tools
+        # Otherwise, provide a direct response
+        tools_condition,
+    )
+    builder.add_edge("tools", "compact" if compactor else "assistant")
+    return builder.compile()
+
+
+def build_react_graph(config: Optional[ReactGraphConfig] = None):
+    """The compiled react graph for `config` (default: from the environment), compiled once per process"""
+    config = config or ReactGraphConfig.from_env()
+    return graphs.get(("react", config), lambda: _compile_react_graph(config))
+
+
+def __getattr__(name):
+    # `from image_tool_agent import react_graph` builds the default graph on first use
+    if name == "react_graph":
+        return build_react_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def main():
+    react_graph = build_react_graph()
+
+    # Show the agents thought process (opt-in, see GRAPH_VIEW)
+    show_graph(react_graph, xray=True)
+
+    messages = [HumanMessage(content="Divide 6790 by 5")]
+    callbacks = [handler for handler in (langfuse_handler, metrics_handler) if handler]
+    config = {"callbacks": callbacks} if callbacks else {}
+    messages = react_graph.invoke(
+        input={"messages": messages, "input_file": None},
+        config=config
+    )
+
+    # Show the messages
+    for m in messages['messages']:
+        m.pretty_print()
+
+    # Input tokens of each assistant turn, by how the prompt cache served them
+    turns = [m for m in messages['messages'] if isinstance(m, AIMessage)]
+    for number, m in enumerate(turns, 1):
+        usage = cache_usage(m)
+        print(f"Turn {number} input tokens: {usage['uncached']} uncached, "
+              f"{usage['cache_write']} cache write, {usage['cache_read']} cache read")
+
+    if llm_cache:
+        print(f"LLM cache stats: {llm_cache.cache.stats.as_dict()}")
+    if metrics_handler:
+        export_from_env(metrics_handler.registry)
+
+
+if __name__ == "__main__":
+    main()
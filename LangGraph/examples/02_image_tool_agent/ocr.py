@@ -0,0 +1,168 @@
+"""
+Page-by-Page OCR with a Vision Model
+
+`iter_page_text` sends the pages of a document to a vision chat model
+concurrently and yields each page's text as soon as it comes back. Pages
+are decoded lazily, in order, and preprocessed on the worker that sends them,
+so at most `max_concurrency` of them are in memory and in flight at once,
+however long the document is. Request rate is left to the model's own
+`rate_limiter` (see `vision_rate_limiter_from_env`).
+
+Images go out as Anthropic base64 blocks, encoded straight from the page's
+bytes or memory-mapped file; no data URL copy is built. With a
+`VisionFileStore` (OCR_UPLOAD_MODE=files) each distinct image is uploaded
+once and requests carry only its file id.
+
+With an `OCRCache` (OCR_CACHE=memory|disk), a page whose image was OCR'd
+before by the same model comes back from the cache without a request.
+
+A page that fails yields an error note instead of stopping the document.
+
+`aiter_page_text` is the same pipeline for async callers: requests are
+awaited on the event loop, and only decoding and preprocessing go to threads.
+
+Usage:
+    for number, text in iter_page_text(vision_llm, "scan.pdf", max_concurrency=4):
+        print(f"page {number}: {text[:60]}")
+
+    async for number, text in aiter_page_text(vision_llm, "scan.pdf"):
+        ...
+"""
+
+import asyncio
+import base64
+import os
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import AsyncIterator, Iterator, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage
+from langchain_core.rate_limiters import InMemoryRateLimiter
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+from documents import DEFAULT_DPI, Page, PageImage, encode_page, iter_page_images
+from ocr_cache import OCRCache
+from preprocessing import ImagePolicy
+from vision_files import FILES_API_BETA, VisionFileStore
+
+OCR_PROMPT = "Extract all the text from this image. Return only the extracted text, no explanations."
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+def image_block(page: Page, file_id: Optional[str] = None) -> dict:
+    # Anthropic's own block format; LangChain's standard image block costs one more copy of the base64
+    if file_id:
+        return {"type": "image", "source": {"type": "file", "file_id": file_id}}
+    with page.buffer() as buffer:
+        image_base64 = base64.b64encode(buffer).decode("ascii")
+    return {"type": "image", "source": {"type": "base64", "media_type": page.mime_type, "data": image_base64}}
+
+
+def page_message(page: Page, file_id: Optional[str] = None) -> HumanMessage:
+    return HumanMessage(content=[{"type": "text", "text": OCR_PROMPT}, image_block(page, file_id)])
+
+
+def ocr_page(model: BaseChatModel, page: Page, files: Optional[VisionFileStore] = None) -> str:
+    if files is None:
+        return str(model.invoke([page_message(page)]).content).strip()
+    betas = [*(getattr(model, "betas", None) or []), FILES_API_BETA]
+    return str(model.invoke([page_message(page, files.file_id(page))], betas=betas).content).strip()
+
+
+async def aocr_page(model: BaseChatModel, page: Page, files: Optional[VisionFileStore] = None) -> str:
+    if files is None:
+        return str((await model.ainvoke([page_message(page)])).content).strip()
+    betas = [*(getattr(model, "betas", None) or []), FILES_API_BETA]
+    file_id = await asyncio.to_thread(files.file_id, page)
+    return str((await model.ainvoke([page_message(page, file_id)], betas=betas)).content).strip()
+
+
+def model_id(model: BaseChatModel) -> str:
+    return str(getattr(model, "model", None) or getattr(model, "model_name", None) or type(model).__name__)
+
+
+def _ocr_page_image(model: BaseChatModel, page: PageImage, policy: Optional[ImagePolicy],
+                    files: Optional[VisionFileStore], cache: Optional[OCRCache]) -> str:
+    encoded = encode_page(page, policy)
+    if cache is None:
+        return ocr_page(model, encoded, files)
+    return cache.get_or_extract(model_id(model), encoded, lambda: ocr_page(model, encoded, files))
+
+
+def iter_page_text(model: BaseChatModel, path: str, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                   policy: Optional[ImagePolicy] = None, dpi: int = DEFAULT_DPI,
+                   files: Optional[VisionFileStore] = None,
+                   cache: Optional[OCRCache] = None) -> Iterator[Tuple[int, str]]:
+    """Yield (page number, text) in completion order"""
+    pages = iter_page_images(path, policy, dpi)
+    # The context-copying pool keeps the vision calls under the caller's run, so callbacks see them
+    with ContextThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        pending = {}
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_concurrency:
+                page = next(pages, None)
+                if page is None:
+                    exhausted = True
+                else:
+                    pending[pool.submit(_ocr_page_image, model, page, policy, files, cache)] = page.number
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                number = pending.pop(future)
+                try:
+                    yield number, future.result()
+                except Exception as e:
+                    yield number, f"[Error extracting text from page {number}: {e}]"
+
+
+async def _aocr_page_image(model: BaseChatModel, page: PageImage, policy: Optional[ImagePolicy],
+                           files: Optional[VisionFileStore], cache: Optional[OCRCache]) -> str:
+    encoded = await asyncio.to_thread(encode_page, page, policy)
+    if cache is None:
+        return await aocr_page(model, encoded, files)
+    return await cache.aget_or_extract(model_id(model), encoded, lambda: aocr_page(model, encoded, files))
+
+
+async def aiter_page_text(model: BaseChatModel, path: str, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                          policy: Optional[ImagePolicy] = None, dpi: int = DEFAULT_DPI,
+                          files: Optional[VisionFileStore] = None,
+                          cache: Optional[OCRCache] = None) -> AsyncIterator[Tuple[int, str]]:
+    """Async `iter_page_text`: yield (page number, text) in completion order"""
+    pages = iter_page_images(path, policy, dpi)
+    pending = {}
+    exhausted = False
+    try:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_concurrency:
+                # Decoding is CPU work; the generator is only ever advanced by one thread at a time
+                page = await asyncio.to_thread(next, pages, None)
+                if page is None:
+                    exhausted = True
+                else:
+                    task = asyncio.ensure_future(_aocr_page_image(model, page, policy, files, cache))
+                    pending[task] = page.number
+            if not pending:
+                break
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                number = pending.pop(task)
+                try:
+                    yield number, task.result()
+                except Exception as e:
+                    yield number, f"[Error extracting text from page {number}: {e}]"
+    finally:
+        # The caller stopped early, timed out or was cancelled
+        for task in pending:
+            task.cancel()
+        pages.close()
+
+
+def vision_rate_limiter_from_env() -> Optional[InMemoryRateLimiter]:
+    """A token-bucket limiter from OCR_REQUESTS_PER_SECOND, or None when unset"""
+    rate = float(os.environ.get("OCR_REQUESTS_PER_SECOND") or 0)
+    if rate <= 0:
+        return None
+    return InMemoryRateLimiter(requests_per_second=rate, check_every_n_seconds=0.05,
+                               max_bucket_size=max(1.0, rate))
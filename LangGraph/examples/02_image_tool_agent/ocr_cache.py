@@ -0,0 +1,203 @@
+"""
+OCR Result Cache
+
+The agent often asks for the text of the same document more than once, in
+one conversation or across several. `OCRCache` keeps the text of every page
+it has seen, keyed by the model id, the OCR prompt and the SHA-256 of the
+preprocessed page image, so a repeat costs no vision request.
+
+Storage is an `llm_cache.ResponseCache`: an in-memory LRU, optionally in
+front of a SQLite file, both bounded in size and evicting least recently
+used entries first.
+
+With perceptual matching, pages are also indexed by a 256-bit difference
+hash (dHash) of a 17x16 thumbnail. A page whose dHash is within
+`max_distance` bits of a cached one (the same note scanned again, or saved
+at another quality) gets that page's text. The index splits each hash into
+`max_distance + 1` bands; two hashes that close always share a band, so a
+lookup only compares against pages that do.
+
+Lookups are counted in `lookups` and, given a registry, as
+`ocr_cache_lookups_total{result="exact"|"perceptual"|"miss"}`.
+
+Environment Variables:
+    OCR_CACHE - off (default), memory or disk
+    OCR_CACHE_PATH - SQLite file for the disk tier (default ~/.cache/ai-agentic/ocr_cache.sqlite)
+    OCR_CACHE_MAX_BYTES - Byte bound of the disk tier (default 64 MB)
+    OCR_CACHE_MATCH - exact (default) or perceptual
+    OCR_CACHE_DISTANCE - Bits two dHashes may differ by and still match (default 8 of 256)
+
+Usage:
+    cache = OCRCache(ResponseCache(path="ocr_cache.sqlite"), max_distance=8)
+    text = cache.get_or_extract("claude-haiku-4-5-20251001", page, lambda: ocr_page(model, page))
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from documents import Page
+
+# Shared helpers (llm_cache, llm_metrics) live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from llm_cache import ResponseCache, cache_key
+from llm_metrics import MetricsRegistry
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ai-agentic", "ocr_cache.sqlite")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISTANCE = 8
+CACHE_MATCHES = ("exact", "perceptual")
+
+HASH_SIZE = 16
+HASH_BITS = HASH_SIZE * HASH_SIZE
+# Pages remembered per index band; older ones drop out of the perceptual index (not the cache)
+MAX_BAND_ENTRIES = 64
+
+
+def content_digest(page: Page) -> str:
+    with page.buffer() as buffer:
+        return hashlib.sha256(buffer).hexdigest()
+
+
+def dhash(page: Page, hash_size: int = HASH_SIZE) -> int:
+    """Difference hash: one bit per pair of horizontally adjacent thumbnail pixels"""
+    with page.open() as f, Image.open(f) as image:
+        thumbnail = image.convert("L").resize((hash_size + 1, hash_size), Image.BOX)
+    pixels = list(thumbnail.getdata())
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+class OCRCache:
+    """
+    Page text by image content, with optional near-duplicate matching.
+
+    Args:
+        cache: Where entries live; its size bounds and eviction apply.
+        max_distance: dHash bits two pages may differ by to share text, or None for exact matches only.
+        registry: Optional llm_metrics registry for the lookup counters.
+        prompt: Part of every key, so changing the OCR prompt starts afresh.
+    """
+
+    def __init__(self, cache: ResponseCache, max_distance: Optional[int] = None,
+                 registry: Optional[MetricsRegistry] = None, prompt: str = ""):
+        self.cache = cache
+        self.max_distance = max_distance
+        self.registry = registry
+        self.prompt_digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        self.lookups: Dict[str, int] = {"exact": 0, "perceptual": 0, "miss": 0}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.describe("ocr_cache_lookups_total", "OCR cache lookups by result: exact, perceptual or miss")
+
+    @property
+    def hit_rate(self) -> float:
+        total = sum(self.lookups.values())
+        return (self.lookups["exact"] + self.lookups["perceptual"]) / total if total else 0.0
+
+    def _count(self, result: str) -> None:
+        with self._lock:
+            self.lookups[result] += 1
+        if self.registry is not None:
+            self.registry.inc("ocr_cache_lookups_total", result=result)
+
+    def _key(self, model_id: str, kind: str, value: str) -> str:
+        return cache_key(model_id, {"kind": kind, "prompt": self.prompt_digest}, value)
+
+    def _bands(self, bits: int) -> List[str]:
+        count = self.max_distance + 1
+        bounds = [HASH_BITS * i // count for i in range(count + 1)]
+        return [f"{i}:{(bits >> bounds[i]) & ((1 << (bounds[i + 1] - bounds[i])) - 1):x}" for i in range(count)]
+
+    def _nearest(self, model_id: str, bits: int) -> Optional[str]:
+        """Text key of the closest indexed page within max_distance, if any"""
+        best = None
+        for band in self._bands(bits):
+            entries = self.cache.get(self._key(model_id, "band", band))
+            for other, text_key in json.loads(entries) if entries else []:
+                distance = bin(bits ^ int(other, 16)).count("1")
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, text_key)
+        return best[1] if best else None
+
+    def _index(self, model_id: str, bits: int, text_key: str) -> None:
+        with self._lock:
+            for band in self._bands(bits):
+                key = self._key(model_id, "band", band)
+                entries = self.cache.get(key)
+                entries = [e for e in (json.loads(entries) if entries else []) if e[1] != text_key]
+                entries = (entries + [[f"{bits:x}", text_key]])[-MAX_BAND_ENTRIES:]
+                self.cache.put(key, json.dumps(entries).encode("utf-8"))
+
+    def _lookup(self, model_id: str, page: Page) -> Tuple[Optional[str], str, Optional[int]]:
+        """(cached text or None, text key, dHash when perceptual)"""
+        text_key = self._key(model_id, "text", content_digest(page))
+        cached = self.cache.get(text_key)
+        if cached is not None:
+            self._count("exact")
+            return cached.decode("utf-8"), text_key, None
+
+        bits = None
+        if self.max_distance is not None:
+            bits = dhash(page)
+            near_key = self._nearest(model_id, bits)
+            cached = self.cache.get(near_key) if near_key else None
+            if cached is not None:
+                self._count("perceptual")
+                # This exact image hits directly next time
+                self.cache.put(text_key, cached)
+                return cached.decode("utf-8"), text_key, bits
+
+        self._count("miss")
+        return None, text_key, bits
+
+    def _store(self, model_id: str, text_key: str, bits: Optional[int], text: str) -> None:
+        self.cache.put(text_key, text.encode("utf-8"))
+        if bits is not None:
+            self._index(model_id, bits, text_key)
+
+    def get_or_extract(self, model_id: str, page: Page, extract: Callable[[], str]) -> str:
+        """The cached text of `page`, or `extract()`, which is then cached"""
+        text, text_key, bits = self._lookup(model_id, page)
+        if text is None:
+            text = extract()
+            self._store(model_id, text_key, bits, text)
+        return text
+
+    async def aget_or_extract(self, model_id: str, page: Page, extract: Callable[[], Awaitable[str]]) -> str:
+        """Async `get_or_extract`; lookups are quick local work and stay on the event loop"""
+        text, text_key, bits = self._lookup(model_id, page)
+        if text is None:
+            text = await extract()
+            self._store(model_id, text_key, bits, text)
+        return text
+
+
+def ocr_cache_from_env(registry: Optional[MetricsRegistry] = None, prompt: str = "") -> Optional[OCRCache]:
+    """An OCRCache configured from OCR_CACHE*, or None when OCR_CACHE is off"""
+    mode = (os.environ.get("OCR_CACHE") or "off").lower()
+    if mode in ("off", "0", "false"):
+        return None
+    if mode not in ("memory", "disk"):
+        raise ValueError(f"OCR_CACHE must be off, memory or disk, got {mode!r}")
+    match = (os.environ.get("OCR_CACHE_MATCH") or "exact").lower()
+    if match not in CACHE_MATCHES:
+        raise ValueError(f"OCR_CACHE_MATCH must be one of {', '.join(CACHE_MATCHES)}, got {match!r}")
+
+    cache = ResponseCache(
+        path=(os.environ.get("OCR_CACHE_PATH") or DEFAULT_PATH) if mode == "disk" else None,
+        max_disk_bytes=int(os.environ.get("OCR_CACHE_MAX_BYTES") or DEFAULT_MAX_BYTES),
+    )
+    distance = int(os.environ.get("OCR_CACHE_DISTANCE") or DEFAULT_MAX_DISTANCE)
+    return OCRCache(cache, max_distance=distance if match == "perceptual" else None,
+                    registry=registry, prompt=prompt)
@@ -0,0 +1,150 @@
+"""
+Per-Tool Concurrency Limits and Timeouts for ToolNode
+
+With parallel tool calls, one model turn can ask for several tools at once
+("OCR these three receipts and divide the totals"). `ToolNode` already runs
+the calls of a turn concurrently: in its thread pool under `graph.invoke`,
+and with `asyncio.gather` under `graph.ainvoke`. `ToolScheduler` hooks into
+its `wrap_tool_call` / `awrap_tool_call` to add, per tool:
+
+    max_concurrency  calls of that tool running at once; the rest wait their turn
+    timeout          seconds before the call is abandoned and the model gets an error
+
+How a tool runs depends on how it is defined. CPU tools like `divide` are
+plain functions and run on threads. I/O tools like `extract_text` also get a
+coroutine, so under `ainvoke` they wait on the network on the event loop
+instead of holding a thread each.
+
+A sync call that times out cannot be interrupted. Its thread keeps running
+in the background and holds its concurrency slot until it finishes, so the
+limit stays true.
+
+Usage:
+    scheduler = ToolScheduler({"extract_text": ToolLimits(max_concurrency=2, timeout=120)})
+    builder.add_node("tools", scheduler.tool_node(tools))
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langgraph.prebuilt import ToolNode
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+@dataclass(frozen=True)
+class ToolLimits:
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    timeout: Optional[float] = None  # seconds, None for no limit
+
+    @classmethod
+    def from_env(cls, tool_name: str, default: Optional["ToolLimits"] = None) -> "ToolLimits":
+        """`default` with <TOOL>_MAX_CONCURRENCY and <TOOL>_TIMEOUT overrides, e.g. EXTRACT_TEXT_TIMEOUT"""
+        default = default or cls()
+        prefix = tool_name.upper()
+        concurrency = os.environ.get(f"{prefix}_MAX_CONCURRENCY")
+        timeout = os.environ.get(f"{prefix}_TIMEOUT")
+        return cls(
+            max_concurrency=int(concurrency) if concurrency else default.max_concurrency,
+            timeout=float(timeout) if timeout else default.timeout,
+        )
+
+
+def _timeout_message(request, timeout: float) -> ToolMessage:
+    name = request.tool_call["name"]
+    return ToolMessage(
+        content=f"Error: {name} did not finish within {timeout:g} seconds. Try again later or with less input.",
+        name=name,
+        tool_call_id=request.tool_call["id"],
+        status="error",
+    )
+
+
+class ToolScheduler:
+    """
+    Concurrency limits and timeouts per tool name, applied through ToolNode's wrappers.
+
+    Args:
+        limits: Limits by tool name.
+        default: Limits of tools not listed.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, ToolLimits]] = None, default: ToolLimits = ToolLimits()):
+        self.limits = dict(limits or {})
+        self.default = default
+        self.timeouts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        # Event loops come and go between ainvoke calls; asyncio semaphores belong to one
+        self._async_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = \
+            weakref.WeakKeyDictionary()
+        # Sync calls with a timeout run here, so the ToolNode thread can stop waiting
+        self._pool = ContextThreadPoolExecutor(thread_name_prefix="tool-timeout")
+
+    def limits_for(self, name: str) -> ToolLimits:
+        return self.limits.get(name, self.default)
+
+    def _count_timeout(self, name: str) -> None:
+        with self._lock:
+            self.timeouts[name] = self.timeouts.get(name, 0) + 1
+
+    def _slot(self, name: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slot = self._slots.get(name)
+            if slot is None:
+                slot = self._slots[name] = threading.BoundedSemaphore(self.limits_for(name).max_concurrency)
+            return slot
+
+    def _async_slot(self, name: str) -> asyncio.Semaphore:
+        with self._lock:
+            slots = self._async_slots.setdefault(asyncio.get_running_loop(), {})
+            slot = slots.get(name)
+            if slot is None:
+                slot = slots[name] = asyncio.Semaphore(self.limits_for(name).max_concurrency)
+            return slot
+
+    def wrap(self, request, execute):
+        """ToolNode `wrap_tool_call`: runs on one of ToolNode's threads under graph.invoke"""
+        name = request.tool_call["name"]
+        timeout = self.limits_for(name).timeout
+        slot = self._slot(name)
+        slot.acquire()
+        if timeout is None:
+            try:
+                return execute(request)
+            finally:
+                slot.release()
+
+        def run():
+            try:
+                return execute(request)
+            finally:
+                slot.release()
+
+        future = self._pool.submit(run)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self._count_timeout(name)
+            return _timeout_message(request, timeout)
+
+    async def awrap(self, request, execute):
+        """ToolNode `awrap_tool_call`: one coroutine per call under graph.ainvoke"""
+        name = request.tool_call["name"]
+        timeout = self.limits_for(name).timeout
+        async with self._async_slot(name):
+            try:
+                return await asyncio.wait_for(execute(request), timeout)
+            except asyncio.TimeoutError:
+                self._count_timeout(name)
+                return _timeout_message(request, timeout)
+
+    def tool_node(self, tools, **kwargs) -> ToolNode:
+        return ToolNode(tools, wrap_tool_call=self.wrap, awrap_tool_call=self.awrap, **kwargs)
@@ -0,0 +1,117 @@
+"""
+Upload-Once Page Images with the Anthropic Files API
+
+Inline images travel as base64 inside every request that uses them. In
+upload mode each distinct page image is uploaded once, streamed from its
+file in chunks, and later requests refer to it by id:
+
+    {"type": "image", "source": {"type": "file", "file_id": "file_011CNha8iCJcU1wXNR6q4V8w"}}
+
+Ids are keyed by the SHA-256 of the image bytes, so the same scan OCR'd
+again (or the same page in two documents) is not uploaded twice. With a
+path, the id map is kept in a JSON file and survives restarts.
+
+Environment Variables:
+    OCR_UPLOAD_MODE - inline (default) or files
+    OCR_FILE_IDS_PATH - (Optional) JSON file remembering uploaded ids
+
+Usage:
+    files = VisionFileStore.for_model(vision_llm, path="ocr_file_ids.json")
+    block = {"type": "image", "source": {"type": "file", "file_id": files.file_id(page)}}
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Dict, Optional
+
+from documents import Page
+
+if TYPE_CHECKING:
+    import anthropic
+    from langchain_anthropic import ChatAnthropic
+
+FILES_API_BETA = "files-api-2025-04-14"
+UPLOAD_MODES = ("inline", "files")
+
+EXTENSIONS = {"image/png": ".png", "image/jpeg": ".jpg", "image/gif": ".gif", "image/webp": ".webp"}
+
+
+class VisionFileStore:
+    """Content hash -> Files API id, so each distinct page image is uploaded once"""
+
+    def __init__(self, client: "anthropic.Anthropic", path: Optional[str] = None):
+        self.client = client
+        self.path = path
+        self.uploads = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._ids: Dict[str, str] = {}
+        self._uploading: Dict[str, threading.Lock] = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._ids = json.load(f)
+
+    @classmethod
+    def for_model(cls, model: "ChatAnthropic", path: Optional[str] = None) -> "VisionFileStore":
+        """A store uploading with the same key, endpoint and headers as `model`"""
+        import anthropic
+
+        client = anthropic.Anthropic(
+            api_key=model.anthropic_api_key.get_secret_value(),
+            base_url=model.anthropic_api_url,
+            max_retries=model.max_retries,
+            default_headers=model.default_headers,
+        )
+        return cls(client, path)
+
+    def _cached(self, digest: str) -> Optional[str]:
+        with self._lock:
+            cached = self._ids.get(digest)
+            if cached:
+                self.hits += 1
+            return cached
+
+    def file_id(self, page: Page) -> str:
+        with page.buffer() as buffer:
+            digest = hashlib.sha256(buffer).hexdigest()
+        cached = self._cached(digest)
+        if cached:
+            return cached
+
+        # Identical pages OCR'd concurrently wait for one upload instead of each making their own
+        with self._lock:
+            upload_lock = self._uploading.setdefault(digest, threading.Lock())
+        with upload_lock:
+            cached = self._cached(digest)
+            if cached:
+                return cached
+            with page.open() as f:
+                name = f"page-{page.number}{EXTENSIONS.get(page.mime_type, '')}"
+                metadata = self.client.beta.files.upload(file=(name, f, page.mime_type), betas=[FILES_API_BETA])
+            with self._lock:
+                self._ids[digest] = metadata.id
+                self._uploading.pop(digest, None)
+                self.uploads += 1
+                if self.path:
+                    self._save()
+        return metadata.id
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._ids, f)
+        os.replace(tmp, self.path)
+
+
+def vision_file_store_from_env(model: "ChatAnthropic") -> Optional[VisionFileStore]:
+    """A store when OCR_UPLOAD_MODE=files, or None to send images inline"""
+    mode = (os.environ.get("OCR_UPLOAD_MODE") or "inline").lower()
+    if mode not in UPLOAD_MODES:
+        raise ValueError(f"OCR_UPLOAD_MODE must be one of {', '.join(UPLOAD_MODES)}, got {mode!r}")
+    if mode == "inline":
+        return None
+    return VisionFileStore.for_model(model, os.environ.get("OCR_FILE_IDS_PATH") or None)
@@ -0,0 +1,226 @@
+"""
+Local Stub of the Anthropic Messages API for Vision Benchmarks
+
+Answers POST /v1/messages like a vision model would, without a network or
+an API key, and accounts for what the client sent:
+
+- Each request waits `latency` seconds plus the time its body would take to
+  upload at `bandwidth` bytes/sec, plus `token_latency` per image token.
+- Image tokens are estimated the way Anthropic documents them,
+  width * height / 750, from the decoded image.
+- POST /v1/files accepts Files API uploads; images may then refer to them
+  with {"type": "file", "file_id": ...} sources.
+- Prompt caching: the prefix up to each `cache_control` block is remembered,
+  and a later request that starts with a remembered prefix reports it as
+  `cache_read_input_tokens`. Text is counted as one token per 4 characters,
+  and text not read from the cache costs `prefill_latency` per token.
+
+GET /stats returns the totals since the last GET /reset, which also empties the prompt cache:
+    {"requests": 12, "uploads": 0, "bytes_received": 1834211, "image_tokens": 14880, "images": 12,
+     "input_tokens": 15400, "cache_read_tokens": 0, "cache_write_tokens": 0}
+
+The stub runs in a child process so it doesn't compete with the client for the GIL.
+
+Usage:
+    base_url = start_stub(latency=0.5, bandwidth=1_250_000)
+    model = ChatAnthropic(base_url=base_url, anthropic_api_key="stub", model="claude-haiku-4-5-20251001")
+"""
+
+import asyncio
+import base64
+import email.parser
+import email.policy
+import hashlib
+import io
+import json
+import multiprocessing
+from urllib.request import urlopen
+
+from PIL import Image
+
+IMAGE_TOKEN_PIXELS = 750
+TEXT_TOKEN_CHARS = 4
+
+
+class VisionStub:
+    def __init__(self, latency: float, bandwidth: float, token_latency: float, prefill_latency: float = 0.0):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.token_latency = token_latency
+        self.prefill_latency = prefill_latency
+        # file id -> image tokens of the uploaded image
+        self.files = {}
+        # digests of the cached prompt prefixes
+        self.prompt_cache = set()
+        self.reset()
+
+    def reset(self):
+        self.stats = {"requests": 0, "uploads": 0, "bytes_received": 0, "image_tokens": 0, "images": 0,
+                      "input_tokens": 0, "cache_read_tokens": 0, "cache_write_tokens": 0}
+        self.prompt_cache.clear()
+
+    @staticmethod
+    def tokens_of(data: bytes) -> int:
+        with Image.open(io.BytesIO(data)) as image:
+            return -(-image.width * image.height // IMAGE_TOKEN_PIXELS)
+
+    def image_tokens(self, request) -> int:
+        tokens = 0
+        for message in request.get("messages", []):
+            content = message.get("content")
+            if isinstance(content, str):
+                continue
+            for block in content:
+                if block.get("type") != "image":
+                    continue
+                source = block["source"]
+                if source.get("type") == "base64":
+                    tokens += self.tokens_of(base64.b64decode(source["data"]))
+                elif source.get("type") == "file":
+                    tokens += self.files[source["file_id"]]
+                self.stats["images"] += 1
+        return tokens
+
+    @staticmethod
+    def prompt_blocks(request):
+        """Every block of the prompt in cache order: tools, system, then messages"""
+        for tool in request.get("tools", []):
+            yield "tools", tool
+        system = request.get("system") or []
+        for block in ([{"type": "text", "text": system}] if isinstance(system, str) else system):
+            yield "system", block
+        for message in request.get("messages", []):
+            content = message["content"]
+            for block in ([{"type": "text", "text": content}] if isinstance(content, str) else content):
+                yield message["role"], block
+
+    def prompt_tokens(self, request, image_tokens: int):
+        """(uncached, cache write, cache read) input tokens, remembering the prefix at each breakpoint"""
+        blocks = list(self.prompt_blocks(request))
+        last_breakpoint = max((i for i, (_, block) in enumerate(blocks) if "cache_control" in block), default=-1)
+        digest = hashlib.sha256(request["model"].encode("utf-8"))
+        total = read = written = 0
+        for i, (role, block) in enumerate(blocks):
+            block = {key: value for key, value in block.items() if key != "cache_control"}
+            encoded = json.dumps([role, block], sort_keys=True).encode("utf-8")
+            digest.update(encoded)
+            if block.get("type") != "image":
+                total += -(-len(encoded) // TEXT_TOKEN_CHARS)
+            if i > last_breakpoint:
+                continue
+            key = digest.hexdigest()
+            if key in self.prompt_cache:
+                read = total
+            elif "cache_control" in blocks[i][1]:
+                self.prompt_cache.add(key)
+            if i == last_breakpoint:
+                written = total - read
+        total += image_tokens
+        return total - read - written, written, read
+
+    def upload(self, content_type: str, body: bytes):
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body)
+        part = next(p for p in message.iter_parts() if p.get_param("name", header="content-disposition") == "file")
+        data = part.get_payload(decode=True)
+        file_id = f"file_stub_{len(self.files)}"
+        self.files[file_id] = self.tokens_of(data)
+        self.stats["uploads"] += 1
+        return {"id": file_id, "type": "file", "filename": part.get_filename(), "mime_type": part.get_content_type(),
+                "size_bytes": len(data), "created_at": "2025-01-01T00:00:00Z", "downloadable": False}
+
+    @staticmethod
+    async def read_body(reader, headers) -> bytes:
+        if headers.get("transfer-encoding", "").lower() != "chunked":
+            return await reader.readexactly(int(headers.get("content-length", 0)))
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            chunk = await reader.readexactly(size + 2)
+            if size == 0:
+                return b"".join(chunks)
+            chunks.append(chunk[:-2])
+
+    def reply(self, request, image_tokens: int, prompt_tokens):
+        return {
+            "id": f"msg_stub_{self.stats['requests']}",
+            "type": "message",
+            "role": "assistant",
+            "model": request["model"],
+            "content": [{"type": "text", "text": f"Extracted text ({image_tokens} image tokens)"}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": prompt_tokens[0], "output_tokens": 10,
+                      "cache_creation_input_tokens": prompt_tokens[1], "cache_read_input_tokens": prompt_tokens[2]},
+        }
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await self.read_body(reader, headers)
+
+                if request_line.startswith(b"GET /reset"):
+                    self.reset()
+                if request_line.startswith(b"GET "):
+                    payload = json.dumps(self.stats).encode("utf-8")
+                elif request_line.startswith(b"POST /v1/files"):
+                    self.stats["bytes_received"] += len(body)
+                    await asyncio.sleep(self.latency + len(body) / self.bandwidth)
+                    payload = json.dumps(self.upload(headers["content-type"], body)).encode("utf-8")
+                else:
+                    request = json.loads(body)
+                    tokens = self.image_tokens(request)
+                    prompt_tokens = self.prompt_tokens(request, tokens)
+                    uncached, written, read = prompt_tokens
+                    self.stats["requests"] += 1
+                    self.stats["bytes_received"] += len(body)
+                    self.stats["image_tokens"] += tokens
+                    self.stats["input_tokens"] += uncached + written + read
+                    self.stats["cache_write_tokens"] += written
+                    self.stats["cache_read_tokens"] += read
+                    prefill = max(uncached + written - tokens, 0) * self.prefill_latency
+                    await asyncio.sleep(self.latency + len(body) / self.bandwidth + tokens * self.token_latency + prefill)
+                    payload = json.dumps(self.reply(request, tokens, prompt_tokens)).encode("utf-8")
+
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n" % len(payload) + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, port_queue):
+        server = await asyncio.start_server(self.handle, "127.0.0.1", 0, backlog=256)
+        port_queue.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+
+def _serve_stub(latency, bandwidth, token_latency, prefill_latency, port_queue):
+    asyncio.run(VisionStub(latency, bandwidth, token_latency, prefill_latency).serve(port_queue))
+
+
+def start_stub(latency: float = 0.5, bandwidth: float = 1_250_000, token_latency: float = 0.0002,
+               prefill_latency: float = 0.0) -> str:
+    """Start the stub in a daemon child process and return its base URL"""
+    port_queue = multiprocessing.Queue()
+    multiprocessing.Process(target=_serve_stub, args=(latency, bandwidth, token_latency, prefill_latency, port_queue),
+                            daemon=True).start()
+    return f"http://127.0.0.1:{port_queue.get(timeout=30)}"
+
+
+def stub_stats(base_url: str, reset: bool = False) -> dict:
+    with urlopen(f"{base_url}/{'reset' if reset else 'stats'}") as response:
+        return json.loads(response.read())
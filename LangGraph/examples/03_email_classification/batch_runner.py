@@ -0,0 +1,198 @@
+"""
+Batch Email Runner
+
+Runs the compiled email graph over many emails with bounded concurrency.
+Emails are pulled from the source only when a slot is free, so a slow model
+applies backpressure to the producer instead of queueing the whole inbox in
+memory. Results are yielded as soon as each email finishes, not in input order.
+
+With a checkpointed graph and a `message_id` function, runs are resumable:
+each email becomes its own thread, keyed by message id. Emails that already
+finished are skipped, and emails that were interrupted continue from their
+last checkpoint instead of starting over (and being billed again).
+
+Installations:
+    pip install langgraph langchain-anthropic python-dotenv
+
+Usage:
+    from spam_email_agent_claude import compiled_graph
+    from batch_runner import process_emails_sync
+
+    for item in process_emails_sync(compiled_graph, emails, max_concurrency=16):
+        print(item.index, item.result["is_spam"])
+
+    # Resumable: rerunning the same batch after a crash only finishes what's left
+    graph = build_graph(checkpointer=GroupCommitSqliteSaver.from_path("email_checkpoints.sqlite"))
+    for item in process_emails_sync(graph, emails, message_id=default_message_id):
+        print(item.index, item.status)
+"""
+
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Union
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+EmailSource = Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]
+
+
+@dataclass
+class BatchResult:
+    # Position of the email in the source stream
+    index: int
+
+    # The email as it was received
+    email: Dict[str, Any]
+
+    # Final graph state, or None if the run failed
+    result: Optional[Dict[str, Any]] = None
+
+    # The exception raised by the run, if any
+    error: Optional[BaseException] = None
+
+    # "new", "resumed" (continued from a checkpoint) or "skipped" (already finished)
+    status: str = "new"
+
+
+def default_message_id(email: Dict[str, Any]) -> str:
+    """The email's message_id, or a content hash when it has none"""
+    if email.get("message_id"):
+        return str(email["message_id"])
+    content = "\0".join(str(email.get(field, "")) for field in ("sender", "subject", "body"))
+    return "sha256:" + hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+async def _aiter_source(emails: EmailSource) -> AsyncIterator[Dict[str, Any]]:
+    if hasattr(emails, "__aiter__"):
+        async for email in emails:
+            yield email
+    else:
+        for email in emails:
+            yield email
+
+
+async def process_emails(
+    graph: Runnable,
+    emails: EmailSource,
+    max_concurrency: int = 8,
+    config: Optional[RunnableConfig] = None,
+    make_state: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    return_exceptions: bool = True,
+    message_id: Optional[Callable[[Dict[str, Any]], str]] = None,
+) -> AsyncIterator[BatchResult]:
+    """
+    Run `graph.ainvoke` over a stream of emails, keeping at most
+    `max_concurrency` runs in flight, and yield results as they complete.
+
+    Args:
+        graph: A compiled email graph.
+        emails: An iterable or async iterable of email dicts.
+        max_concurrency: Upper bound on emails processed at the same time.
+        config: RunnableConfig passed to every run (callbacks, tags, ...).
+        make_state: Builds the graph input for one email; `email_pipeline.new_email_state` by default.
+        return_exceptions: Yield failed runs as results instead of raising.
+        message_id: For graphs compiled with a checkpointer: maps an email to
+            its thread id, so finished emails are skipped and interrupted ones
+            resume from their last checkpoint.
+
+    Synchronous nodes are executed in the running loop's default executor, so
+    its thread count caps effective concurrency for sync graphs. Graphs with
+    async nodes (like `email_pipeline.compiled_graph`) never touch the
+    executor, so `max_concurrency` can run into the hundreds on one thread.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    if make_state is None:
+        # Imported here: email_pipeline imports this module
+        from email_pipeline import new_email_state as make_state
+
+    async def run_one(index: int, email: Dict[str, Any]) -> BatchResult:
+        try:
+            if message_id is None:
+                result = await graph.ainvoke(make_state(email), config=config)
+                return BatchResult(index=index, email=email, result=result)
+
+            run_config = dict(config or {})
+            run_config["configurable"] = {**run_config.get("configurable", {}), "thread_id": message_id(email)}
+            snapshot = await graph.aget_state(run_config)
+            if snapshot.created_at is None:
+                result = await graph.ainvoke(make_state(email), config=run_config)
+                return BatchResult(index=index, email=email, result=result)
+            if not snapshot.next:
+                return BatchResult(index=index, email=email, result=snapshot.values, status="skipped")
+            # Passing None continues the thread from its last checkpoint
+            result = await graph.ainvoke(None, config=run_config)
+            return BatchResult(index=index, email=email, result=result, status="resumed")
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            return BatchResult(index=index, email=email, error=e)
+
+    source = _aiter_source(emails).__aiter__()
+    in_flight = set()
+    next_index = 0
+    exhausted = False
+
+    try:
+        while True:
+            # Top up to the concurrency limit; the source is only read when a slot is free
+            while not exhausted and len(in_flight) < max_concurrency:
+                try:
+                    email = await source.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                in_flight.add(asyncio.ensure_future(run_one(next_index, email)))
+                next_index += 1
+
+            if not in_flight:
+                return
+
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # Consumer stopped early or a run raised: don't leave orphaned runs behind
+        for task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        await source.aclose()
+
+
+def process_emails_sync(
+    graph: Runnable,
+    emails: Iterable[Dict[str, Any]],
+    max_concurrency: int = 8,
+    config: Optional[RunnableConfig] = None,
+    make_state: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    return_exceptions: bool = True,
+    message_id: Optional[Callable[[Dict[str, Any]], str]] = None,
+) -> Iterator[BatchResult]:
+    """Blocking wrapper around `process_emails` for scripts without an event loop."""
+    loop = asyncio.new_event_loop()
+    # Synchronous nodes run in the loop's default executor, so size it to the concurrency limit
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+    loop.set_default_executor(executor)
+    results = process_emails(
+        graph,
+        emails,
+        max_concurrency=max_concurrency,
+        config=config,
+        make_state=make_state,
+        return_exceptions=return_exceptions,
+        message_id=message_id,
+    )
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(results.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(results.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+        executor.shutdown(wait=False)
@@ -0,0 +1,256 @@
+"""
+Async Graph Benchmark
+
+Runs the email graph against a local HTTP stub of the Anthropic Messages API
+that answers after a fixed delay, so real ChatAnthropic clients, connection
+pools and HTTP parsing are exercised without a network or API key. Two modes
+are compared at each concurrency level:
+
+    threads  `compiled_graph.invoke` on a thread pool, one thread per in-flight email
+    async    `batch_runner.process_emails` on one event loop, using the async
+             nodes and the shared pooled client
+
+For each run it reports emails/sec, the peak number of requests the stub saw
+at once, and the peak thread count of the process.
+
+Usage:
+    python benchmark_async.py --emails 600 --latency 0.2 --concurrency 50 200 500
+
+The stub runs in a child process so it does not compete with the graph for the GIL.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+
+# The pipeline builds no clients until a graph runs; the models are replaced below
+from langchain_anthropic import ChatAnthropic
+
+import email_pipeline as agent
+from batch_runner import process_emails
+from classification import CLASSIFY_MAX_TOKENS, structured_classifier
+from fake_model import SPAM_MARKERS
+from http_pool import share_async_client
+
+# Spam the local pre-filter is unsure about, so it reaches the LLM like legitimate mail does
+PHISHING_EMAIL = {
+    "sender": "support@paypa1-security.net",
+    "subject": "Your account has been limited",
+    "body": "We noticed unusual activity. Please verify your identity within 24 hours or your account will be closed.",
+}
+
+
+class MessagesStub:
+    """
+    Minimal HTTP/1.1 keep-alive server answering POST /v1/messages after `latency` seconds.
+
+    GET /stats returns the peak number of concurrent requests since the last
+    GET /reset.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def reply(self, request):
+        content = request["messages"][-1]["content"]
+        if not isinstance(content, str):
+            content = "".join(block.get("text", "") for block in content)
+        is_spam = any(marker in content.lower() for marker in SPAM_MARKERS)
+        if request.get("tools"):
+            args = {"is_spam": True, "reason": "Asks the reader to verify their identity."} if is_spam \
+                else {"is_spam": False, "category": "inquiry"}
+            blocks = [{"type": "tool_use", "id": "toolu_stub", "name": request["tools"][0]["name"], "input": args}]
+            stop_reason = "tool_use"
+        else:
+            blocks = [{"type": "text", "text": "Dear Sir or Madam,\n\nThank you for your email. Mr. Hugg will get back to you shortly.\n\nKind regards,\nAlfred"}]
+            stop_reason = "end_turn"
+        return {
+            "id": f"msg_stub_{self.requests}",
+            "type": "message",
+            "role": "assistant",
+            "model": request["model"],
+            "content": blocks,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {"input_tokens": len(content) // 4, "output_tokens": 40},
+        }
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                if request_line.startswith(b"GET /reset"):
+                    self.peak_in_flight = 0
+                if request_line.startswith(b"GET "):
+                    payload = json.dumps({"peak_in_flight": self.peak_in_flight}).encode("utf-8")
+                else:
+                    # Everything runs on one loop, so the counters need no lock
+                    self.requests += 1
+                    self.in_flight += 1
+                    self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                    await asyncio.sleep(self.latency)
+                    self.in_flight -= 1
+                    payload = json.dumps(self.reply(json.loads(body))).encode("utf-8")
+
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n" % len(payload) + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, port_queue):
+        server = await asyncio.start_server(self.handle, "127.0.0.1", 0, backlog=2048)
+        port_queue.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+
+def _serve_stub(latency, port_queue):
+    asyncio.run(MessagesStub(latency).serve(port_queue))
+
+
+def start_stub(latency):
+    """Start the stub in a daemon child process and return its base URL"""
+    port_queue = multiprocessing.Queue()
+    multiprocessing.Process(target=_serve_stub, args=(latency, port_queue), daemon=True).start()
+    return f"http://127.0.0.1:{port_queue.get(timeout=30)}"
+
+
+def stub_stats(base_url, reset=False):
+    with urlopen(f"{base_url}/{'reset' if reset else 'stats'}") as response:
+        return json.loads(response.read())
+
+
+class ThreadSampler:
+    """Records the peak thread count of the process while active"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, threading.active_count())
+            self._stop.wait(self.interval)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def use_stub(base_url):
+    """Point the agent's models at the stub"""
+    def make(max_tokens, temperature):
+        return ChatAnthropic(
+            anthropic_api_key="benchmark",
+            base_url=base_url,
+            model="claude-haiku-4-5-20251001",
+            temperature=temperature,
+            max_tokens=max_tokens,
+            max_retries=0,
+        )
+
+    agent.model = make(1024, 0.7)
+    agent.classifier_llm = make(CLASSIFY_MAX_TOKENS, 0)
+    agent.classifier = structured_classifier(agent.classifier_llm)
+
+
+def make_emails(n):
+    samples = [agent.legitimate_email, PHISHING_EMAIL, agent.spam_email]
+    return [dict(samples[i % len(samples)], id=i) for i in range(n)]
+
+
+def run_threads(emails, concurrency):
+    failures = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(agent.compiled_graph.invoke, agent.new_email_state(email)) for email in emails]
+        for future in futures:
+            failures += future.exception() is not None
+    return failures
+
+
+async def run_async(emails, concurrency):
+    failures = 0
+    async for item in process_emails(agent.compiled_graph, emails, max_concurrency=concurrency,
+                                     make_state=agent.new_email_state):
+        failures += item.error is not None
+    return failures
+
+
+def report(label, base_url, sampler, elapsed, n, failures):
+    note = f"  ({failures} failed)" if failures else ""
+    peak = stub_stats(base_url)["peak_in_flight"]
+    print(f"{label:<16}{elapsed:>9.2f}{n / elapsed:>13.1f}{peak:>14}{sampler.peak:>10}{note}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=600, help="number of emails per run")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub response delay, in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 500])
+    args = parser.parse_args()
+
+    base_url = start_stub(args.latency)
+    use_stub(base_url)
+    emails = make_emails(args.emails)
+
+    print(f"{args.emails} emails, stub latency {args.latency * 1000:.0f} ms/request\n")
+    print(f"{'mode':<16}{'seconds':>9}{'emails/sec':>13}{'peak requests':>14}{'threads':>10}")
+
+    for concurrency in args.concurrency:
+        stub_stats(base_url, reset=True)
+        with contextlib.redirect_stdout(io.StringIO()), ThreadSampler() as sampler:
+            start = time.perf_counter()
+            failures = run_threads(emails, concurrency)
+            elapsed = time.perf_counter() - start
+        report(f"threads c={concurrency}", base_url, sampler, elapsed, args.emails, failures)
+
+    async def async_runs():
+        # One pooled client for both models, opened on this loop and closed at the end
+        client = share_async_client(agent.model, agent.classifier_llm)
+        try:
+            for concurrency in args.concurrency:
+                stub_stats(base_url, reset=True)
+                with contextlib.redirect_stdout(io.StringIO()), ThreadSampler() as sampler:
+                    start = time.perf_counter()
+                    failures = await run_async(emails, concurrency)
+                    elapsed = time.perf_counter() - start
+                report(f"async c={concurrency}", base_url, sampler, elapsed, args.emails, failures)
+        finally:
+            await client.close()
+
+    asyncio.run(async_runs())
+
+
+if __name__ == "__main__":
+    main()
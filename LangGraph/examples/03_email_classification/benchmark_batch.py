@@ -0,0 +1,75 @@
+"""
+Batch Throughput Benchmark
+
+Measures emails/sec for the email graph when run serially with `invoke` and
+through `batch_runner.process_emails_sync` at increasing concurrency limits.
+The Claude model is swapped for a local fake with a fixed per-call latency,
+so the numbers reflect graph and scheduling overhead rather than the network.
+
+Usage:
+    python benchmark_batch.py --emails 200 --latency 0.05 --concurrency 1 4 16 64
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+# The pipeline builds no clients until a graph runs; the models are replaced below
+import email_pipeline as agent
+from batch_runner import process_emails_sync
+from classification import structured_classifier
+from fake_model import FakeEmailModel
+
+
+def make_emails(n):
+    """Alternate the bundled spam and legitimate samples"""
+    samples = [agent.spam_email, agent.legitimate_email]
+    return [dict(samples[i % 2], id=i) for i in range(n)]
+
+
+def run_serial(emails):
+    for email in emails:
+        agent.compiled_graph.invoke(agent.new_email_state(email))
+
+
+def run_batch(emails, concurrency):
+    failures = 0
+    for item in process_emails_sync(agent.compiled_graph, emails, max_concurrency=concurrency):
+        failures += item.error is not None
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=200, help="number of emails per run")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake model latency per call, in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    agent.model = FakeEmailModel(latency=args.latency)
+    agent.classifier = structured_classifier(FakeEmailModel(latency=args.latency))
+    emails = make_emails(args.emails)
+
+    print(f"{args.emails} emails, fake model latency {args.latency * 1000:.0f} ms/call\n")
+    print(f"{'mode':<18}{'seconds':>10}{'emails/sec':>14}{'speedup':>10}")
+
+    # Node output is printed per email; keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        run_serial(emails)
+        serial = time.perf_counter() - start
+    print(f"{'serial invoke':<18}{serial:>10.2f}{args.emails / serial:>14.1f}{1.0:>10.1f}x")
+
+    for concurrency in args.concurrency:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            failures = run_batch(emails, concurrency)
+            elapsed = time.perf_counter() - start
+        label = f"batch c={concurrency}"
+        note = f"  ({failures} failed)" if failures else ""
+        print(f"{label:<18}{elapsed:>10.2f}{args.emails / elapsed:>14.1f}{serial / elapsed:>10.1f}x{note}")
+
+
+if __name__ == "__main__":
+    main()
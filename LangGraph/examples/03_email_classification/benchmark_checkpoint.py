@@ -0,0 +1,124 @@
+"""
+Checkpointing Benchmark
+
+Measures what durable checkpoints cost the batch runner, then shows a
+crash-and-resume cycle. The models are local fakes with a fixed latency.
+
+Throughput is measured for three setups:
+
+    none          no checkpointer
+    per-write     GroupCommitSqliteSaver(max_batch=1, synchronous="FULL"): one synced
+                  commit per checkpoint write, like the stock SqliteSaver
+    group commit  GroupCommitSqliteSaver with the default batch size and delay
+
+For the resume check, every draft call fails on the first pass, which stands
+in for a crash. The second pass over the same emails reports how many were
+skipped, resumed or run from scratch, and how many model calls it needed.
+
+Usage:
+    python benchmark_checkpoint.py --emails 500 --latency 0.01 --concurrency 64
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+# The pipeline builds no clients until a graph runs; the models are replaced below
+import email_pipeline as agent
+from batch_runner import default_message_id, process_emails_sync
+from checkpointing import GroupCommitSqliteSaver
+from classification import structured_classifier
+from fake_model import FakeEmailModel
+
+# Spam the local pre-filter is unsure about, so it reaches the LLM like legitimate mail does
+PHISHING_EMAIL = {
+    "sender": "support@paypa1-security.net",
+    "subject": "Your account has been limited",
+    "body": "We noticed unusual activity. Please verify your identity within 24 hours or your account will be closed.",
+}
+
+
+class CountingModel(FakeEmailModel):
+    """Fake model that counts its calls and can be told to fail"""
+
+    calls: int = 0
+    fail: bool = False
+
+    def _result(self, messages, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("simulated crash")
+        return super()._result(messages, **kwargs)
+
+
+def make_emails(n):
+    samples = [agent.legitimate_email, PHISHING_EMAIL, agent.spam_email]
+    return [dict(samples[i % len(samples)], message_id=f"<{i}@bench>") for i in range(n)]
+
+
+def run(graph, emails, concurrency, message_id=None):
+    statuses = {}
+    failures = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for item in process_emails_sync(graph, emails, max_concurrency=concurrency,
+                                        make_state=agent.new_email_state, message_id=message_id):
+            failures += item.error is not None
+            statuses[item.status] = statuses.get(item.status, 0) + 1
+    return statuses, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.01, help="fake model latency per call, in seconds")
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    draft_model = CountingModel(latency=args.latency)
+    classifier_model = CountingModel(latency=args.latency)
+    agent.model = draft_model
+    agent.classifier = structured_classifier(classifier_model)
+    emails = make_emails(args.emails)
+    workdir = tempfile.mkdtemp(prefix="email-checkpoints-")
+
+    print(f"{args.emails} emails, fake model latency {args.latency * 1000:.0f} ms/call, concurrency {args.concurrency}\n")
+    print(f"{'checkpointer':<14}{'seconds':>9}{'emails/sec':>13}{'writes':>9}{'commits':>9}")
+
+    setups = [("none", None), ("per-write", {"max_batch": 1, "synchronous": "FULL"}), ("group commit", {})]
+    for label, options in setups:
+        saver = None
+        if options is not None:
+            saver = GroupCommitSqliteSaver.from_path(os.path.join(workdir, f"{label}.sqlite"), **options)
+        graph = agent.build_graph(checkpointer=saver)
+        start = time.perf_counter()
+        run(graph, emails, args.concurrency, message_id=default_message_id if saver else None)
+        elapsed = time.perf_counter() - start
+        stats = saver.commit_stats() if saver else {"writes": "-", "commits": "-"}
+        print(f"{label:<14}{elapsed:>9.2f}{args.emails / elapsed:>13.1f}{stats['writes']:>9}{stats['commits']:>9}")
+        if saver:
+            saver.close()
+
+    # Crash and resume: drafts fail on the first pass, then the batch is rerun as-is
+    path = os.path.join(workdir, "resume.sqlite")
+    saver = GroupCommitSqliteSaver.from_path(path)
+    graph = agent.build_graph(checkpointer=saver)
+    draft_model.fail = True
+    _, failures = run(graph, emails, args.concurrency, message_id=default_message_id)
+    saver.close()
+    print(f"\nFirst pass: {failures} emails interrupted in draft_response")
+
+    draft_model.fail = False
+    draft_model.calls = classifier_model.calls = 0
+    saver = GroupCommitSqliteSaver.from_path(path)
+    graph = agent.build_graph(checkpointer=saver)
+    statuses, failures = run(graph, emails, args.concurrency, message_id=default_message_id)
+    saver.close()
+    print(f"Second pass: {statuses}, {failures} failed")
+    print(f"Model calls on the second pass: classify {classifier_model.calls}, draft {draft_model.calls}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Classification Prompt Benchmark
+
+Compares the original free-text classification prompt with the structured
+`EmailClassification` output on a real provider. For each email it records
+output tokens (from `usage_metadata`) and wall-clock latency, then prints the
+per-email averages for both variants.
+
+Installations:
+    pip install langgraph langchain-anthropic langchain-openai python-dotenv
+
+Usage:
+    python benchmark_classification.py --provider anthropic --repeats 5
+    python benchmark_classification.py --provider openai --repeats 5
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage
+
+from classification import CLASSIFY_MAX_TOKENS, classification_prompt, structured_classifier
+
+load_dotenv()
+
+# The prompt classify_email used before structured output, kept for comparison
+LEGACY_PROMPT = """
+    As Alfred the butler, analyze this email and determine if it is spam or legitimate.
+
+    Email:
+    From: {sender}
+    Subject: {subject}
+    Body: {body}
+
+    First, determine if this email is spam. If it is spam, explain why.
+    If it is legitimate, categorize it (inquiry, complaint, thank you, etc.).
+    """
+
+EMAILS = [
+    {
+        "sender": "winner@lottery-intl.com",
+        "subject": "YOU HAVE WON $5,000,000!!!",
+        "body": "CONGRATULATIONS! You have been selected as the winner of our international lottery! To claim your $5,000,000 prize, please send us your bank details and a processing fee of $100.",
+    },
+    {
+        "sender": "john.smith@example.com",
+        "subject": "Question about your services",
+        "body": "Dear Mr. Hugg, I was referred to you by a colleague and I'm interested in learning more about your consulting services. Could we schedule a call next week? Best regards, John Smith",
+    },
+    {
+        "sender": "support@paypa1-security.net",
+        "subject": "Your account has been limited",
+        "body": "We noticed unusual activity. Verify your identity within 24 hours at the link below or your account will be closed.",
+    },
+    {
+        "sender": "martha.kent@smallville.org",
+        "subject": "Thank you for the flowers",
+        "body": "Dear Mr. Hugg, thank you so much for the lovely flowers you sent for my birthday. They brightened up the whole farmhouse.",
+    },
+]
+
+
+def make_model(provider, max_tokens):
+    if provider == "anthropic":
+        from langchain_anthropic import ChatAnthropic
+        return ChatAnthropic(
+            anthropic_api_key=os.environ.get("ANTHROPIC_API_KEY"),
+            model="claude-haiku-4-5-20251001",
+            temperature=0,
+            max_tokens=max_tokens,
+        )
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        openai_api_key=os.environ.get("OPENAI_API_KEY"),
+        temperature=0,
+        max_tokens=max_tokens,
+    )
+
+
+def output_tokens(message):
+    usage = getattr(message, "usage_metadata", None) or {}
+    return usage.get("output_tokens", 0)
+
+
+def run_legacy(model, email):
+    prompt = LEGACY_PROMPT.format(**email)
+    start = time.perf_counter()
+    response = model.invoke([HumanMessage(content=prompt)])
+    return time.perf_counter() - start, output_tokens(response)
+
+
+def run_structured(classifier, email):
+    start = time.perf_counter()
+    output = classifier.invoke([HumanMessage(content=classification_prompt(email))])
+    return time.perf_counter() - start, output_tokens(output["raw"])
+
+
+def summarize(label, samples):
+    latencies = [s[0] * 1000 for s in samples]
+    tokens = [s[1] for s in samples]
+    print(
+        f"{label:<12}{statistics.mean(tokens):>14.1f}{statistics.mean(latencies):>16.0f}"
+        f"{statistics.median(latencies):>14.0f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provider", choices=["anthropic", "openai"], default="anthropic")
+    parser.add_argument("--repeats", type=int, default=3, help="passes over the sample emails")
+    args = parser.parse_args()
+
+    legacy_model = make_model(args.provider, max_tokens=1024)
+    classifier = structured_classifier(make_model(args.provider, max_tokens=CLASSIFY_MAX_TOKENS))
+
+    legacy, structured = [], []
+    for _ in range(args.repeats):
+        for email in EMAILS:
+            legacy.append(run_legacy(legacy_model, email))
+            structured.append(run_structured(classifier, email))
+
+    print(f"{args.provider}: {len(legacy)} classifications per variant\n")
+    print(f"{'variant':<12}{'output tok':>14}{'mean ms':>16}{'p50 ms':>14}")
+    summarize("free text", legacy)
+    summarize("structured", structured)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Metrics Overhead Benchmark
+
+Runs the same batch of emails three ways and reports wall time and CPU time:
+
+    off      no callbacks
+    no-op    a callback handler that does nothing
+    metrics  MetricsCallbackHandler
+
+Once any handler is attached, LangChain dispatches a start and an end event
+for every runnable in the graph; Langfuse pays that too. What the metrics
+handler adds on top is smaller than run-to-run noise, so it is also measured
+directly: the events of one batch are recorded, then replayed into a fresh
+MetricsCallbackHandler and into a no-op handler. The difference, as a share
+of the CPU time of the "off" run, is the number to keep under 1%.
+
+The models are local fakes with a fixed latency. Runs alternate between the
+setups and the best of `--repeats` is kept for each.
+
+The collected metrics are printed in Prometheus format at the end.
+
+Usage:
+    python benchmark_metrics.py --emails 300 --latency 0.05 --concurrency 8 --repeats 5
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+# The pipeline builds no clients until a graph runs; the models are replaced below
+import email_pipeline as agent
+from batch_runner import process_emails_sync
+from classification import structured_classifier
+from fake_model import FakeEmailModel
+from langchain_core.callbacks import BaseCallbackHandler
+from llm_metrics import to_prometheus
+from llm_metrics.callback import MetricsCallbackHandler
+
+# Spam the local pre-filter is unsure about, so the classifier node runs too
+PHISHING_EMAIL = {
+    "sender": "support@paypa1-security.net",
+    "subject": "Your account has been limited",
+    "body": "We noticed unusual activity. Please verify your identity within 24 hours or your account will be closed.",
+}
+
+
+EVENTS = ("on_chain_start", "on_chain_end", "on_chain_error",
+          "on_chat_model_start", "on_llm_start", "on_llm_end", "on_llm_error")
+
+
+class NoopHandler(BaseCallbackHandler):
+    """Handles every event the metrics handler does, and does nothing"""
+
+    run_inline = True
+
+    def _ignore(self, *args, **kwargs):
+        pass
+
+    on_chain_start = on_chain_end = on_chain_error = _ignore
+    on_chat_model_start = on_llm_start = on_llm_end = on_llm_error = _ignore
+
+
+class RecordingHandler(NoopHandler):
+    """Keeps every event so it can be replayed into another handler"""
+
+    def __init__(self):
+        self.events = []
+        for name in EVENTS:
+            setattr(self, name, lambda *args, _name=name, **kwargs: self.events.append((_name, args, kwargs)))
+
+
+def replay_seconds(events, make_handler, repeats):
+    """Best time to feed `events` to a fresh handler"""
+    best = float("inf")
+    for _ in range(repeats):
+        handler = make_handler()
+        start = time.perf_counter()
+        for name, args, kwargs in events:
+            getattr(handler, name)(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def make_emails(n):
+    samples = [agent.legitimate_email, PHISHING_EMAIL, agent.spam_email]
+    return [dict(samples[i % len(samples)], id=i) for i in range(n)]
+
+
+def run(emails, concurrency, config):
+    """(wall seconds, CPU seconds) for one batch"""
+    wall, cpu = time.perf_counter(), time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for item in process_emails_sync(agent.compiled_graph, emails, max_concurrency=concurrency,
+                                        config=config, make_state=agent.new_email_state):
+            if item.error is not None:
+                raise item.error
+    return time.perf_counter() - wall, time.process_time() - cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake model latency per call, in seconds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    model = FakeEmailModel(latency=args.latency)
+    agent.model = model
+    agent.classifier = structured_classifier(model)
+    emails = make_emails(args.emails)
+    handler = MetricsCallbackHandler()
+
+    # Warm-up: imports, compiled schemas and the first event loop
+    run(emails[:20], args.concurrency, {})
+
+    setups = [("off", {}), ("no-op", {"callbacks": [NoopHandler()]}), ("metrics", {"callbacks": [handler]})]
+    best = {label: (float("inf"), float("inf")) for label, _ in setups}
+    for _ in range(args.repeats):
+        for label, config in setups:
+            wall, cpu = run(emails, args.concurrency, config)
+            best[label] = (min(best[label][0], wall), min(best[label][1], cpu))
+
+    print(f"{args.emails} emails, fake model latency {args.latency * 1000:.0f} ms/call, "
+          f"concurrency {args.concurrency}, best of {args.repeats}\n")
+    print(f"{'metrics':<9}{'wall s':>9}{'emails/sec':>13}{'CPU ms/email':>15}")
+    for label, _ in setups:
+        wall, cpu = best[label]
+        print(f"{label:<9}{wall:>9.3f}{args.emails / wall:>13.1f}{cpu / args.emails * 1000:>15.3f}")
+
+    # The handler's own cost: replay the events of one batch into it and into a no-op handler
+    recorder = RecordingHandler()
+    run(emails, args.concurrency, {"callbacks": [recorder]})
+    self_time = (replay_seconds(recorder.events, MetricsCallbackHandler, args.repeats)
+                 - replay_seconds(recorder.events, NoopHandler, args.repeats))
+    share = self_time / best["off"][1] * 100
+    print(f"\nMetrics handler self time: {self_time / args.emails * 1e6:.1f} us/email "
+          f"({len(recorder.events) // args.emails} events/email), {share:.2f}% of CPU "
+          f"-> {'within' if share < 1 else 'OVER'} the 1% budget")
+    print(f"LangChain callback dispatch (no-op vs off): CPU {(best['no-op'][1] / best['off'][1] - 1) * 100:+.2f}%")
+
+    print("\n" + to_prometheus(handler.registry))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Speculative Drafting Benchmark
+
+Runs the same emails through the sequential graph and the speculative graph
+(`build_graph(speculative=True)`) and reports per-email latency percentiles
+and the tokens spent on drafts that were thrown away. The Claude models are
+swapped for local fakes with fixed latencies, so the numbers show the
+scheduling effect rather than network noise.
+
+Usage:
+    python benchmark_speculative.py --emails 100 --spam-ratio 0.3 --classify-latency 0.4 --draft-latency 0.8
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import time
+
+# The pipeline builds no clients until a graph runs; the models are replaced below
+import email_pipeline as agent
+from classification import structured_classifier
+from fake_model import FakeEmailModel
+from speculation import SpeculationStats
+
+# Spam the local pre-filter is unsure about, so it reaches the LLM like legitimate mail does
+PHISHING_EMAIL = {
+    "sender": "support@paypa1-security.net",
+    "subject": "Your account has been limited",
+    "body": "We noticed unusual activity. Please verify your identity within 24 hours or your account will be closed.",
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(graph, emails):
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for email in emails:
+            start = time.perf_counter()
+            graph.invoke(agent.new_email_state(email))
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=100)
+    parser.add_argument("--spam-ratio", type=float, default=0.3, help="share of emails that are (uncertain) spam")
+    parser.add_argument("--classify-latency", type=float, default=0.4)
+    parser.add_argument("--draft-latency", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    agent.model = FakeEmailModel(latency=args.draft_latency)
+    agent.classifier = structured_classifier(FakeEmailModel(latency=args.classify_latency))
+
+    rng = random.Random(args.seed)
+    emails = [PHISHING_EMAIL if rng.random() < args.spam_ratio else agent.legitimate_email for _ in range(args.emails)]
+
+    sequential = run(agent.build_graph(speculative=False), emails)
+    agent.speculation_stats = SpeculationStats()
+    speculative = run(agent.build_graph(speculative=True), emails)
+    stats = agent.speculation_stats.as_dict()
+
+    print(f"{args.emails} emails, {args.spam_ratio:.0%} spam, classify {args.classify_latency * 1000:.0f} ms, "
+          f"draft {args.draft_latency * 1000:.0f} ms\n")
+    print(f"{'mode':<14}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for label, latencies in (("sequential", sequential), ("speculative", speculative)):
+        print(f"{label:<14}{percentile(latencies, 50) * 1000:>10.0f}{percentile(latencies, 95) * 1000:>10.0f}"
+              f"{statistics.mean(latencies) * 1000:>10.0f}")
+
+    gained_p50 = (percentile(sequential, 50) - percentile(speculative, 50)) * 1000
+    gained_p95 = (percentile(sequential, 95) - percentile(speculative, 95)) * 1000
+    print(f"\nLatency gained: p50 {gained_p50:.0f} ms, p95 {gained_p95:.0f} ms")
+    print(f"Drafts kept: {stats['drafts_kept']}, discarded: {stats['drafts_discarded']}")
+    print(f"Extra tokens spent on discarded drafts: {stats['tokens_wasted']} "
+          f"({stats['tokens_wasted'] / args.emails:.1f} per email)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Blob Store for Message Bodies
+
+Prompts and responses are the bulk of `EmailState.messages`. When a blob
+store is configured, each message body is written once to a
+content-addressed file and the state keeps only a short reference, so
+per-email state (and every checkpoint of it) stays small.
+
+Usage:
+    store = FileBlobStore("./email_blobs")
+    record = message_record("user", prompt, store)
+    # {"role": "user", "content_ref": "sha256:9f2c...", "size": 512}
+    full = resolve_messages([record], store)
+    # [{"role": "user", "content": prompt}]
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
+
+REF_PREFIX = "sha256:"
+
+
+class FileBlobStore:
+    """Content-addressed files under `root`, sharded by the first two hex digits"""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        # Identical bodies are stored once
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return REF_PREFIX + digest
+
+    def get(self, ref: str) -> bytes:
+        if not ref.startswith(REF_PREFIX):
+            raise ValueError(f"Not a blob reference: {ref!r}")
+        with open(self._path(ref[len(REF_PREFIX):]), "rb") as f:
+            return f.read()
+
+
+def blob_store_from_env() -> Optional[FileBlobStore]:
+    """Use EMAIL_BLOB_STORE as the blob directory, or keep bodies inline when unset"""
+    root = os.environ.get("EMAIL_BLOB_STORE")
+    return FileBlobStore(root) if root else None
+
+
+def message_record(role: str, content: str, store: Optional[FileBlobStore] = None) -> Dict[str, Any]:
+    """A messages entry with the body inline, or as a reference when a store is given"""
+    if store is None:
+        return {"role": role, "content": content}
+    data = content.encode("utf-8")
+    return {"role": role, "content_ref": store.put(data), "size": len(data)}
+
+
+def resolve_messages(messages: List[Dict[str, Any]], store: Optional[FileBlobStore]) -> List[Dict[str, Any]]:
+    """Replace blob references with their bodies"""
+    resolved = []
+    for message in messages:
+        if "content_ref" in message:
+            if store is None:
+                raise ValueError("Messages reference blobs but no blob store was given")
+            message = {"role": message["role"], "content": store.get(message["content_ref"]).decode("utf-8")}
+        resolved.append(message)
+    return resolved
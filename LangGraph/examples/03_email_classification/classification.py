@@ -0,0 +1,134 @@
+"""
+Structured Email Classification
+
+Shared schema, prompt and fallback parser for the `classify_email` node.
+
+The classifier model is asked for a compact `EmailClassification` object via
+`with_structured_output` (tool calling on Claude, JSON schema on OpenAI), so
+the answer is a few dozen tokens instead of a free-text essay. If the model
+returns something that does not validate, `fallback_classification` recovers
+what it can from the tool-call arguments or the raw text.
+"""
+
+import json
+import re
+from typing import Any, Dict, Literal, Optional, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel, Field, ValidationError
+
+CATEGORIES = ("inquiry", "complaint", "thank you", "request", "information")
+
+# Enough for the tool call / JSON object with a one-sentence reason
+CLASSIFY_MAX_TOKENS = 200
+
+
+class EmailClassification(BaseModel):
+    """Spam verdict and category for one email."""
+
+    is_spam: bool = Field(description="True if the email is spam, phishing or a scam.")
+    reason: Optional[str] = Field(
+        default=None, description="One short sentence explaining why the email is spam. Null if legitimate."
+    )
+    category: Optional[Literal["inquiry", "complaint", "thank you", "request", "information"]] = Field(
+        default=None, description="Category of a legitimate email. Null if spam."
+    )
+
+
+def classification_prompt(email: Dict[str, Any]) -> str:
+    return f"""
+    As Alfred the butler, classify this email.
+
+    Email:
+    From: {email['sender']}
+    Subject: {email['subject']}
+    Body: {email['body']}
+
+    Set is_spam. If spam, give a one-sentence reason. If legitimate, pick a category.
+    """
+
+
+def _json_object(text: str) -> Optional[Dict[str, Any]]:
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def parse_classification_text(text: str) -> EmailClassification:
+    """Best-effort parse of a free-text answer, used when structured output fails"""
+    data = _json_object(text)
+    if data is not None:
+        try:
+            return EmailClassification.model_validate(data)
+        except ValidationError:
+            pass
+
+    lowered = text.lower()
+    is_spam = "spam" in lowered and not re.search(r"\b(not|isn't|is not) spam\b", lowered)
+
+    reason = None
+    if is_spam:
+        match = re.search(r"reason:\s*(.+)", text, re.IGNORECASE)
+        reason = match.group(1).strip() if match else None
+
+    category = None
+    if not is_spam:
+        category = next((c for c in CATEGORIES if c in lowered), None)
+
+    return EmailClassification(is_spam=is_spam, reason=reason, category=category)
+
+
+def message_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    # Anthropic returns a list of content blocks
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+def fallback_classification(message: BaseMessage) -> EmailClassification:
+    """Recover a classification from a raw model message that failed schema validation"""
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        args = dict(tool_call.get("args") or {})
+        if args.get("category") not in CATEGORIES:
+            args["category"] = None
+        try:
+            return EmailClassification.model_validate(args)
+        except ValidationError:
+            continue
+    return parse_classification_text(message_text(message))
+
+
+def structured_classifier(llm: Runnable) -> Runnable:
+    """Wrap a chat model so it returns {"raw", "parsed", "parsing_error"} for EmailClassification"""
+    return llm.with_structured_output(EmailClassification, include_raw=True)
+
+
+def classify(classifier: Runnable, email: Dict[str, Any]) -> Tuple[str, EmailClassification, BaseMessage]:
+    """
+    Run a `with_structured_output(EmailClassification, include_raw=True)` model.
+
+    Returns the prompt, the classification and the raw model message.
+    """
+    prompt = classification_prompt(email)
+    output = classifier.invoke([HumanMessage(content=prompt)])
+    result = output["parsed"]
+    if result is None:
+        result = fallback_classification(output["raw"])
+    return prompt, result, output["raw"]
+
+
+async def aclassify(classifier: Runnable, email: Dict[str, Any]) -> Tuple[str, EmailClassification, BaseMessage]:
+    """Async version of `classify`, for event-loop hosts"""
+    prompt = classification_prompt(email)
+    output = await classifier.ainvoke([HumanMessage(content=prompt)])
+    result = output["parsed"]
+    if result is None:
+        result = fallback_classification(output["raw"])
+    return prompt, result, output["raw"]
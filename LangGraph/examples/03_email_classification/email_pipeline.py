@@ -0,0 +1,569 @@
+"""
+Email Classification Pipeline
+
+The multi-node email workflow shared by `spam_email_agent_claude.py` and
+`spam_email_agent_openai.py`: state, nodes and graph wiring live here once,
+and the provider is chosen by configuration (EMAIL_PROVIDER):
+
+    anthropic  Claude for classification and drafting
+    openai     OpenAI GPT for classification and drafting
+    router     Both, per call: the provider with the lower rolling p95 latency
+               is used, and load is shed to the other on 429s and timeouts
+
+Every node has a sync and an async body: `compiled_graph.invoke` blocks on
+`model.invoke`, while `compiled_graph.ainvoke` awaits `model.ainvoke` over one
+shared, pooled HTTP client, so an event-loop host can keep hundreds of emails
+in flight without a thread per email (see `batch_runner.process_emails`).
+
+Nothing is built at import. `build_email_graph(config)` compiles the graph
+once per configuration and process, and every graph of a provider shares one
+set of model clients (and their connection pools). `compiled_graph` is
+still available and builds the graph configured by the environment on first use.
+
+Installations:
+    pip install langgraph langchain-anthropic langchain-openai langfuse python-dotenv numpy
+
+Environment Variables Required:
+    EMAIL_PROVIDER - (Optional) anthropic (default), openai or router
+    ANTHROPIC_API_KEY - Your Anthropic API key (anthropic and router)
+    OPENAI_API_KEY - Your OpenAI API key (openai and router)
+    LANGFUSE_PUBLIC_KEY - (Optional) Langfuse public key for tracing
+    LANGFUSE_SECRET_KEY - (Optional) Langfuse secret key for tracing
+    LANGFUSE_HOST - (Optional) Langfuse host URL
+    EMAIL_SPECULATIVE_DRAFT - (Optional) Set to 1 to classify and draft uncertain emails in parallel
+    EMAIL_BLOB_STORE - (Optional) Directory for prompt/response bodies kept out of the state
+    EMAIL_CHECKPOINT_DB - (Optional) SQLite file for durable, resumable checkpoints
+    PREFILTER_MODEL_PATH - (Optional) Hashed n-gram model (.npz) for the pre-filter
+    PREFILTER_DOMAIN_TABLE - (Optional) JSON sender-domain reputation table
+    PREFILTER_SPAM_THRESHOLD - (Optional) Spam probability that skips the LLM (default 0.97)
+    PREFILTER_HAM_THRESHOLD - (Optional) Ham probability that skips the LLM (default 0.03)
+"""
+
+
+import os
+import operator
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+# Shared helpers (graph_runtime, llm_cache, llm_metrics) live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from dotenv import load_dotenv
+from typing import Annotated, TypedDict, List, Dict, Any, Optional, Tuple
+from langgraph.graph import StateGraph, START, END
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from batch_runner import default_message_id
+from blob_store import blob_store_from_env, message_record
+from classification import CLASSIFY_MAX_TOKENS, aclassify, classify, structured_classifier
+from graph_runtime import langfuse_handler_from_env
+from graph_runtime.factory import clients, graphs
+from llm_cache.langchain_cache import langchain_cache_from_env
+from llm_metrics import export_from_env
+from llm_metrics.callback import metrics_handler_from_env
+from prefilter import EmailPrefilter, DEFAULT_HAM_THRESHOLD, DEFAULT_SPAM_THRESHOLD
+from provider_router import ProviderHealth, RoutedModel
+from speculation import SpeculationStats, usage_tokens
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Optional: Langfuse tracing (only imported and initialized if credentials are provided)
+langfuse_handler = langfuse_handler_from_env()
+
+# Optional: response cache (LLM_CACHE=memory|disk), so duplicate emails aren't paid for twice
+llm_cache = langchain_cache_from_env()
+
+# Optional: per-node latency, token and cost histograms (LLM_METRICS=prometheus|jsonl)
+metrics_handler = metrics_handler_from_env()
+
+# Optional: keep prompt/response bodies out of the state (EMAIL_BLOB_STORE=<dir>)
+blob_store = blob_store_from_env()
+
+class EmailState(TypedDict):
+    # The email being processed
+    email: Dict[str, Any]  # Contains subject, sender, body, etc.
+
+    # Category of the email (inquiry, complaint, etc.)
+    email_category: Optional[str]
+
+    # Reason why the email was marked as spam
+    spam_reason: Optional[str]
+
+    # Analysis and decisions
+    is_spam: Optional[bool]
+
+    # Spam probability from the local pre-filter
+    prefilter_score: Optional[float]
+    
+    # Response generation
+    email_draft: Optional[str]
+
+    # Tokens spent on the draft, counted as waste if a speculative draft is discarded
+    draft_tokens: Optional[int]
+    
+    # Processing metadata
+    # Track conversation with LLM for analysis; nodes return only new entries and the reducer appends
+    messages: Annotated[List[Dict[str, Any]], operator.add]
+
+PROVIDERS = ("anthropic", "openai")
+
+def anthropic_models() -> Tuple[Runnable, Runnable]:
+    """Claude drafting model and structured classifier"""
+    from langchain_anthropic import ChatAnthropic
+    from http_pool import share_async_client, share_sync_client
+
+    model = ChatAnthropic(
+        anthropic_api_key=os.environ.get("ANTHROPIC_API_KEY"),
+        model="claude-haiku-4-5-20251001",
+        temperature=0.7,
+        max_tokens=1024,
+        callbacks=[langfuse_handler] if langfuse_handler else [],
+        cache=llm_cache
+    )
+    # Classifier: asks for a compact EmailClassification, so the output budget is capped to match
+    classifier_llm = ChatAnthropic(
+        anthropic_api_key=os.environ.get("ANTHROPIC_API_KEY"),
+        model="claude-haiku-4-5-20251001",
+        temperature=0,
+        max_tokens=CLASSIFY_MAX_TOKENS,
+        callbacks=[langfuse_handler] if langfuse_handler else [],
+        cache=llm_cache
+    )
+    # Both models share one client of each kind, so calls reuse a single keep-alive connection pool
+    share_sync_client(model, classifier_llm)
+    share_async_client(model, classifier_llm)
+    return model, structured_classifier(classifier_llm)
+
+def openai_models() -> Tuple[Runnable, Runnable]:
+    """OpenAI drafting model and structured classifier"""
+    from langchain_openai import ChatOpenAI
+
+    model = ChatOpenAI(
+        openai_api_key=os.environ.get("OPENAI_API_KEY"),
+        temperature=0,
+        callbacks=[langfuse_handler] if langfuse_handler else [],
+        cache=llm_cache
+    )
+    classifier_llm = ChatOpenAI(
+        openai_api_key=os.environ.get("OPENAI_API_KEY"),
+        temperature=0,
+        max_tokens=CLASSIFY_MAX_TOKENS,
+        callbacks=[langfuse_handler] if langfuse_handler else [],
+        cache=llm_cache
+    )
+    return model, structured_classifier(classifier_llm)
+
+def make_models(provider: str) -> Tuple[Runnable, Runnable, Optional[ProviderHealth]]:
+    """Drafting model, classifier and (for the router) the shared provider health"""
+    if provider == "anthropic":
+        return (*anthropic_models(), None)
+    if provider == "openai":
+        return (*openai_models(), None)
+    if provider == "router":
+        per_provider = {"anthropic": anthropic_models(), "openai": openai_models()}
+        # One health record per provider: a 429 on drafting also steers classification away
+        health = ProviderHealth(PROVIDERS)
+        return (
+            RoutedModel({name: pair[0] for name, pair in per_provider.items()}, health),
+            RoutedModel({name: pair[1] for name, pair in per_provider.items()}, health),
+            health,
+        )
+    raise ValueError(f"EMAIL_PROVIDER must be anthropic, openai or router, got {provider!r}")
+
+def shared_models(provider: str) -> Tuple[Runnable, Runnable, Optional[ProviderHealth]]:
+    """make_models(provider), built once per process and shared by every graph that uses it"""
+    return clients.get(("email", provider), lambda: make_models(provider))
+
+# The provider used when a run doesn't say (EMAIL_PROVIDER)
+PROVIDER = (os.environ.get("EMAIL_PROVIDER") or "anthropic").lower()
+
+# Model overrides: when both are set (benchmarks swap in fakes), every graph uses them
+model: Optional[Runnable] = None
+classifier: Optional[Runnable] = None
+
+def current_models(config: Optional[RunnableConfig] = None) -> Tuple[Runnable, Runnable]:
+    """The drafting model and classifier for a run: the overrides, else the run's provider's shared pair"""
+    if model is not None and classifier is not None:
+        return model, classifier
+    provider = ((config or {}).get("configurable") or {}).get("email_provider") or PROVIDER
+    drafting_model, provider_classifier, _ = shared_models(provider)
+    return drafting_model, provider_classifier
+
+# Speculative mode: draft in parallel with classification, discard the draft for spam
+SPECULATIVE_DRAFT = os.environ.get("EMAIL_SPECULATIVE_DRAFT", "0") == "1"
+speculation_stats = SpeculationStats()
+
+# Local pre-filter: confident verdicts skip the LLM classification call
+email_prefilter = EmailPrefilter.from_files(
+    model_path=os.environ.get("PREFILTER_MODEL_PATH"),
+    domain_table_path=os.environ.get("PREFILTER_DOMAIN_TABLE"),
+    spam_threshold=float(os.environ.get("PREFILTER_SPAM_THRESHOLD", DEFAULT_SPAM_THRESHOLD)),
+    ham_threshold=float(os.environ.get("PREFILTER_HAM_THRESHOLD", DEFAULT_HAM_THRESHOLD)),
+)
+
+def read_email(state: EmailState):
+    """Alfred reads and logs the incoming email"""
+    email = state["email"]
+    
+    # Here we might do some initial preprocessing
+    print(f"Alfred is processing an email from {email['sender']} with subject: {email['subject']}")
+    
+    # No state changes needed here
+    return {}
+
+def prefilter(state: EmailState):
+    """Alfred sets aside the obvious cases before troubling the LLM"""
+    decision = email_prefilter.score(state["email"])
+
+    if decision.verdict == "spam":
+        return {
+            "is_spam": True,
+            "spam_reason": decision.reason,
+            "prefilter_score": decision.spam_probability
+        }
+    if decision.verdict == "ham":
+        return {
+            "is_spam": False,
+            "prefilter_score": decision.spam_probability
+        }
+
+    # Uncertain: leave is_spam unset so the LLM decides
+    return {"prefilter_score": decision.spam_probability}
+
+def classification_update(prompt: str, result) -> Dict[str, Any]:
+    """State updates for a classification verdict"""
+    # Record the exchange for tracking
+    new_messages = [
+        message_record("user", prompt, blob_store),
+        message_record("assistant", result.model_dump_json(), blob_store)
+    ]
+
+    # Return state updates
+    return {
+        "is_spam": result.is_spam,
+        "spam_reason": result.reason if result.is_spam else None,
+        "email_category": None if result.is_spam else result.category,
+        "messages": new_messages
+    }
+
+def classify_email(state: EmailState, config: RunnableConfig):
+    """Alfred uses an LLM to determine if the email is spam or legitimate"""
+    # Ask for a structured verdict; falls back to text parsing if the schema isn't met
+    prompt, result, _ = classify(current_models(config)[1], state["email"])
+    return classification_update(prompt, result)
+
+async def aclassify_email(state: EmailState, config: RunnableConfig):
+    """Async classify_email: awaits the classifier instead of blocking a thread"""
+    prompt, result, _ = await aclassify(current_models(config)[1], state["email"])
+    return classification_update(prompt, result)
+
+def handle_spam(state: EmailState):
+    """Alfred discards spam email with a note"""
+    print(f"Alfred has marked the email as spam. Reason: {state['spam_reason']}")
+    print("The email has been moved to the spam folder.")
+    
+    # We're done processing this email
+    return {}
+
+def draft_prompt(state: EmailState) -> str:
+    """The drafting prompt for one email"""
+    email = state["email"]
+    category = state["email_category"] or "general"
+    
+    return f"""
+    As Alfred the butler, draft a polite preliminary response to this email.
+    
+    Email:
+    From: {email['sender']}
+    Subject: {email['subject']}
+    Body: {email['body']}
+    
+    This email has been categorized as: {category}
+    
+    Draft a brief, professional response that Mr. Hugg can review and personalize before sending.
+    """
+
+def draft_update(prompt: str, response) -> Dict[str, Any]:
+    """State updates for a drafted response"""
+    # Record the exchange for tracking
+    new_messages = [
+        message_record("user", prompt, blob_store),
+        message_record("assistant", response.content, blob_store)
+    ]
+    
+    # Return state updates
+    return {
+        "email_draft": response.content,
+        "draft_tokens": usage_tokens(response),
+        "messages": new_messages
+    }
+
+def draft_response(state: EmailState, config: RunnableConfig):
+    """Alfred drafts a preliminary response for legitimate emails"""
+    prompt = draft_prompt(state)
+
+    # Call the LLM
+    response = current_models(config)[0].invoke([HumanMessage(content=prompt)])
+    return draft_update(prompt, response)
+
+async def adraft_response(state: EmailState, config: RunnableConfig):
+    """Async draft_response: awaits the model instead of blocking a thread"""
+    prompt = draft_prompt(state)
+    response = await current_models(config)[0].ainvoke([HumanMessage(content=prompt)])
+    return draft_update(prompt, response)
+
+def notify_mr_hugg(state: EmailState):
+    """Alfred notifies Mr. Hugg about the email and presents the draft response"""
+    email = state["email"]
+    
+    print("\n" + "="*50)
+    print(f"Sir, you've received an email from {email['sender']}.")
+    print(f"Subject: {email['subject']}")
+    print(f"Category: {state['email_category']}")
+    print("\nI've prepared a draft response for your review:")
+    print("-"*50)
+    print(state["email_draft"])
+    print("="*50 + "\n")
+    
+    # We're done processing this email
+    return {}
+
+def resolve_speculation(state: EmailState):
+    """Alfred keeps the speculative draft only if the email turned out to be legitimate"""
+    kept = not state["is_spam"]
+    speculation_stats.record(kept, state.get("draft_tokens") or 0)
+    if kept:
+        return {}
+    return {"email_draft": None}
+
+# The remaining nodes do no I/O; their async bodies just run the sync ones on the loop
+async def aread_email(state: EmailState):
+    return read_email(state)
+
+async def aprefilter(state: EmailState):
+    return prefilter(state)
+
+async def ahandle_spam(state: EmailState):
+    return handle_spam(state)
+
+async def anotify_mr_hugg(state: EmailState):
+    return notify_mr_hugg(state)
+
+async def aresolve_speculation(state: EmailState):
+    return resolve_speculation(state)
+
+def node(func, afunc) -> RunnableLambda:
+    """A graph node that runs `func` under invoke and `afunc` under ainvoke"""
+    return RunnableLambda(func, afunc=afunc, name=func.__name__)
+
+def route_prefilter(state: EmailState) -> str:
+    """Skip the LLM classification when the pre-filter is confident"""
+    if state.get("is_spam") is None:
+        return "uncertain"
+    return route_email(state)
+
+def route_prefilter_speculative(state: EmailState) -> List[str]:
+    """Like route_prefilter, but uncertain emails are classified and drafted in parallel"""
+    route = route_prefilter(state)
+    if route == "uncertain":
+        return ["classify_email", "speculative_draft"]
+    return ["handle_spam" if route == "spam" else "draft_response"]
+
+def route_email(state: EmailState) -> str:
+    """Determine the next step based on spam classification"""
+    if state["is_spam"]:
+        return "spam"
+    else:
+        return "legitimate"
+
+def new_email_state(email: Dict[str, Any]) -> EmailState:
+    """Build the initial graph input for a single email"""
+    return {
+        "email": email,
+        "is_spam": None,
+        "prefilter_score": None,
+        "spam_reason": None,
+        "email_category": None,
+        "email_draft": None,
+        "draft_tokens": None,
+        "messages": []
+    }
+
+def build_graph(speculative: bool = False, checkpointer=None):
+    """
+    Wire the email graph; in speculative mode uncertain emails are classified and drafted in parallel.
+    With a checkpointer, progress is saved after every node under the run's thread_id.
+    """
+    # Create the graph
+    email_graph = StateGraph(EmailState)
+
+    # Add nodes
+    email_graph.add_node("read_email", node(read_email, aread_email))
+    email_graph.add_node("prefilter", node(prefilter, aprefilter))
+    email_graph.add_node("classify_email", node(classify_email, aclassify_email))
+    email_graph.add_node("handle_spam", node(handle_spam, ahandle_spam))
+    email_graph.add_node("draft_response", node(draft_response, adraft_response))
+    email_graph.add_node("notify_mr_hugg", node(notify_mr_hugg, anotify_mr_hugg))
+
+    # Start the edges
+    email_graph.add_edge(START, "read_email")
+    # Add edges - defining the flow
+    email_graph.add_edge("read_email", "prefilter")
+
+    if speculative:
+        # Fan out: classify and draft at the same time, then join before routing
+        email_graph.add_node("speculative_draft", node(draft_response, adraft_response))
+        email_graph.add_node("resolve_speculation", node(resolve_speculation, aresolve_speculation))
+        email_graph.add_conditional_edges(
+            "prefilter",
+            route_prefilter_speculative,
+            ["handle_spam", "draft_response", "classify_email", "speculative_draft"]
+        )
+        email_graph.add_edge(["classify_email", "speculative_draft"], "resolve_speculation")
+        email_graph.add_conditional_edges(
+            "resolve_speculation",
+            route_email,
+            {
+                "spam": "handle_spam",
+                "legitimate": "notify_mr_hugg"
+            }
+        )
+    else:
+        # Confident pre-filter verdicts bypass classify_email
+        email_graph.add_conditional_edges(
+            "prefilter",
+            route_prefilter,
+            {
+                "spam": "handle_spam",
+                "legitimate": "draft_response",
+                "uncertain": "classify_email"
+            }
+        )
+
+        # Add conditional branching from classify_email
+        email_graph.add_conditional_edges(
+            "classify_email",
+            route_email,
+            {
+                "spam": "handle_spam",
+                "legitimate": "draft_response"
+            }
+        )
+
+    # Add the final edges
+    email_graph.add_edge("handle_spam", END)
+    email_graph.add_edge("draft_response", "notify_mr_hugg")
+    email_graph.add_edge("notify_mr_hugg", END)
+
+    # Compile the graph
+    return email_graph.compile(checkpointer=checkpointer)
+
+@dataclass(frozen=True)
+class EmailGraphConfig:
+    """What distinguishes one compiled email graph from another; hashable, so graphs are cached by it"""
+    provider: str = "anthropic"
+    speculative: bool = False
+    # SQLite file for durable checkpoints; runs then need a thread_id per email
+    checkpoint_db: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "EmailGraphConfig":
+        """EMAIL_PROVIDER, EMAIL_SPECULATIVE_DRAFT and EMAIL_CHECKPOINT_DB"""
+        return cls(provider=PROVIDER, speculative=SPECULATIVE_DRAFT,
+                   checkpoint_db=os.environ.get("EMAIL_CHECKPOINT_DB") or None)
+
+def _compile_email_graph(config: EmailGraphConfig):
+    if config.provider not in (*PROVIDERS, "router"):
+        raise ValueError(f"EMAIL_PROVIDER must be anthropic, openai or router, got {config.provider!r}")
+    if model is None or classifier is None:
+        # Build (or reuse) the clients now, so the first email doesn't pay for them
+        shared_models(config.provider)
+    checkpointer = None
+    if config.checkpoint_db:
+        from checkpointing import GroupCommitSqliteSaver
+        checkpointer = GroupCommitSqliteSaver.from_path(config.checkpoint_db)
+    graph = build_graph(speculative=config.speculative, checkpointer=checkpointer)
+    # Nodes look their models up by the run's provider
+    return graph.with_config(configurable={"email_provider": config.provider})
+
+def build_email_graph(config: Optional[EmailGraphConfig] = None):
+    """
+    The compiled email graph for `config` (EmailGraphConfig.from_env() by default).
+    Compiled once per configuration and process; later calls return the same graph.
+    """
+    config = config or EmailGraphConfig.from_env()
+    return graphs.get(("email", config), lambda: _compile_email_graph(config))
+
+def __getattr__(name: str):
+    # Built on first use instead of at import
+    if name == "compiled_graph":
+        return build_email_graph()
+    if name == "provider_health":
+        return shared_models(PROVIDER)[2]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Example spam email
+spam_email = {
+    "sender": "winner@lottery-intl.com",
+    "subject": "YOU HAVE WON $5,000,000!!!",
+    "body": "CONGRATULATIONS! You have been selected as the winner of our international lottery! To claim your $5,000,000 prize, please send us your bank details and a processing fee of $100."
+}
+
+# Example legitimate email
+legitimate_email = {
+    "sender": "john.smith@example.com",
+    "subject": "Question about your services",
+    "body": "Dear Mr. Hugg, I was referred to you by a colleague and I'm interested in learning more about your consulting services. Could we schedule a call next week? Best regards, John Smith"
+}
+
+
+def main():
+    """Run the sample emails through the graph and print the counters"""
+    compiled_graph = build_email_graph()
+    checkpointer = compiled_graph.checkpointer
+    _, _, provider_health = shared_models(PROVIDER)
+
+    # Configure callbacks for tracing and metrics
+    callbacks = [handler for handler in (langfuse_handler, metrics_handler) if handler]
+    config = {"callbacks": callbacks} if callbacks else {}
+
+    def run_config(email):
+        # A checkpointed graph keeps one thread per email, keyed by message id
+        if checkpointer is None:
+            return config
+        return {**config, "configurable": {"thread_id": default_message_id(email)}}
+
+    # Process the spam email
+    print("\nProcessing spam email...")
+    spam_result = compiled_graph.invoke(
+        input=new_email_state(spam_email),
+        config=run_config(spam_email)
+    )
+
+    # Process the legitimate email
+    print("\nProcessing legitimate email...")
+    legitimate_result = compiled_graph.invoke(
+        input=new_email_state(legitimate_email),
+        config=run_config(legitimate_email)
+    )
+
+    for name, result in (("Spam", spam_result), ("Legitimate", legitimate_result)):
+        print(f"\n{name} email: is_spam={result.get('is_spam')}, category={result.get('email_category')}")
+
+    print(f"\nPre-filter stats: {email_prefilter.stats.as_dict()}")
+    if SPECULATIVE_DRAFT:
+        print(f"Speculation stats: {speculation_stats.as_dict()}")
+    if provider_health:
+        print(f"Provider stats: {provider_health.as_dict()}")
+    if llm_cache:
+        print(f"LLM cache stats: {llm_cache.cache.stats.as_dict()}")
+    if checkpointer:
+        checkpointer.close()
+    if metrics_handler:
+        export_from_env(metrics_handler.registry)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Fake Chat Model for Benchmarks
+
+A local stand-in for ChatAnthropic/ChatOpenAI that answers the email prompts
+with canned text after a configurable delay. It lets the benchmarks in this
+directory measure graph overhead and concurrency without network calls or
+API keys.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+SPAM_MARKERS = ("lottery", "winner", "prize", "bank details", "processing fee", "verify your identity")
+
+
+def _estimate_tokens(text: str) -> int:
+    # Roughly four characters per token, close enough for relative comparisons
+    return max(1, len(text) // 4)
+
+
+class FakeEmailModel(BaseChatModel):
+    """
+    Replies like the real model would to the classify and draft prompts.
+
+    Supports `bind_tools`, so `with_structured_output` works and the
+    classifier gets a tool call instead of free text. Responses carry an
+    estimated `usage_metadata` so token accounting can be exercised.
+    """
+
+    # Simulated round-trip time of one model call, in seconds
+    latency: float = 0.05
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-email-model"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Runnable:
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _reply(self, messages: List[BaseMessage], tools: Optional[List[Dict[str, Any]]] = None) -> AIMessage:
+        prompt = str(messages[-1].content).lower()
+        is_spam = any(marker in prompt for marker in SPAM_MARKERS)
+        if tools:
+            args = {"is_spam": True, "reason": "Unsolicited lottery winnings asking for bank details."} if is_spam \
+                else {"is_spam": False, "category": "inquiry"}
+            tool_call = {"name": tools[0]["function"]["name"], "args": args, "id": "call_fake"}
+            return AIMessage(content="", tool_calls=[tool_call])
+        if "draft" in prompt:
+            return AIMessage(content=(
+                "Dear Sir or Madam,\n\nThank you for your email. Mr. Hugg will "
+                "get back to you shortly.\n\nKind regards,\nAlfred"
+            ))
+        if is_spam:
+            return AIMessage(content="This email is spam.\nReason: unsolicited lottery winnings asking for bank details.")
+        return AIMessage(content="This email is legitimate, not spam.\nCategory: inquiry")
+
+    def _result(self, messages: List[BaseMessage], **kwargs: Any) -> ChatResult:
+        message = self._reply(messages, kwargs.get("tools"))
+        input_tokens = sum(_estimate_tokens(str(m.content)) for m in messages)
+        output_tokens = _estimate_tokens(str(message.content) + str(message.tool_calls))
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(messages, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(messages, **kwargs)
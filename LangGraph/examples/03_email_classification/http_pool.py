@@ -0,0 +1,55 @@
+"""
+Shared HTTP Clients
+
+Each ChatAnthropic instance lazily builds its own `Anthropic` and
+`AsyncAnthropic` clients. `share_sync_client` and `share_async_client` give
+several models one client instead, so the draft model and the classifier
+reuse the same keep-alive connection pool when hundreds of emails are in
+flight. The sync client is safe to share between threads.
+
+httpx connections belong to the event loop that opened them, so use one
+shared client per event loop (the usual case for a long-running async host).
+
+Usage:
+    share_sync_client(model, classifier_llm)
+    client = share_async_client(model, classifier_llm)
+    ...
+    await client.close()
+"""
+
+from typing import Optional
+
+import anthropic
+from langchain_anthropic import ChatAnthropic
+
+
+def share_sync_client(*models: ChatAnthropic, client: Optional[anthropic.Anthropic] = None) -> anthropic.Anthropic:
+    """Route the `invoke` calls of every model through one Anthropic client; see share_async_client"""
+    if not models:
+        raise ValueError("share_sync_client needs at least one model")
+    if client is None:
+        client = anthropic.Anthropic(**models[0]._client_params, http_client=anthropic.DefaultHttpxClient())
+    for model in models:
+        model.__dict__["_client"] = client
+    return client
+
+
+def share_async_client(*models: ChatAnthropic, client: Optional[anthropic.AsyncAnthropic] = None) -> anthropic.AsyncAnthropic:
+    """
+    Route the `ainvoke` calls of every model through one AsyncAnthropic client.
+
+    The client is built from the first model's key, base URL, timeout and
+    retry settings unless one is passed in. Returns the shared client.
+    """
+    if not models:
+        raise ValueError("share_async_client needs at least one model")
+    if client is None:
+        client = anthropic.AsyncAnthropic(
+            **models[0]._client_params,
+            # The SDK default pool: keep-alive connections, up to 1000 open at once
+            http_client=anthropic.DefaultAsyncHttpxClient(),
+        )
+    for model in models:
+        # ChatAnthropic caches its client on first use; seed the cache with ours
+        model.__dict__["_async_client"] = client
+    return client
@@ -0,0 +1,267 @@
+"""
+Email Pre-filter
+
+A cheap local scorer that runs before `classify_email`. Obvious spam and
+obvious ham are routed straight to `handle_spam` / `draft_response`; only
+uncertain emails pay for an LLM round trip.
+
+The score is a logistic model over three feature groups:
+    - Sender-domain reputation: a table of domain -> log-odds offsets
+    - Keyword/regex rules: weighted patterns over subject and body
+    - Hashed n-grams: word unigrams/bigrams hashed into a fixed-size weight
+      vector, trained offline and loaded from an `.npz` file
+
+Installations:
+    pip install numpy
+
+Usage:
+    from prefilter import EmailPrefilter
+
+    prefilter = EmailPrefilter(spam_threshold=0.97, ham_threshold=0.03)
+    decision = prefilter.score(email)
+    print(decision.verdict, decision.spam_probability)
+    print(prefilter.stats.llm_calls_avoided)
+"""
+
+import json
+import re
+import threading
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# (pattern, log-odds weight, human readable reason)
+DEFAULT_RULES: List[Tuple[str, float, str]] = [
+    (r"\blotter(y|ies)\b", 2.0, "mentions a lottery"),
+    (r"\b(you have won|winner|you('ve| have) been selected)\b", 1.5, "claims the recipient has won"),
+    (r"\$\s?\d[\d,]{3,}", 1.0, "quotes a large sum of money"),
+    (r"\bbank (details|account|information)\b", 2.0, "asks for bank details"),
+    (r"\b(processing|transfer|release) fee\b", 2.0, "asks for an upfront fee"),
+    (r"\b(click here|act now|limited time|urgent response)\b", 1.0, "uses pressure wording"),
+    (r"!{3,}", 1.0, "uses excessive exclamation marks"),
+]
+
+# Share of upper-case letters in the subject above which it counts as shouting
+SHOUTING_RATIO = 0.6
+SHOUTING_WEIGHT = 1.0
+
+DEFAULT_SPAM_THRESHOLD = 0.97
+DEFAULT_HAM_THRESHOLD = 0.03
+
+_TOKEN_RE = re.compile(r"[a-z0-9$']+")
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def sender_domain(sender: str) -> str:
+    """Return the lower-cased domain part of an email address"""
+    return sender.rsplit("@", 1)[-1].strip().strip(">").lower()
+
+
+def hashed_ngrams(text: str, n_features: int, ngram_max: int = 2) -> np.ndarray:
+    """Hash word n-grams of `text` into feature indices (stable across processes)"""
+    tokens = _TOKEN_RE.findall(text.lower())
+    grams = []
+    for n in range(1, ngram_max + 1):
+        grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    if not grams:
+        return np.empty(0, dtype=np.int64)
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.int64, count=len(grams))
+    return hashes % n_features
+
+
+def email_text(email: Dict[str, Any]) -> str:
+    return f"{email.get('subject', '')}\n{email.get('body', '')}"
+
+
+@dataclass
+class HashedNgramModel:
+    """Linear model over hashed word n-grams"""
+
+    weights: np.ndarray
+    bias: float = 0.0
+    ngram_max: int = 2
+
+    @property
+    def n_features(self) -> int:
+        return self.weights.shape[0]
+
+    @classmethod
+    def empty(cls, n_features: int = 2 ** 18, ngram_max: int = 2) -> "HashedNgramModel":
+        return cls(weights=np.zeros(n_features, dtype=np.float32), ngram_max=ngram_max)
+
+    @classmethod
+    def load(cls, path: str) -> "HashedNgramModel":
+        with np.load(path) as data:
+            return cls(
+                weights=data["weights"].astype(np.float32),
+                bias=float(data["bias"]),
+                ngram_max=int(data["ngram_max"]),
+            )
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, ngram_max=self.ngram_max)
+
+    def features(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Flattened feature indices for all texts, and the text each index belongs to"""
+        per_text = [hashed_ngrams(t, self.n_features, self.ngram_max) for t in texts]
+        if not per_text:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        lengths = [len(f) for f in per_text]
+        return np.concatenate(per_text), np.repeat(np.arange(len(texts)), lengths)
+
+    def logits(self, texts: Sequence[str]) -> np.ndarray:
+        indices, owners = self.features(texts)
+        # Sum the weights of each text's n-grams in one vectorized pass
+        sums = np.bincount(owners, weights=self.weights[indices], minlength=len(texts))
+        return sums + self.bias
+
+    @classmethod
+    def fit(
+        cls,
+        texts: Sequence[str],
+        labels: Sequence[int],
+        n_features: int = 2 ** 18,
+        ngram_max: int = 2,
+        epochs: int = 20,
+        learning_rate: float = 0.5,
+        l2: float = 1e-4,
+    ) -> "HashedNgramModel":
+        """Train with full-batch logistic regression; labels are 1 for spam, 0 for ham"""
+        model = cls.empty(n_features, ngram_max)
+        y = np.asarray(labels, dtype=np.float64)
+        indices, owners = model.features(texts)
+        for _ in range(epochs):
+            logits = np.bincount(owners, weights=model.weights[indices], minlength=len(texts)) + model.bias
+            error = _sigmoid(logits) - y
+            grad = np.bincount(indices, weights=error[owners], minlength=n_features)
+            model.weights -= (learning_rate * (grad / len(texts) + l2 * model.weights)).astype(np.float32)
+            model.bias -= learning_rate * float(error.mean())
+        return model
+
+
+@dataclass
+class PrefilterDecision:
+    # "spam", "ham" or "uncertain" (send to the LLM)
+    verdict: str
+    spam_probability: float
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def reason(self) -> str:
+        return "; ".join(self.reasons) or "scored as spam by the local pre-filter"
+
+
+class PrefilterStats:
+    """Thread-safe counters for pre-filter decisions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spam = 0
+        self.ham = 0
+        self.uncertain = 0
+
+    def record(self, verdict: str) -> None:
+        with self._lock:
+            setattr(self, verdict, getattr(self, verdict) + 1)
+
+    @property
+    def total(self) -> int:
+        return self.spam + self.ham + self.uncertain
+
+    @property
+    def llm_calls_avoided(self) -> int:
+        return self.spam + self.ham
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "total": self.total,
+            "spam": self.spam,
+            "ham": self.ham,
+            "uncertain": self.uncertain,
+            "llm_calls_avoided": self.llm_calls_avoided,
+        }
+
+
+class EmailPrefilter:
+    """Scores emails locally and decides which ones can skip the LLM"""
+
+    def __init__(
+        self,
+        spam_threshold: float = DEFAULT_SPAM_THRESHOLD,
+        ham_threshold: float = DEFAULT_HAM_THRESHOLD,
+        model: Optional[HashedNgramModel] = None,
+        domain_reputation: Optional[Dict[str, float]] = None,
+        rules: Iterable[Tuple[str, float, str]] = DEFAULT_RULES,
+    ):
+        if not 0.0 <= ham_threshold < spam_threshold <= 1.0:
+            raise ValueError("thresholds must satisfy 0 <= ham_threshold < spam_threshold <= 1")
+        self.spam_threshold = spam_threshold
+        self.ham_threshold = ham_threshold
+        self.model = model or HashedNgramModel.empty()
+        self.domain_reputation = {k.lower(): v for k, v in (domain_reputation or {}).items()}
+        self.rules = [(re.compile(p, re.IGNORECASE), w, r) for p, w, r in rules]
+        self.stats = PrefilterStats()
+
+    @classmethod
+    def from_files(
+        cls,
+        model_path: Optional[str] = None,
+        domain_table_path: Optional[str] = None,
+        **kwargs: Any,
+    ) -> "EmailPrefilter":
+        """Load the n-gram model (.npz) and domain table (JSON: domain -> log-odds) if given"""
+        model = HashedNgramModel.load(model_path) if model_path else None
+        table = None
+        if domain_table_path:
+            with open(domain_table_path) as f:
+                table = json.load(f)
+        return cls(model=model, domain_reputation=table, **kwargs)
+
+    def _rule_logit(self, email: Dict[str, Any]) -> Tuple[float, List[str]]:
+        logit = 0.0
+        reasons = []
+
+        domain = sender_domain(email.get("sender", ""))
+        if domain in self.domain_reputation:
+            offset = self.domain_reputation[domain]
+            logit += offset
+            reasons.append(f"sender domain {domain} has {'bad' if offset > 0 else 'good'} reputation")
+
+        text = email_text(email)
+        for pattern, weight, reason in self.rules:
+            if pattern.search(text):
+                logit += weight
+                reasons.append(reason)
+
+        subject = email.get("subject", "")
+        letters = [c for c in subject if c.isalpha()]
+        if letters and sum(c.isupper() for c in letters) / len(letters) >= SHOUTING_RATIO:
+            logit += SHOUTING_WEIGHT
+            reasons.append("subject is written in capitals")
+
+        return logit, reasons
+
+    def score_batch(self, emails: Sequence[Dict[str, Any]]) -> List[PrefilterDecision]:
+        """Score many emails at once; the n-gram model runs as a single vectorized pass"""
+        model_logits = self.model.logits([email_text(e) for e in emails])
+        decisions = []
+        for email, model_logit in zip(emails, model_logits):
+            rule_logit, reasons = self._rule_logit(email)
+            p = float(_sigmoid(model_logit + rule_logit))
+            if p >= self.spam_threshold:
+                verdict = "spam"
+            elif p <= self.ham_threshold:
+                verdict = "ham"
+            else:
+                verdict = "uncertain"
+            self.stats.record(verdict)
+            decisions.append(PrefilterDecision(verdict=verdict, spam_probability=p, reasons=reasons))
+        return decisions
+
+    def score(self, email: Dict[str, Any]) -> PrefilterDecision:
+        return self.score_batch([email])[0]
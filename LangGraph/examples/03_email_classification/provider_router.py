@@ -0,0 +1,198 @@
+"""
+Latency-Aware Provider Routing
+
+Spreads model calls across several providers (e.g. Anthropic and OpenAI) so
+the email graph can draw on both quotas at once.
+
+Each call goes to the healthy provider with the lowest rolling p95 latency.
+A provider that answers with a rate limit (429), an overload (529) or a
+timeout is put on cooldown, and the call is retried on the next provider.
+Cooldowns double on consecutive failures, up to `max_cooldown`.
+
+Usage:
+    health = ProviderHealth(["anthropic", "openai"])
+    model = RoutedModel({"anthropic": claude, "openai": gpt}, health)
+    classifier = RoutedModel({"anthropic": claude_classifier, "openai": gpt_classifier}, health)
+    model.invoke(messages)
+    print(health.as_dict())
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+DEFAULT_WINDOW = 100
+DEFAULT_MIN_SAMPLES = 5
+DEFAULT_COOLDOWN = 5.0
+DEFAULT_MAX_COOLDOWN = 60.0
+
+# 429 is a rate limit everywhere; Anthropic answers 529 when it is overloaded
+SHED_STATUS_CODES = (429, 529)
+
+
+def should_shed(error: BaseException) -> bool:
+    """True for errors that mean "this provider is saturated, try another one"."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status in SHED_STATUS_CODES:
+        return True
+    if isinstance(error, TimeoutError):
+        return True
+    # SDK and httpx timeouts (APITimeoutError, ReadTimeout, ...) don't share a base class
+    name = type(error).__name__
+    return "Timeout" in name or "RateLimit" in name
+
+
+class _ProviderState:
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.cooldown_until = 0.0
+        self.consecutive_failures = 0
+        self.calls = 0
+        self.shed = 0
+
+
+class ProviderHealth:
+    """
+    Thread-safe rolling latency and cooldown state per provider.
+
+    Args:
+        providers: Provider names, in order of preference when there is no data yet.
+        window: Number of recent successful calls the p95 is computed over.
+        min_samples: Providers with fewer samples are tried first, so each one gets measured.
+        cooldown: Seconds a provider is skipped after its first shed error.
+        max_cooldown: Upper bound for the doubling cooldown.
+    """
+
+    def __init__(
+        self,
+        providers: Sequence[str],
+        window: int = DEFAULT_WINDOW,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        cooldown: float = DEFAULT_COOLDOWN,
+        max_cooldown: float = DEFAULT_MAX_COOLDOWN,
+    ):
+        self.providers = list(providers)
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self._state = {name: _ProviderState(window) for name in self.providers}
+        self.failovers = 0
+
+    def p95(self, provider: str) -> Optional[float]:
+        with self._lock:
+            return self._p95(self._state[provider])
+
+    @staticmethod
+    def _p95(state: _ProviderState) -> Optional[float]:
+        if not state.latencies:
+            return None
+        ordered = sorted(state.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def ranked(self, candidates: Optional[Sequence[str]] = None) -> List[str]:
+        """Providers to try, best first: healthy by p95, then cooling down by time left"""
+        now = time.monotonic()
+        with self._lock:
+            names = [n for n in (candidates or self.providers) if n in self._state]
+
+            def key(name):
+                state = self._state[name]
+                cooling = state.cooldown_until > now
+                if cooling:
+                    return (1, state.cooldown_until)
+                if len(state.latencies) < self.min_samples:
+                    # Unmeasured providers go first so the comparison has data on both sides
+                    return (0, -1.0)
+                return (0, self._p95(state))
+
+            return sorted(names, key=key)
+
+    def record_success(self, provider: str, latency: float) -> None:
+        with self._lock:
+            state = self._state[provider]
+            state.calls += 1
+            state.latencies.append(latency)
+            state.consecutive_failures = 0
+
+    def record_shed(self, provider: str) -> None:
+        with self._lock:
+            state = self._state[provider]
+            state.calls += 1
+            state.shed += 1
+            delay = min(self.max_cooldown, self.cooldown * 2 ** state.consecutive_failures)
+            state.consecutive_failures += 1
+            state.cooldown_until = time.monotonic() + delay
+
+    def record_failover(self) -> None:
+        with self._lock:
+            self.failovers += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            providers = {}
+            for name, state in self._state.items():
+                p95 = self._p95(state)
+                providers[name] = {
+                    "calls": state.calls,
+                    "shed": state.shed,
+                    "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                    "cooling_down": state.cooldown_until > now,
+                }
+            return {"providers": providers, "failovers": self.failovers}
+
+
+class RoutedModel(Runnable):
+    """
+    A Runnable that sends each call to the best provider in `health`.
+
+    `runnables` maps provider names to equivalent runnables (chat models, or
+    chat models wrapped by `with_structured_output`). Errors that are not rate
+    limits or timeouts are raised right away.
+    """
+
+    def __init__(self, runnables: Dict[str, Runnable], health: ProviderHealth):
+        self.runnables = runnables
+        self.health = health
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        last_error = None
+        for attempt, provider in enumerate(self.health.ranked(list(self.runnables))):
+            if attempt:
+                self.health.record_failover()
+            start = time.perf_counter()
+            try:
+                output = self.runnables[provider].invoke(input, config, **kwargs)
+            except Exception as e:
+                if not should_shed(e):
+                    raise
+                self.health.record_shed(provider)
+                last_error = e
+                continue
+            self.health.record_success(provider, time.perf_counter() - start)
+            return output
+        raise last_error
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        last_error = None
+        for attempt, provider in enumerate(self.health.ranked(list(self.runnables))):
+            if attempt:
+                self.health.record_failover()
+            start = time.perf_counter()
+            try:
+                output = await self.runnables[provider].ainvoke(input, config, **kwargs)
+            except Exception as e:
+                if not should_shed(e):
+                    raise
+                self.health.record_shed(provider)
+                last_error = e
+                continue
+            self.health.record_success(provider, time.perf_counter() - start)
+            return output
+        raise last_error
@@ -2,270 +2,56 @@
 Email Classification Agent (Claude/Anthropic Version)
 
 A multi-node workflow for email spam detection and response drafting using Claude.
+The graph itself lives in `email_pipeline.py`; this entry point selects the
+Anthropic provider unless EMAIL_PROVIDER says otherwise.
 
 Installations:
-    pip install langgraph langchain-anthropic langfuse python-dotenv
+    pip install langgraph langchain-anthropic langfuse python-dotenv numpy
 
 Environment Variables Required:
     ANTHROPIC_API_KEY - Your Anthropic API key
     LANGFUSE_PUBLIC_KEY - (Optional) Langfuse public key for tracing
     LANGFUSE_SECRET_KEY - (Optional) Langfuse secret key for tracing
     LANGFUSE_HOST - (Optional) Langfuse host URL
+    EMAIL_PROVIDER - (Optional) Set to router to spread calls over Claude and OpenAI
+    (see email_pipeline.py for the speculative, blob store and pre-filter settings)
 """
 
 import os
-from dotenv import load_dotenv
-from typing import TypedDict, List, Dict, Any, Optional
-from langgraph.graph import StateGraph, START, END
-from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import HumanMessage
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Optional: Langfuse tracing (only initialize if credentials are provided)
-langfuse_handler = None
-if os.environ.get("LANGFUSE_PUBLIC_KEY") and os.environ.get("LANGFUSE_SECRET_KEY"):
-    from langfuse.langchain import CallbackHandler
-    langfuse_handler = CallbackHandler()
-
-class EmailState(TypedDict):
-    # The email being processed
-    email: Dict[str, Any]  # Contains subject, sender, body, etc.
-
-    # Category of the email (inquiry, complaint, etc.)
-    email_category: Optional[str]
-
-    # Reason why the email was marked as spam
-    spam_reason: Optional[str]
-
-    # Analysis and decisions
-    is_spam: Optional[bool]
-    
-    # Response generation
-    email_draft: Optional[str]
-    
-    # Processing metadata
-    messages: List[Dict[str, Any]]  # Track conversation with LLM for analysis
-
-# Initialize our LLM
-model = ChatAnthropic(
-    anthropic_api_key=os.environ.get("ANTHROPIC_API_KEY"),
-    model="claude-haiku-4-5-20251001",
-    temperature=0.7,
-    max_tokens=1024,
-    callbacks=[langfuse_handler] if langfuse_handler else []
-)
-
-def read_email(state: EmailState):
-    """Alfred reads and logs the incoming email"""
-    email = state["email"]
-    
-    # Here we might do some initial preprocessing
-    print(f"Alfred is processing an email from {email['sender']} with subject: {email['subject']}")
-    
-    # No state changes needed here
-    return {}
-
-def classify_email(state: EmailState):
-    """Alfred uses an LLM to determine if the email is spam or legitimate"""
-    email = state["email"]
-    
-    # Prepare our prompt for the LLM
-    prompt = f"""
-    As Alfred the butler, analyze this email and determine if it is spam or legitimate.
-    
-    Email:
-    From: {email['sender']}
-    Subject: {email['subject']}
-    Body: {email['body']}
-    
-    First, determine if this email is spam. If it is spam, explain why.
-    If it is legitimate, categorize it (inquiry, complaint, thank you, etc.).
-    """
-    
-    # Call the LLM
-    messages = [HumanMessage(content=prompt)]
-    response = model.invoke(messages)
-    
-    # Simple logic to parse the response (in a real app, you'd want more robust parsing)
-    response_text = response.content.lower()
-    is_spam = "spam" in response_text and "not spam" not in response_text
-    
-    # Extract a reason if it's spam
-    spam_reason = None
-    if is_spam and "reason:" in response_text:
-        spam_reason = response_text.split("reason:")[1].strip()
-    
-    # Determine category if legitimate
-    email_category = None
-    if not is_spam:
-        categories = ["inquiry", "complaint", "thank you", "request", "information"]
-        for category in categories:
-            if category in response_text:
-                email_category = category
-                break
-    
-    # Update messages for tracking
-    new_messages = state.get("messages", []) + [
-        {"role": "user", "content": prompt},
-        {"role": "assistant", "content": response.content}
-    ]
-    
-    # Return state updates
-    return {
-        "is_spam": is_spam,
-        "spam_reason": spam_reason,
-        "email_category": email_category,
-        "messages": new_messages
-    }
-
-def handle_spam(state: EmailState):
-    """Alfred discards spam email with a note"""
-    print(f"Alfred has marked the email as spam. Reason: {state['spam_reason']}")
-    print("The email has been moved to the spam folder.")
-    
-    # We're done processing this email
-    return {}
-
-def draft_response(state: EmailState):
-    """Alfred drafts a preliminary response for legitimate emails"""
-    email = state["email"]
-    category = state["email_category"] or "general"
-    
-    # Prepare our prompt for the LLM
-    prompt = f"""
-    As Alfred the butler, draft a polite preliminary response to this email.
-    
-    Email:
-    From: {email['sender']}
-    Subject: {email['subject']}
-    Body: {email['body']}
-    
-    This email has been categorized as: {category}
-    
-    Draft a brief, professional response that Mr. Hugg can review and personalize before sending.
-    """
-    
-    # Call the LLM
-    messages = [HumanMessage(content=prompt)]
-    response = model.invoke(messages)
-    
-    # Update messages for tracking
-    new_messages = state.get("messages", []) + [
-        {"role": "user", "content": prompt},
-        {"role": "assistant", "content": response.content}
-    ]
-    
-    # Return state updates
-    return {
-        "email_draft": response.content,
-        "messages": new_messages
-    }
-
-def notify_mr_hugg(state: EmailState):
-    """Alfred notifies Mr. Hugg about the email and presents the draft response"""
-    email = state["email"]
-    
-    print("\n" + "="*50)
-    print(f"Sir, you've received an email from {email['sender']}.")
-    print(f"Subject: {email['subject']}")
-    print(f"Category: {state['email_category']}")
-    print("\nI've prepared a draft response for your review:")
-    print("-"*50)
-    print(state["email_draft"])
-    print("="*50 + "\n")
-    
-    # We're done processing this email
-    return {}
-
-def route_email(state: EmailState) -> str:
-    """Determine the next step based on spam classification"""
-    if state["is_spam"]:
-        return "spam"
-    else:
-        return "legitimate"
-
-# Create the graph
-email_graph = StateGraph(EmailState)
-
-# Add nodes
-email_graph.add_node("read_email", read_email)
-email_graph.add_node("classify_email", classify_email)
-email_graph.add_node("handle_spam", handle_spam)
-email_graph.add_node("draft_response", draft_response)
-email_graph.add_node("notify_mr_hugg", notify_mr_hugg)
-
-# Start the edges
-email_graph.add_edge(START, "read_email")
-# Add edges - defining the flow
-email_graph.add_edge("read_email", "classify_email")
-
-# Add conditional branching from classify_email
-email_graph.add_conditional_edges(
-    "classify_email",
-    route_email,
-    {
-        "spam": "handle_spam",
-        "legitimate": "draft_response"
-    }
+os.environ.setdefault("EMAIL_PROVIDER", "anthropic")
+
+import email_pipeline
+from email_pipeline import (
+    EmailState,
+    EmailGraphConfig,
+    build_email_graph,
+    build_graph,
+    new_email_state,
+    email_prefilter,
+    speculation_stats,
+    spam_email,
+    legitimate_email,
+    main,
 )
 
-# Add the final edges
-email_graph.add_edge("handle_spam", END)
-email_graph.add_edge("draft_response", "notify_mr_hugg")
-email_graph.add_edge("notify_mr_hugg", END)
-
-# Compile the graph
-compiled_graph = email_graph.compile()
-
-# Initialize Langfuse CallbackHandler for LangGraph/Langchain (tracing)
-
-
-# Example spam email
-spam_email = {
-    "sender": "winner@lottery-intl.com",
-    "subject": "YOU HAVE WON $5,000,000!!!",
-    "body": "CONGRATULATIONS! You have been selected as the winner of our international lottery! To claim your $5,000,000 prize, please send us your bank details and a processing fee of $100."
-}
-
-# Example legitimate email
-legitimate_email = {
-    "sender": "john.smith@example.com",
-    "subject": "Question about your services",
-    "body": "Dear Mr. Hugg, I was referred to you by a colleague and I'm interested in learning more about your consulting services. Could we schedule a call next week? Best regards, John Smith"
-}
-
-
-# Configure callbacks for tracing
-config = {"callbacks": [langfuse_handler]} if langfuse_handler else {}
-
-# Process the spam email
-print("\nProcessing spam email...")
-spam_result = compiled_graph.invoke(
-    input={
-        "email": spam_email,
-        "is_spam": None,
-        "spam_reason": None,
-        "email_category": None,
-        "email_draft": None,
-        "messages": []
-    },
-    config=config
-)
-
-# Process the legitimate email
-print("\nProcessing legitimate email...")
-legitimate_result = compiled_graph.invoke(
-    input={
-        "email": legitimate_email,
-        "is_spam": None,
-        "spam_reason": None,
-        "email_category": None,
-        "email_draft": None,
-        "messages": []
-    },
-    config=config
-)
-
-
+# Re-exported for code that imported them from this module before email_pipeline existed
+__all__ = [
+    "EmailState",
+    "EmailGraphConfig",
+    "build_email_graph",
+    "build_graph",
+    "new_email_state",
+    "email_prefilter",
+    "speculation_stats",
+    "spam_email",
+    "legitimate_email",
+    "main",
+]
+
+def __getattr__(name: str):
+    # compiled_graph and provider_health are built on first use, by email_pipeline
+    return getattr(email_pipeline, name)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Speculative Drafting
+
+In speculative mode the email graph runs `classify_email` and a draft in
+parallel, so a legitimate email pays one LLM round trip of latency instead
+of two. If the email turns out to be spam the draft is thrown away; the
+counters here track how often that happens and how many tokens it cost.
+"""
+
+import threading
+from typing import Any, Dict
+
+
+def usage_tokens(message: Any) -> int:
+    """Total tokens reported for a model response, or 0 if the provider gave none"""
+    usage = getattr(message, "usage_metadata", None) or {}
+    return usage.get("total_tokens", usage.get("input_tokens", 0) + usage.get("output_tokens", 0))
+
+
+class SpeculationStats:
+    """Thread-safe counters for kept and discarded speculative drafts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.drafts_kept = 0
+        self.drafts_discarded = 0
+        self.tokens_wasted = 0
+
+    def record(self, kept: bool, tokens: int) -> None:
+        with self._lock:
+            if kept:
+                self.drafts_kept += 1
+            else:
+                self.drafts_discarded += 1
+                self.tokens_wasted += tokens
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "drafts_kept": self.drafts_kept,
+            "drafts_discarded": self.drafts_discarded,
+            "tokens_wasted": self.tokens_wasted,
+        }
@@ -0,0 +1,44 @@
+"""
+Serve the email and image agents over HTTP.
+
+Each worker process compiles the graphs once at startup and shares one
+pooled model client per provider between them and across requests.
+
+Installations:
+    pip install uvicorn  (plus each example's own requirements)
+
+Usage:
+    python serve.py                                  # one worker on 127.0.0.1:8000
+    uvicorn serve:app --workers 4                    # one warm graph set per worker
+
+    curl -X POST localhost:8000/graphs/email/invoke \\
+         -d '{"input": {"sender": "a@b.com", "subject": "Hi", "body": "Lunch?"}}'
+    curl -X POST localhost:8000/graphs/react/invoke \\
+         -d '{"input": {"messages": [{"role": "user", "content": "Divide 6790 by 5"}], "input_file": null}}'
+    curl localhost:8000/metrics
+
+Environment Variables:
+    ANTHROPIC_API_KEY / OPENAI_API_KEY - as the examples need them
+    GRAPH_SERVER_HOST, GRAPH_SERVER_PORT, GRAPH_SERVER_WARMUP - see graph_runtime/server.py
+"""
+
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parents[1]))
+sys.path.insert(0, str(HERE / "02_image_tool_agent"))
+sys.path.insert(0, str(HERE / "03_email_classification"))
+
+from graph_runtime.server import GraphServer
+from email_pipeline import build_email_graph, new_email_state
+from image_tool_agent import build_react_graph
+
+app = GraphServer()
+# The email graph takes the email itself; the react graph takes its state as is
+app.register("email", build_email_graph, to_input=new_email_state)
+app.register("react", build_react_graph)
+
+
+if __name__ == "__main__":
+    app.run()
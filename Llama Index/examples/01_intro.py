@@ -13,9 +13,16 @@ Setup:
 """
 
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 from llama_index.llms.huggingface_api import HuggingFaceInferenceAPI
 
+# Shared helpers (llm_cache) live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from llm_cache import cache_from_env
+from llm_cache.llama_index_cache import CachedLLM
+
 # Load environment variables
 load_dotenv()
 
@@ -25,15 +32,24 @@ hf_token = os.getenv("HF_TOKEN")
 if not hf_token:
     raise ValueError("HF_TOKEN not found. Please set it in your .env file.")
 
+# Optional: response cache (LLM_CACHE=memory|disk), so repeated prompts aren't paid for twice
+llm_cache = cache_from_env()
+
 # Initialize the LLM
-llm = HuggingFaceInferenceAPI(
-    model_name="Qwen/Qwen3-Next-80B-A3B-Thinking",
-    temperature=0.7,
-    max_tokens=100,
-    token=hf_token,
-    provider="auto"
+llm = CachedLLM.wrap(
+    HuggingFaceInferenceAPI(
+        model_name="Qwen/Qwen3-Next-80B-A3B-Thinking",
+        temperature=0.7,
+        max_tokens=100,
+        token=hf_token,
+        provider="auto"
+    ),
+    llm_cache,
 )
 
 # Simple completion example
 response = llm.complete("Hello, how are you?")
 print(response)
+
+if llm_cache:
+    print(f"LLM cache stats: {llm_cache.stats.as_dict()}")
@@ -11,6 +11,16 @@ Prerequisites:
 Setup:
     Create a .env file with your HuggingFace token:
     HF_TOKEN=your_token_here
+
+Only new and changed files in the docs directory are embedded on each start;
+RAG_INGEST=full re-ingests everything (see incremental_ingest.py).
+RAG_QUERY_CACHE=memory|disk reuses the embeddings and results of repeated
+queries until the docs change (see retrieval_cache.py).
+Answers take one LLM call when the retrieved chunks fit the context budget
+(see synthesis.py).
+Chunks are retrieved by meaning (Chroma) and by keyword (BM25) and the two
+rankings fused; RAG_RERANK_MODEL adds a cross-encoder reranker
+(see hybrid_retrieval.py).
 """
 
 import os
@@ -19,13 +29,19 @@ from dotenv import load_dotenv
 
 import chromadb
 from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.core import VectorStoreIndex
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.ingestion import IngestionPipeline
+from llama_index.core.query_engine import RetrieverQueryEngine
 from llama_index.llms.huggingface_api import HuggingFaceInferenceAPI
 from llama_index.core.evaluation import FaithfulnessEvaluator
 
+from embedding_service import embedding_service_from_env
+from hybrid_retrieval import hybrid_retriever_from_env, rerankers_from_env
+from incremental_ingest import IncrementalIngestion
+from retrieval_cache import CachedRetriever, cached_retriever_from_env
+from synthesis import PackedSynthesizer, synthesizer_from_env
+
 # Load environment variables
 load_dotenv()
 
@@ -38,30 +54,33 @@ if not hf_token:
 # Get the docs directory path (relative to this file)
 DOCS_DIR = Path(__file__).parent.parent / "docs"
 
-# Load documents
-reader = SimpleDirectoryReader(input_dir=str(DOCS_DIR))
-documents = reader.load_data()
-
 # Setup ChromaDB vector store
-db = chromadb.PersistentClient(path="./chroma_db")
+CHROMA_PATH = Path("./chroma_db")
+db = chromadb.PersistentClient(path=str(CHROMA_PATH))
 chroma_collection = db.get_or_create_collection("llama_index_examples")
 vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
 
+# One embedding model for ingestion and queries, loaded on first use
+embed_model = embedding_service_from_env()
+
 # Create ingestion pipeline with transformations
 pipeline = IngestionPipeline(
     transformations=[
         SentenceSplitter(chunk_overlap=0),
-        HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5"),
+        embed_model,
     ],
     vector_store=vector_store,
 )
 
-# Ingest documents
-pipeline.run(documents=documents)
-print("Documents ingested into vector store.")
+# Ingest new and changed documents; an unchanged docs directory is only listed and stat'ed
+ingestion = IncrementalIngestion.from_env(
+    pipeline, vector_store, str(CHROMA_PATH / "llama_index_examples.ingest.json"), collection=chroma_collection
+)
+print(f"Documents ingested into vector store: {ingestion.run(DOCS_DIR)}")
+if embed_model.stats["chunks"]:
+    print(f"Embedded {embed_model.stats['chunks']} chunks at {embed_model.chunks_per_sec:.0f} chunks/sec")
 
 # Create index from vector store
-embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5")
 index = VectorStoreIndex.from_vector_store(vector_store, embed_model=embed_model)
 
 # Initialize LLM
@@ -74,9 +93,23 @@ llm = HuggingFaceInferenceAPI(
 )
 
 # Create query engine
-query_engine = index.as_query_engine(
+# Chroma and BM25 results fused by reciprocal rank (RAG_RETRIEVAL=dense for Chroma only)
+retriever = hybrid_retriever_from_env(
+    index, lambda: ingestion.generation, str(CHROMA_PATH / "llama_index_examples.bm25")
+)
+# Optional: RAG_QUERY_CACHE=memory|disk reuses query embeddings and results until the docs change
+retriever = cached_retriever_from_env(
+    index, embed_model, lambda: ingestion.generation, collection=chroma_collection, retriever=retriever
+)
+# One LLM call when the retrieved chunks fit the context budget, parallel map-reduce when not
+# (RAG_SYNTHESIS=tree_summarize for the previous behaviour)
+synthesizer = synthesizer_from_env(llm)
+query_engine = RetrieverQueryEngine.from_args(
+    retriever,
     llm=llm,
-    response_mode="tree_summarize",
+    response_synthesizer=synthesizer,
+    # Optional: RAG_RERANK_MODEL reranks the candidates with a local cross-encoder
+    node_postprocessors=rerankers_from_env(),
 )
 
 # Setup evaluator for faithfulness
@@ -88,6 +121,8 @@ response = query_engine.query(query)
 
 print("Query Result:")
 print(response)
+if isinstance(synthesizer, PackedSynthesizer):
+    print(f"Synthesis: {synthesizer.last_report}")
 
 # Evaluate response faithfulness
 eval_result = evaluator.evaluate_response(response=response)
@@ -97,3 +132,6 @@ print(eval_result)
 
 print("\nEval Result Passing:")
 print(eval_result.passing)
+
+if isinstance(retriever, CachedRetriever):
+    print(f"\nQuery cache lookups: {retriever.lookups}")
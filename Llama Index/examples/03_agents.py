@@ -11,6 +11,16 @@ Prerequisites:
 Setup:
     Create a .env file with your HuggingFace token:
     HF_TOKEN=your_token_here
+
+Only new and changed files in the docs directory are embedded on each start;
+RAG_INGEST=full re-ingests everything (see incremental_ingest.py).
+RAG_QUERY_CACHE=memory|disk reuses the embeddings and results of repeated
+queries until the docs change (see retrieval_cache.py).
+Answers take one LLM call when the retrieved chunks fit the context budget
+(see synthesis.py).
+Chunks are retrieved by meaning (Chroma) and by keyword (BM25) and the two
+rankings fused; RAG_RERANK_MODEL adds a cross-encoder reranker
+(see hybrid_retrieval.py).
 """
 
 import os
@@ -20,14 +30,20 @@ from dotenv import load_dotenv
 
 import chromadb
 from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.core import VectorStoreIndex
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.ingestion import IngestionPipeline
+from llama_index.core.query_engine import RetrieverQueryEngine
 from llama_index.llms.huggingface_api import HuggingFaceInferenceAPI
 from llama_index.core.tools import QueryEngineTool
 from llama_index.core.agent.workflow import AgentWorkflow, ReActAgent
 
+from embedding_service import embedding_service_from_env
+from hybrid_retrieval import hybrid_retriever_from_env, rerankers_from_env
+from incremental_ingest import IncrementalIngestion
+from retrieval_cache import cached_retriever_from_env
+from synthesis import PackedSynthesizer, synthesizer_from_env
+
 # Load environment variables
 load_dotenv()
 
@@ -52,28 +68,31 @@ def subtract(a: int, b: int) -> int:
 # Get the docs directory path (relative to this file)
 DOCS_DIR = Path(__file__).parent.parent / "docs"
 
-# Load documents
-reader = SimpleDirectoryReader(input_dir=str(DOCS_DIR))
-documents = reader.load_data()
-
 # Setup ChromaDB vector store
-db = chromadb.PersistentClient(path="./chroma_db")
+CHROMA_PATH = Path("./chroma_db")
+db = chromadb.PersistentClient(path=str(CHROMA_PATH))
 chroma_collection = db.get_or_create_collection("llama_index_examples")
 vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
 
+# One embedding model for ingestion and queries, loaded on first use
+embed_model = embedding_service_from_env()
+
 # Create ingestion pipeline
 pipeline = IngestionPipeline(
     transformations=[
         SentenceSplitter(chunk_overlap=0),
-        HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5"),
+        embed_model,
     ],
     vector_store=vector_store,
 )
 
-pipeline.run(documents=documents)
+# Ingest new and changed documents; an unchanged docs directory is only listed and stat'ed
+ingestion = IncrementalIngestion.from_env(
+    pipeline, vector_store, str(CHROMA_PATH / "llama_index_examples.ingest.json"), collection=chroma_collection
+)
+ingestion.run(DOCS_DIR)
 
 # Create index
-embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5")
 index = VectorStoreIndex.from_vector_store(vector_store, embed_model=embed_model)
 
 # Initialize LLM
@@ -86,9 +105,23 @@ llm = HuggingFaceInferenceAPI(
 )
 
 # Create query engine and tool
-query_engine = index.as_query_engine(
+# Chroma and BM25 results fused by reciprocal rank (RAG_RETRIEVAL=dense for Chroma only)
+retriever = hybrid_retriever_from_env(
+    index, lambda: ingestion.generation, str(CHROMA_PATH / "llama_index_examples.bm25")
+)
+# Optional: RAG_QUERY_CACHE=memory|disk reuses query embeddings and results until the docs change
+retriever = cached_retriever_from_env(
+    index, embed_model, lambda: ingestion.generation, collection=chroma_collection, retriever=retriever
+)
+# One LLM call when the retrieved chunks fit the context budget, parallel map-reduce when not
+# (RAG_SYNTHESIS=tree_summarize for the previous behaviour)
+synthesizer = synthesizer_from_env(llm)
+query_engine = RetrieverQueryEngine.from_args(
+    retriever,
     llm=llm,
-    response_mode="tree_summarize",
+    response_synthesizer=synthesizer,
+    # Optional: RAG_RERANK_MODEL reranks the candidates with a local cross-encoder
+    node_postprocessors=rerankers_from_env(),
 )
 
 query_engine_tool = QueryEngineTool.from_defaults(
@@ -132,6 +165,9 @@ async def main():
     query = "What is the definition of Agents work?"
     response = await agent.run(user_msg=query)
     print("Answer:", response)
+    if isinstance(synthesizer, PackedSynthesizer):
+        for report in synthesizer.reports:
+            print(f"info_lookup synthesis: {report}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+"""
+Embedding Throughput Benchmark
+==============================
+
+Embeds a synthetic set of chunks of mixed length (most short, a few near
+the splitter's limit) the way an ingestion run does, and reports chunks/sec
+for each setup:
+
+    hf         HuggingFaceEmbedding(embed_batch_size=10), as the examples used to build it (twice)
+    in-order   EmbeddingService batching texts in input order
+    bucketed   EmbeddingService batching texts of similar length together
+    pool       bucketed, spread over --processes CPU worker processes
+    onnx       bucketed, on ONNX Runtime
+    onnx-int8  bucketed, on ONNX Runtime with int8 weights
+
+Load time (model load, or worker start-up for the pool) is reported
+separately from throughput. "padding" is the share of each batch that is
+padding, measured in characters. "cosine" is the mean similarity of each
+setup's vectors to the first setup's, which shows how far quantization moves
+them.
+
+Usage:
+    python benchmark_embeddings.py
+    python benchmark_embeddings.py --chunks 4000 --batch-size 64 --processes 4
+    python benchmark_embeddings.py --setups bucketed onnx onnx-int8
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from embedding_service import DEFAULT_MODEL, EmbeddingService, length_batches, padding
+
+WORDS = ("agent tool thought action observation memory planner retriever index vector "
+         "embedding chunk query answer workflow state context model prompt token").split()
+
+SETUPS = ("hf", "in-order", "bucketed", "pool", "onnx", "onnx-int8")
+
+
+def make_chunks(count: int, seed: int):
+    """Chunk texts with a long-tailed length distribution, like a splitter's output"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(min(400, max(5, int(rng.lognormvariate(3.5, 0.9))))))
+            for _ in range(count)]
+
+
+def build(setup: str, args):
+    if setup == "hf":
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+        return HuggingFaceEmbedding(model_name=args.model, embed_batch_size=10)
+    settings = {"model_name": args.model, "batch_size": args.batch_size, "bucketing": setup != "in-order"}
+    if setup == "pool":
+        settings["processes"] = args.processes
+    if setup.startswith("onnx"):
+        settings["backend"] = setup
+    return EmbeddingService(**settings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="model id or local sentence-transformers path")
+    parser.add_argument("--chunks", type=int, default=2_000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--setups", nargs="+", choices=SETUPS, default=["hf", "in-order", "bucketed", "pool"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks, args.seed)
+    print(f"{args.chunks} chunks, {sum(map(len, chunks)) / len(chunks):.0f} characters on average; "
+          f"model {args.model}, batch size {args.batch_size}\n")
+    print(f"{'setup':<11}{'load s':>8}{'chunks/s':>10}{'padding':>9}{'cosine':>8}")
+
+    reference = None
+    for setup in args.setups:
+        try:
+            start = time.perf_counter()
+            model = build(setup, args)
+            # Load the model (or start the workers) before timing
+            model.get_text_embedding_batch(chunks[:args.batch_size * max(1, args.processes)])
+            load = time.perf_counter() - start
+        except Exception as e:
+            # e.g. the ONNX backends without `pip install "sentence-transformers[onnx]"`
+            print(f"{setup:<11}  skipped: {str(e).splitlines()[0]}")
+            continue
+
+        start = time.perf_counter()
+        vectors = np.array(model.get_text_embedding_batch(chunks))
+        seconds = time.perf_counter() - start
+
+        batch_size = 10 if setup == "hf" else args.batch_size
+        # HuggingFaceEmbedding hands sentence-transformers 10 texts at a time, in input order
+        padded, total = padding(chunks, length_batches(chunks, batch_size, setup not in ("hf", "in-order")))
+        if reference is None:
+            reference = vectors
+        cosine = float(np.mean(np.sum(reference * vectors, axis=1)
+                               / (np.linalg.norm(reference, axis=1) * np.linalg.norm(vectors, axis=1))))
+        print(f"{setup:<11}{load:>8.1f}{len(chunks) / seconds:>10.0f}{padded / total:>9.0%}{cosine:>8.3f}")
+        if isinstance(model, EmbeddingService):
+            model.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Hybrid Retrieval Benchmark
+==========================
+
+Ingests a synthetic corpus into a temporary Chroma collection and asks for
+each of a sample of its files with three kinds of query:
+
+    code         the file's unique code ("what does ZX-4821 mean?"), a term
+                 only keyword search can match
+    paraphrase   the file's two topics in words no file uses
+    mixed        one topic in the file's words, the other paraphrased
+
+Every file covers two topics and carries a code. Each topic has synonyms:
+files are written with one of the first two, and queries paraphrase with
+the third, the way users ask in words the docs don't use. The dense model
+is a stand-in that, like a real one, maps synonyms of a topic close
+together and knows nothing about codes: the topic of each word is one
+dimension, every other word is hashed into the rest. Each setup reports
+retrieval time per query and recall@1 and recall@k (the share of queries
+whose file is in the top 1 / top k):
+
+    dense          index.as_retriever(), as the examples used to query
+    bm25           PersistentBM25Retriever alone
+    hybrid         both, fused by reciprocal rank
+    hybrid+rerank  --candidates from hybrid, reranked by --rerank-model to top k
+
+The BM25 index's build time, and its load time from disk on a restart, are
+reported first. hybrid+rerank runs only with --rerank-model, which needs a
+model download, e.g. cross-encoder/ms-marco-MiniLM-L-6-v2; its recall is only
+meaningful on natural text, not on this corpus of made-up words.
+
+Usage:
+    python benchmark_hybrid.py
+    python benchmark_hybrid.py --files 5000 --queries 300 --top-k 5
+    python benchmark_hybrid.py --rerank-model cross-encoder/ms-marco-MiniLM-L-6-v2
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List
+
+import chromadb
+import numpy as np
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.ingestion import IngestionPipeline
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import QueryBundle
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+from benchmark_ingest import WORDS
+from hybrid_retrieval import CrossEncoderRerank, HybridRetriever, PersistentBM25Retriever
+from incremental_ingest import IncrementalIngestion
+
+QUERY_KINDS = ("code", "paraphrase", "mixed")
+SYNONYMS = 3
+SYLLABLES = "ka lo mi ne ru ta vo zi be du fa go".split()
+
+
+class TopicEmbedding(BaseEmbedding):
+    """One dimension per topic, shared by its synonyms; other words hashed into the rest"""
+
+    topics: Dict[str, int]
+    dim: int = 384
+    # Weight of a word that isn't a topic synonym
+    other_weight: float = 0.3
+    # Sleep per query, standing in for a real model's cost
+    query_ms: float = 0.0
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "TopicEmbedding"
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        others = self.dim - len(set(self.topics.values()))
+        for word in text.lower().split():
+            word = word.strip("?.,#")
+            if word in self.topics:
+                vector[self.topics[word]] += 1.0
+            elif word:
+                vector[self.dim - 1 - zlib.crc32(word.encode()) % others] += self.other_weight
+        return (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        time.sleep(self.query_ms / 1000)
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def make_topics(count: int, rng: random.Random) -> List[List[str]]:
+    """`count` topics of SYNONYMS made-up words each"""
+    words = set()
+    while len(words) < count * SYNONYMS:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(3)))
+    words = sorted(words)
+    rng.shuffle(words)
+    return [words[i:i + SYNONYMS] for i in range(0, count * SYNONYMS, SYNONYMS)]
+
+
+def make_corpus(root: Path, files: int, topics: List[List[str]], rng: random.Random) -> List[dict]:
+    """Files of two topics and a code each; returns what each file says"""
+    pairs = [(a, b) for a in range(len(topics)) for b in range(a + 1, len(topics))]
+    if len(pairs) < files:
+        raise ValueError(f"{len(topics)} topics make only {len(pairs)} distinct files; raise --topics")
+    codes = rng.sample(range(1000, 10_000), files)
+    docs = []
+    for number, (a, b) in enumerate(rng.sample(pairs, files)):
+        doc = {"name": f"doc_{number:05d}.md", "code": f"ZX-{codes[number]}",
+               "topics": [(a, rng.randrange(SYNONYMS - 1)), (b, rng.randrange(SYNONYMS - 1))]}
+        filler = [rng.choice(WORDS) for _ in range(rng.randint(30, 60))]
+        for topic, synonym in doc["topics"]:
+            for _ in range(3):
+                filler.insert(rng.randrange(len(filler) + 1), topics[topic][synonym])
+        (root / doc["name"]).write_text(f"# {doc['name'][:-3]}\n\nCode {doc['code']}. " + " ".join(filler) + ".")
+        docs.append(doc)
+    return docs
+
+
+def make_queries(docs: List[dict], topics: List[List[str]], count: int, rng: random.Random) -> List[tuple]:
+    """(kind, query, file name) for `count` files, each asked for in every kind of query"""
+    queries = []
+    for doc in rng.sample(docs, min(count, len(docs))):
+        (a, sa), (b, _) = doc["topics"]
+        queries.append(("code", f"what does {doc['code']} mean?", doc["name"]))
+        queries.append(("paraphrase", f"how does {topics[a][-1]} use {topics[b][-1]}?", doc["name"]))
+        queries.append(("mixed", f"how does {topics[a][sa]} use {topics[b][-1]}?", doc["name"]))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--topics", type=int, default=80)
+    parser.add_argument("--queries", type=int, default=200, help="files asked for, in each kind of query")
+    parser.add_argument("--top-k", type=int, default=2)
+    parser.add_argument("--candidates", type=int, default=10, help="results per retriever fused, and reranked")
+    parser.add_argument("--rerank-model", help="cross-encoder for hybrid+rerank, e.g. cross-encoder/ms-marco-MiniLM-L-6-v2")
+    parser.add_argument("--embed-ms", type=float, default=10.0, help="simulated cost of embedding one query")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    work = Path(tempfile.mkdtemp(prefix="hybrid_bench_"))
+    corpus = work / "docs"
+    corpus.mkdir()
+    try:
+        topics = make_topics(args.topics, rng)
+        docs = make_corpus(corpus, args.files, topics, rng)
+        embed_model = TopicEmbedding(topics={word: i for i, words in enumerate(topics) for word in words},
+                                     query_ms=args.embed_ms)
+        collection = chromadb.PersistentClient(path=str(work / "chroma")).get_or_create_collection("bench")
+        store = ChromaVectorStore(chroma_collection=collection)
+        pipeline = IngestionPipeline(transformations=[SentenceSplitter(), embed_model], vector_store=store)
+        ingestion = IncrementalIngestion(pipeline, store, str(work / "chroma" / "bench.ingest.json"),
+                                         collection=collection)
+        print(f"{args.files} files: {ingestion.run(corpus)}")
+        index = VectorStoreIndex.from_vector_store(store, embed_model=embed_model)
+
+        bm25_dir = str(work / "chroma" / "bench.bm25")
+        start = time.perf_counter()
+        PersistentBM25Retriever(store, bm25_dir, lambda: ingestion.generation).index()
+        built = time.perf_counter() - start
+        sparse = PersistentBM25Retriever(store, bm25_dir, lambda: ingestion.generation,
+                                         similarity_top_k=args.candidates)
+        start = time.perf_counter()
+        sparse.index()
+        print(f"BM25 index: built in {built:.2f} s, loaded from disk in {time.perf_counter() - start:.2f} s")
+
+        queries = make_queries(docs, topics, args.queries, rng)
+        asked = len(queries) // len(QUERY_KINDS)
+        print(f"{len(queries)} queries: {asked} files, asked for by {', '.join(QUERY_KINDS)}\n")
+
+        hybrid = HybridRetriever([index.as_retriever(similarity_top_k=args.candidates), sparse],
+                                 similarity_top_k=args.candidates)
+        setups = {
+            "dense": (index.as_retriever(similarity_top_k=args.top_k), None),
+            "bm25": (sparse, None),
+            "hybrid": (hybrid, None),
+        }
+        if args.rerank_model:
+            reranker = CrossEncoderRerank(model=args.rerank_model, top_n=args.top_k)
+            # Loaded before timing
+            reranker._cross_encoder()
+            setups["hybrid+rerank"] = (hybrid, reranker)
+
+        header = f"{'setup':<15}{'ms/query':>10}"
+        for kind in QUERY_KINDS:
+            header += f"{f'{kind} @1':>15}{f'@{args.top_k}':>6}"
+        print(header)
+        for name, (retriever, reranker) in setups.items():
+            seconds = 0.0
+            hits = {kind: [0, 0] for kind in QUERY_KINDS}
+            for kind, query, expected in queries:
+                start = time.perf_counter()
+                nodes = retriever.retrieve(query)
+                if reranker is not None:
+                    nodes = reranker.postprocess_nodes(nodes, QueryBundle(query))
+                nodes = nodes[:args.top_k]
+                seconds += time.perf_counter() - start
+                files = [n.node.metadata.get("file_name") for n in nodes]
+                hits[kind][0] += files[:1] == [expected]
+                hits[kind][1] += expected in files
+
+            row = f"{name:<15}{seconds / len(queries) * 1000:>10.2f}"
+            for kind in QUERY_KINDS:
+                top1, topk = (count / asked for count in hits[kind])
+                row += f"{top1:>15.0%}{topk:>6.0%}"
+            print(row)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
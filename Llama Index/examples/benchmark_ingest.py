@@ -0,0 +1,136 @@
+"""
+Ingestion Benchmark
+===================
+
+Builds a synthetic corpus of small markdown files and ingests it into a
+temporary Chroma collection, the way 02_rag.py and 03_agents.py do:
+
+    full         pipeline.run over every file, which is what each start used to cost
+    first        IncrementalIngestion into an empty collection
+    no-op        the same corpus again, from a fresh IncrementalIngestion (as on a restart)
+    touched      mtime changed on --change-pct of the files, content the same
+    changed      --change-pct of the files edited, and as many deleted and added
+
+Each run reports wall time, files read and nodes embedded. By default the
+embedding model is LlamaIndex's MockEmbedding, so the numbers show the
+pipeline's own cost and the benchmark needs no model download.
+--embed-model bge uses BAAI/bge-small-en-v1.5 instead.
+
+Usage:
+    python benchmark_ingest.py
+    python benchmark_ingest.py --files 10000 --change-pct 1
+    python benchmark_ingest.py --files 500 --embed-model bge
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import chromadb
+from llama_index.core import SimpleDirectoryReader
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.ingestion import IngestionPipeline
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+from incremental_ingest import IncrementalIngestion
+
+WORDS = ("agent tool thought action observation memory planner retriever index vector "
+         "embedding chunk query answer workflow state context model prompt token").split()
+
+
+def write_file(path: Path, rng: random.Random) -> None:
+    paragraphs = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120))) + "."
+                  for _ in range(rng.randint(2, 6))]
+    path.write_text(f"# {path.stem}\n\n" + "\n\n".join(paragraphs))
+
+
+def make_corpus(root: Path, files: int, seed: int) -> None:
+    rng = random.Random(seed)
+    for number in range(files):
+        write_file(root / f"doc_{number:05d}.md", rng)
+
+
+def embed_model(name: str):
+    if name == "mock":
+        return MockEmbedding(embed_dim=384)
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    return HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5")
+
+
+def new_store(path: Path, name: str):
+    client = chromadb.PersistentClient(path=str(path))
+    collection = client.get_or_create_collection(name)
+    return collection, ChromaVectorStore(chroma_collection=collection)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=10_000)
+    parser.add_argument("--change-pct", type=float, default=1.0, help="percentage of files touched and changed")
+    parser.add_argument("--embed-model", choices=["mock", "bge"], default="mock")
+    parser.add_argument("--skip-full", action="store_true", help="skip the non-incremental baseline")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="ingest_bench_"))
+    corpus = work / "docs"
+    corpus.mkdir()
+    try:
+        start = time.perf_counter()
+        make_corpus(corpus, args.files, args.seed)
+        print(f"{args.files} files, {sum(p.stat().st_size for p in corpus.iterdir()) / 1e6:.1f} MB, "
+              f"written in {time.perf_counter() - start:.1f} s; embeddings: {args.embed_model}\n")
+        model = embed_model(args.embed_model)
+        transformations = [SentenceSplitter(chunk_overlap=0), model]
+
+        print(f"{'run':<10}{'seconds':>10}{'files read':>12}{'nodes':>9}")
+        if not args.skip_full:
+            # What every start of the examples used to do
+            _, store = new_store(work / "chroma_full", "bench")
+            start = time.perf_counter()
+            documents = SimpleDirectoryReader(input_dir=str(corpus)).load_data()
+            pipeline = IngestionPipeline(transformations=transformations, vector_store=store)
+            # Chroma refuses more than ~5k vectors per add, so large corpora go in slices
+            nodes = sum(len(pipeline.run(documents=documents[i:i + 4096])) for i in range(0, len(documents), 4096))
+            print(f"{'full':<10}{time.perf_counter() - start:>10.2f}{len(documents):>12}{nodes:>9}")
+
+        collection, store = new_store(work / "chroma", "bench")
+        manifest = work / "chroma" / "bench.ingest.json"
+
+        def ingest(label: str):
+            # A new instance per run, as a restarted process would have
+            pipeline = IngestionPipeline(transformations=transformations, vector_store=store)
+            report = IncrementalIngestion(pipeline, store, str(manifest), collection=collection).run(corpus)
+            print(f"{label:<10}{report.seconds:>10.3f}{report.added + report.updated:>12}{report.nodes:>9}")
+            return report
+
+        ingest("first")
+        ingest("no-op")
+
+        rng = random.Random(args.seed + 1)
+        names = sorted(corpus.iterdir())
+        count = max(1, int(len(names) * args.change_pct / 100))
+        for path in rng.sample(names, count):
+            os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+        ingest("touched")
+
+        picked = rng.sample(names, count * 2)
+        for path in picked[:count]:
+            write_file(path, rng)
+        for path in picked[count:]:
+            path.unlink()
+        for number in range(count):
+            write_file(corpus / f"new_{number:05d}.md", rng)
+        report = ingest("changed")
+        print(f"\nchanged: {report}; vectors in collection: {collection.count()}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Query Cache Benchmark
+=====================
+
+Ingests a synthetic corpus into a temporary Chroma collection, then replays
+a stream of queries the way a ReAct agent sends them to `info_lookup`: each
+question is asked, then often asked again verbatim, with different spacing,
+or reworded (words reordered, filler words added). The stream is run through
+
+    off        index.as_retriever(), as the examples used to query
+    exact      CachedRetriever, exact matches only
+    similar    CachedRetriever, also matching queries with cosine >= --similarity
+
+and, halfway through, a few files are edited and ingested again, which
+must invalidate cached results. Each setup reports retrieval time per query,
+the embeddings and vector searches it ran, its hit rate, and recall@k: the
+share of the nodes an uncached retriever returns for the same query that
+the setup returned too.
+
+By default queries are embedded with a hashed bag of words, so the benchmark
+needs no model download and reworded queries stay close. Each query embedding
+sleeps --embed-ms, about what bge-small takes for one query on a CPU.
+--embed-model bge uses BAAI/bge-small-en-v1.5 through the EmbeddingService.
+
+Usage:
+    python benchmark_query_cache.py
+    python benchmark_query_cache.py --questions 100 --repeats 4 --similarity 0.9
+    python benchmark_query_cache.py --embed-model bge
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import List
+
+import chromadb
+import numpy as np
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.ingestion import IngestionPipeline
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+from benchmark_ingest import WORDS, make_corpus, write_file
+from incremental_ingest import IncrementalIngestion
+from retrieval_cache import CachedRetriever
+
+# Shared helpers (llm_cache) live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from llm_cache import ResponseCache
+
+FILLER = ("please", "again", "exactly", "briefly", "the", "of")
+
+
+class HashEmbedding(BaseEmbedding):
+    """Bag of words hashed into `dim` buckets; deterministic and free of downloads"""
+
+    dim: int = 384
+    # Sleep per query, standing in for a real model's cost
+    query_ms: float = 0.0
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HashEmbedding"
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            vector[zlib.crc32(word.strip("?.,").encode()) % self.dim] += 1.0
+        return (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        time.sleep(self.query_ms / 1000)
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def query_stream(questions: int, repeats: int, seed: int) -> List[str]:
+    """Each question, then `repeats` follow-ups that are verbatim, re-spaced or reworded"""
+    rng = random.Random(seed)
+    stream = []
+    for _ in range(questions):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(4, 8))]
+        stream.append("what is " + " ".join(words) + "?")
+        for _ in range(repeats):
+            kind = rng.choice(("verbatim", "spacing", "reworded"))
+            if kind == "verbatim":
+                stream.append(stream[-1])
+            elif kind == "spacing":
+                stream.append("  what is  " + "  ".join(words) + "?  ")
+            else:
+                reworded = words[:]
+                rng.shuffle(reworded)
+                stream.append(f"what is {rng.choice(FILLER)} " + " ".join(reworded) + "?")
+    return stream
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--questions", type=int, default=60)
+    parser.add_argument("--repeats", type=int, default=3, help="follow-ups of each question")
+    parser.add_argument("--top-k", type=int, default=2)
+    parser.add_argument("--similarity", type=float, default=0.9)
+    parser.add_argument("--embed-model", choices=["hash", "bge"], default="hash")
+    parser.add_argument("--embed-ms", type=float, default=10.0,
+                        help="simulated cost of embedding one query with the hash model")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="query_cache_bench_"))
+    corpus = work / "docs"
+    corpus.mkdir()
+    try:
+        make_corpus(corpus, args.files, args.seed)
+        if args.embed_model == "bge":
+            from embedding_service import EmbeddingService
+            embed_model = EmbeddingService()
+        else:
+            embed_model = HashEmbedding(query_ms=args.embed_ms)
+        collection = chromadb.PersistentClient(path=str(work / "chroma")).get_or_create_collection("bench")
+        store = ChromaVectorStore(chroma_collection=collection)
+        pipeline = IngestionPipeline(transformations=[SentenceSplitter(chunk_overlap=0), embed_model],
+                                     vector_store=store)
+        ingestion = IncrementalIngestion(pipeline, store, str(work / "chroma" / "bench.ingest.json"),
+                                         collection=collection)
+        print(f"{args.files} files: {ingestion.run(corpus)}")
+        index = VectorStoreIndex.from_vector_store(store, embed_model=embed_model)
+        plain = index.as_retriever(similarity_top_k=args.top_k)
+
+        stream = query_stream(args.questions, args.repeats, args.seed)
+        edit_at = len(stream) // 2
+        print(f"{len(stream)} queries from {args.questions} questions; "
+              f"{max(1, args.files // 100)} files edited after query {edit_at}\n")
+
+        setups = {
+            "off": plain,
+            "exact": CachedRetriever(plain, embed_model, lambda: ingestion.generation, ResponseCache()),
+            "similar": CachedRetriever(plain, embed_model, lambda: ingestion.generation, ResponseCache(),
+                                       similarity=args.similarity),
+        }
+        # Each setup sees the corpus in the same state: restored after its run
+        originals = {path: path.read_text() for path in sorted(corpus.iterdir())[:max(1, args.files // 100)]}
+
+        print(f"{'setup':<9}{'ms/query':>10}{'embedded':>10}{'searches':>10}{'hit rate':>10}"
+              f"{f'recall@{args.top_k}':>11}")
+        for name, retriever in setups.items():
+            seconds, recalls = 0.0, []
+            for number, query in enumerate(stream):
+                if number == edit_at:
+                    rng = random.Random(args.seed + 1)
+                    for path in originals:
+                        write_file(path, rng)
+                    ingestion.run(corpus)
+                start = time.perf_counter()
+                nodes = retriever.retrieve(query)
+                seconds += time.perf_counter() - start
+                expected = {n.node_id for n in plain.retrieve(query)}
+                recalls.append(len(expected & {n.node_id for n in nodes}) / len(expected) if expected else 1.0)
+
+            if isinstance(retriever, CachedRetriever):
+                searches = retriever.lookups["miss"]
+                embedded = retriever.embeddings["computed"]
+                hit_rate = f"{retriever.hit_rate:.0%}"
+            else:
+                searches = embedded = len(stream)
+                hit_rate = "-"
+            print(f"{name:<9}{seconds / len(stream) * 1000:>10.2f}{embedded:>10}{searches:>10}{hit_rate:>10}"
+                  f"{np.mean(recalls):>11.1%}")
+
+            for path, text in originals.items():
+                path.write_text(text)
+            ingestion.run(corpus)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Synthesis Benchmark
+===================
+
+Answers a query from N retrieved chunks with each synthesis mode and
+reports LLM calls, sequential rounds of calls, and wall time:
+
+    tree        tree_summarize, as the examples used it
+    tree-async  tree_summarize with use_async=True
+    packed      PackedSynthesizer: one call when the chunks fit the budget,
+                parallel map-reduce when they don't
+
+The LLM is a local stand-in that sleeps like a hosted model would: a fixed
+latency per call, plus time per prompt token and per generated token. The
+numbers show how the modes schedule calls, not any model's speed.
+
+Usage:
+    python benchmark_synthesis.py
+    python benchmark_synthesis.py --chunks 2 8 32 --chunk-words 400 --context-tokens 3900
+    python benchmark_synthesis.py --latency-ms 800 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Any
+
+from llama_index.core.llms import CompletionResponse, CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.core.response_synthesizers import get_response_synthesizer
+from llama_index.core.utils import get_tokenizer
+
+from benchmark_ingest import WORDS
+from synthesis import PackedSynthesizer
+
+QUERY = "What is the definition of Agents work?"
+MODES = ("tree", "tree-async", "packed")
+
+
+class SlowLLM(CustomLLM):
+    """Sleeps latency + prompt and output time per call, and counts the calls"""
+
+    context_window: int = 3900
+    num_output: int = 256
+    latency_ms: float = 400.0
+    prompt_ms_per_token: float = 0.05
+    output_ms_per_token: float = 10.0
+    calls: int = 0
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(context_window=self.context_window, num_output=self.num_output, model_name="slow")
+
+    def _answer(self, prompt: str, max_tokens: int):
+        # A partial answer fills its token budget, as a thinking model's tends to
+        self.calls += 1
+        seconds = (self.latency_ms + len(get_tokenizer()(prompt)) * self.prompt_ms_per_token
+                   + max_tokens * self.output_ms_per_token) / 1000
+        return seconds, " ".join(["answer"] * max_tokens)
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        seconds, text = self._answer(prompt, kwargs.get("max_tokens") or self.num_output)
+        time.sleep(seconds)
+        return CompletionResponse(text=text)
+
+    @llm_completion_callback()
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        seconds, text = self._answer(prompt, kwargs.get("max_tokens") or self.num_output)
+        await asyncio.sleep(seconds)
+        return CompletionResponse(text=text)
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        raise NotImplementedError
+
+
+def make_chunks(count: int, words: int, seed: int):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words)) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[2, 8, 32], help="retrieved chunks per query")
+    parser.add_argument("--chunk-words", type=int, default=400)
+    parser.add_argument("--context-tokens", type=int, default=3900, help="the LLM's context window")
+    parser.add_argument("--answer-tokens", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=400.0, help="fixed cost of one LLM call")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"chunks of {args.chunk_words} words, context {args.context_tokens} tokens, "
+          f"answers of {args.answer_tokens} tokens, {args.latency_ms:.0f} ms per call\n")
+    print(f"{'chunks':<8}{'mode':<12}{'LLM calls':>10}{'rounds':>8}{'seconds':>9}")
+    for count in args.chunks:
+        chunks = make_chunks(count, args.chunk_words, args.seed)
+        for mode in args.modes:
+            llm = SlowLLM(context_window=args.context_tokens, num_output=args.answer_tokens,
+                          latency_ms=args.latency_ms)
+            rounds = "-"
+            if mode == "packed":
+                synthesizer = PackedSynthesizer(llm, answer_tokens=args.answer_tokens,
+                                                max_concurrency=args.concurrency)
+            else:
+                synthesizer = get_response_synthesizer(llm=llm, response_mode="tree_summarize",
+                                                       use_async=mode == "tree-async")
+            start = time.perf_counter()
+            synthesizer.get_response(QUERY, chunks)
+            seconds = time.perf_counter() - start
+            if mode == "packed":
+                rounds = synthesizer.last_report.levels
+            print(f"{count:<8}{mode:<12}{llm.calls:>10}{rounds:>8}{seconds:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
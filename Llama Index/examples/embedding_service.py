@@ -0,0 +1,293 @@
+"""
+Shared Embedding Service
+========================
+
+One embedding model per process, used both as the ingestion pipeline's
+embedding step and as the index's `embed_model`. The examples used to build
+two HuggingFaceEmbedding objects, so the model was loaded twice.
+
+`EmbeddingService` is a LlamaIndex `BaseEmbedding`:
+
+- The model is loaded on first use. An unchanged corpus (see incremental_ingest.py)
+  therefore loads nothing until the first query.
+- Texts are sorted by length before they are cut into batches of `batch_size`, so
+  short chunks aren't padded to the length of a long one in the same batch, and the
+  vectors are returned in input order.
+- With `processes` > 0, large ingestion batches are spread over a pool of CPU worker
+  processes, each with its own copy of the model and an equal share of the threads.
+  Queries are always embedded in-process.
+- `backend` picks the runtime: "torch" (the same sentence-transformers model
+  HuggingFaceEmbedding loads), "onnx" (ONNX Runtime), or "onnx-int8" (ONNX Runtime
+  with dynamically quantized int8 weights, exported once into the cache folder).
+  The ONNX backends need `pip install "sentence-transformers[onnx]"`.
+
+`stats` counts chunks, seconds and padding, and `chunks_per_sec` reports throughput.
+
+Usage:
+    embed_model = embedding_service_from_env()
+    pipeline = IngestionPipeline(transformations=[SentenceSplitter(), embed_model], vector_store=vector_store)
+    index = VectorStoreIndex.from_vector_store(vector_store, embed_model=embed_model)
+
+Environment Variables:
+    RAG_EMBED_BACKEND - (Optional) torch (default), onnx or onnx-int8
+    RAG_EMBED_BATCH_SIZE - (Optional) texts per forward pass (default 32)
+    RAG_EMBED_BUCKETING - (Optional) 1 (default) to batch texts of similar length together, 0 to keep input order
+    RAG_EMBED_PROCESSES - (Optional) CPU worker processes for ingestion (default 0, in-process)
+"""
+
+import atexit
+import os
+import platform
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+
+DEFAULT_MODEL = "BAAI/bge-small-en-v1.5"
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def _instructions(model_name: str) -> Dict[str, str]:
+    """The query/text prompts HuggingFaceEmbedding would use, so the vectors match"""
+    try:
+        from llama_index.embeddings.huggingface.utils import (
+            get_query_instruct_for_model_name,
+            get_text_instruct_for_model_name,
+        )
+    except ImportError:
+        return {"query": "", "text": ""}
+    return {"query": get_query_instruct_for_model_name(model_name),
+            "text": get_text_instruct_for_model_name(model_name)}
+
+
+def _quantization_config() -> str:
+    return "arm64" if platform.machine().lower() in ("arm64", "aarch64") else "avx2"
+
+
+def load_model(model_name: str, backend: str = "torch", cache_folder: Optional[str] = None,
+               device: Optional[str] = None):
+    """A sentence-transformers model on `backend`; onnx-int8 is quantized once and reused"""
+    from sentence_transformers import SentenceTransformer
+
+    if backend not in BACKENDS:
+        raise ValueError(f"RAG_EMBED_BACKEND must be one of {', '.join(BACKENDS)}, got {backend!r}")
+    prompts = _instructions(model_name)
+    if backend == "torch":
+        return SentenceTransformer(model_name, device=device, cache_folder=cache_folder, prompts=prompts)
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx", device=device, cache_folder=cache_folder,
+                                   prompts=prompts)
+
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    config = _quantization_config()
+    root = Path(cache_folder or Path.home() / ".cache" / "embedding_service")
+    local = root / f"{model_name.replace('/', '--')}-onnx-int8"
+    # avx2 quantizes to unsigned int8 ("quint8"), arm64 to signed ("qint8")
+    exported = sorted((local / "onnx").glob(f"model_*int8_{config}.onnx"))
+    if not exported:
+        model = SentenceTransformer(model_name, backend="onnx", cache_folder=cache_folder, prompts=prompts)
+        model.save(str(local))
+        export_dynamic_quantized_onnx_model(model, config, str(local))
+        exported = sorted((local / "onnx").glob(f"model_*int8_{config}.onnx"))
+    return SentenceTransformer(str(local), backend="onnx", device=device, prompts=prompts,
+                               model_kwargs={"file_name": f"onnx/{exported[0].name}"})
+
+
+def length_batches(texts: Sequence[str], batch_size: int, bucketing: bool) -> List[List[int]]:
+    """Indices of `texts` in batches; longest first and of similar length when bucketing"""
+    order = sorted(range(len(texts)), key=lambda i: -len(texts[i])) if bucketing else list(range(len(texts)))
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def padding(texts: Sequence[str], batches: Sequence[Sequence[int]]) -> Tuple[int, int]:
+    """(padding, total) characters when every batch is padded to its longest text"""
+    padded = total = 0
+    for batch in batches:
+        lengths = [len(texts[i]) for i in batch]
+        padded += max(lengths) * len(lengths) - sum(lengths)
+        total += max(lengths) * len(lengths)
+    return padded, total
+
+
+# Worker processes hold one model each, loaded by the pool initializer
+_worker_model = None
+
+
+def _init_worker(model_name: str, backend: str, cache_folder: Optional[str], threads: int) -> None:
+    global _worker_model
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_model = load_model(model_name, backend, cache_folder, device="cpu")
+
+
+def _worker_ready() -> bool:
+    return _worker_model is not None
+
+
+@contextmanager
+def _without_main():
+    """Spawned workers re-run the caller's `__main__` unless it is hidden while they start.
+
+    The workers only need this module, and the example scripts do their ingestion at
+    module level, so each worker would otherwise ingest the documents again.
+    """
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+def _encode_in_worker(texts: List[str], normalize: bool) -> List[List[float]]:
+    return _worker_model.encode(texts, batch_size=len(texts), prompt_name="text",
+                                normalize_embeddings=normalize).tolist()
+
+
+class EmbeddingService(BaseEmbedding):
+    """
+    Sentence-transformers embeddings, loaded once per process and batched by length.
+
+    Args:
+        model_name: Hugging Face model id or local path.
+        backend: "torch", "onnx" or "onnx-int8".
+        batch_size: Texts per forward pass.
+        bucketing: Batch texts of similar length together.
+        processes: CPU worker processes for large batches (ingestion); 0 embeds in-process.
+        embed_batch_size: Texts LlamaIndex hands over per call; sorted and batched together,
+            so larger means less padding.
+    """
+
+    model_name: str = Field(default=DEFAULT_MODEL)
+    backend: str = Field(default="torch", description="torch, onnx or onnx-int8")
+    batch_size: int = Field(default=32, gt=0, description="Texts per forward pass")
+    bucketing: bool = Field(default=True, description="Batch texts of similar length together")
+    processes: int = Field(default=0, ge=0, description="CPU worker processes for ingestion")
+    normalize: bool = Field(default=True)
+    cache_folder: Optional[str] = Field(default=None)
+
+    _model: Any = PrivateAttr(default=None)
+    _pool: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _stats: Dict[str, float] = PrivateAttr(default_factory=dict)
+
+    def __init__(self, embed_batch_size: int = 1024, **kwargs: Any):
+        super().__init__(embed_batch_size=embed_batch_size, **kwargs)
+        if self.backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {', '.join(BACKENDS)}, got {self.backend!r}")
+        self.reset_stats()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "EmbeddingService"
+
+    @property
+    def model(self):
+        """The in-process model, loaded on first use"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    self._model = load_model(self.model_name, self.backend, self.cache_folder)
+                    self._stats["load_seconds"] += time.perf_counter() - start
+        return self._model
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return dict(self._stats)
+
+    def reset_stats(self) -> None:
+        self._stats = {"chunks": 0, "seconds": 0.0, "batches": 0, "padded_chars": 0, "batched_chars": 0,
+                       "load_seconds": self._stats.get("load_seconds", 0.0) if self._stats else 0.0}
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self._stats["chunks"] / self._stats["seconds"] if self._stats["seconds"] else 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            threads = max(1, (os.cpu_count() or 1) // self.processes)
+            pool = ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=get_context("spawn"), initializer=_init_worker,
+                initargs=(self.model_name, self.backend, self.cache_folder, threads),
+            )
+            with _without_main():
+                # Workers are spawned on submit; start them all now, while __main__ is hidden
+                ready = [pool.submit(_worker_ready) for _ in range(self.processes)]
+            for job in ready:
+                job.result()
+            self._pool = pool
+            atexit.register(self.close)
+        return self._pool
+
+    def close(self) -> None:
+        """Stop the worker pool, if one was started"""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        use_pool = self.processes and len(texts) >= self.batch_size * self.processes
+        # Load the model (or start the workers) first, so load time isn't counted as embedding time
+        pool = self._get_pool() if use_pool else None
+        model = None if use_pool else self.model
+        start = time.perf_counter()
+        batches = length_batches(texts, self.batch_size, self.bucketing)
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        if pool is not None:
+            # Whole batches go to the workers, so each keeps its similar-length grouping
+            jobs = [(batch, pool.submit(_encode_in_worker, [texts[i] for i in batch], self.normalize))
+                    for batch in batches]
+            for batch, job in jobs:
+                for i, vector in zip(batch, job.result()):
+                    vectors[i] = vector
+        else:
+            for batch in batches:
+                encoded = model.encode([texts[i] for i in batch], batch_size=len(batch), prompt_name="text",
+                                       normalize_embeddings=self.normalize)
+                for i, vector in zip(batch, encoded.tolist()):
+                    vectors[i] = vector
+
+        padded, total = padding(texts, batches)
+        self._stats["chunks"] += len(texts)
+        self._stats["batches"] += len(batches)
+        self._stats["padded_chars"] += padded
+        self._stats["batched_chars"] += total
+        self._stats["seconds"] += time.perf_counter() - start
+        return vectors
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self.model.encode([query], prompt_name="query", normalize_embeddings=self.normalize)[0].tolist()
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed_texts([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_texts(texts)
+
+
+def embedding_service_from_env(model_name: str = DEFAULT_MODEL, **kwargs: Any) -> EmbeddingService:
+    """An EmbeddingService configured by the RAG_EMBED_* environment variables"""
+    settings = {
+        "backend": os.environ.get("RAG_EMBED_BACKEND", "torch").lower(),
+        "batch_size": int(os.environ.get("RAG_EMBED_BATCH_SIZE", "32")),
+        "bucketing": os.environ.get("RAG_EMBED_BUCKETING", "1") != "0",
+        "processes": int(os.environ.get("RAG_EMBED_PROCESSES", "0")),
+    }
+    settings.update(kwargs)
+    return EmbeddingService(model_name=model_name, **settings)
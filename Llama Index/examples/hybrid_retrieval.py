@@ -0,0 +1,240 @@
+"""
+Hybrid Retrieval
+================
+
+Dense retrieval over Chroma finds chunks that mean what the query means, but
+misses exact terms (names, ids, error codes) the embedding model doesn't
+know. BM25 finds those terms, but misses paraphrases. `HybridRetriever` asks
+both and merges their rankings with reciprocal rank fusion (RRF): each chunk
+scores sum(1 / (k + rank)) over the rankings it appears in, so a chunk near
+the top of either list ranks high, and one in both ranks highest.
+
+- `PersistentBM25Retriever` keeps a BM25 index (llama-index-retrievers-bm25)
+  of every node in the collection, on disk next to it. It is rebuilt from the
+  collection when the ingestion generation (see incremental_ingest.py)
+  changes, and loaded from disk otherwise.
+- `CrossEncoderRerank` optionally rescores the fused candidates with a local
+  cross-encoder on CPU, in batches of similar-length passages, and keeps the
+  best `top_n`.
+
+With a reranker, retrieval returns `RAG_CANDIDATES` chunks and the reranker
+keeps `RAG_TOP_K` of them; without one, retrieval returns `RAG_TOP_K`.
+
+Usage:
+    retriever = hybrid_retriever_from_env(index, lambda: ingestion.generation, "chroma_db/examples.bm25")
+    query_engine = RetrieverQueryEngine.from_args(retriever, llm=llm, node_postprocessors=rerankers_from_env())
+
+Environment Variables:
+    RAG_RETRIEVAL - (Optional) hybrid (default), dense (Chroma only) or sparse (BM25 only)
+    RAG_TOP_K - (Optional) chunks sent to the LLM (default 2)
+    RAG_CANDIDATES - (Optional) chunks each retriever contributes to fusion and reranking (default 10)
+    RAG_RERANK_MODEL - (Optional) cross-encoder to rerank with, e.g. cross-encoder/ms-marco-MiniLM-L-6-v2 (default: off)
+    RAG_RERANK_BATCH_SIZE - (Optional) query/passage pairs per forward pass (default 32)
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+from llama_index.core.vector_stores.types import BasePydanticVectorStore
+
+from embedding_service import length_batches
+
+RETRIEVAL_MODES = ("hybrid", "dense", "sparse")
+# The constant of Cormack et al.'s reciprocal rank fusion
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[NodeWithScore]], top_k: int,
+                           k: int = RRF_K) -> List[NodeWithScore]:
+    """The `top_k` nodes by summed 1 / (k + rank) over `rankings`, each ranked best first"""
+    scores: Dict[str, float] = {}
+    nodes: Dict[str, NodeWithScore] = {}
+    for ranking in rankings:
+        for rank, node in enumerate(ranking, start=1):
+            scores[node.node.node_id] = scores.get(node.node.node_id, 0.0) + 1.0 / (k + rank)
+            nodes.setdefault(node.node.node_id, node)
+    best = sorted(scores, key=scores.__getitem__, reverse=True)[:top_k]
+    return [NodeWithScore(node=nodes[node_id].node, score=scores[node_id]) for node_id in best]
+
+
+class PersistentBM25Retriever(BaseRetriever):
+    """
+    BM25 over every node in a vector store, persisted and rebuilt when the ingestion generation changes.
+
+    Args:
+        vector_store: Where the nodes come from; ChromaVectorStore returns them all from `get_nodes`.
+        persist_dir: Directory the index is saved in, one subdirectory per generation.
+        generation: Returns the current ingestion generation, e.g. `lambda: ingestion.generation`.
+        similarity_top_k: Nodes returned per query.
+    """
+
+    def __init__(self, vector_store: BasePydanticVectorStore, persist_dir: str, generation: Callable[[], int],
+                 similarity_top_k: int = 10, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.vector_store = vector_store
+        self.persist_dir = Path(persist_dir)
+        self.generation = generation
+        self.similarity_top_k = similarity_top_k
+        self._lock = threading.Lock()
+        # (generation, BM25Retriever or None for an empty collection)
+        self._index: Optional[tuple] = None
+
+    def _load_or_build(self, generation: int):
+        from llama_index.retrievers.bm25 import BM25Retriever
+
+        try:
+            current = json.loads((self.persist_dir / "current.json").read_text())
+        except (FileNotFoundError, ValueError):
+            current = {}
+        if current.get("generation") == generation:
+            if current.get("empty"):
+                return None
+            return BM25Retriever.from_persist_dir(str(self.persist_dir / current["dir"]), show_progress=False)
+
+        nodes = self.vector_store.get_nodes(node_ids=None)
+        # top-k is set per query
+        bm25 = BM25Retriever.from_defaults(nodes=nodes, similarity_top_k=1) if nodes else None
+        self.persist_dir.mkdir(parents=True, exist_ok=True)
+        name = f"generation-{generation}"
+        if bm25 is not None:
+            shutil.rmtree(self.persist_dir / name, ignore_errors=True)
+            bm25.persist(str(self.persist_dir / name), show_progress=False)
+        # Point at the new index, then drop the old ones; a crash in between leaves a usable index
+        fd, tmp = tempfile.mkstemp(dir=self.persist_dir)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"generation": generation, "dir": name, "empty": bm25 is None}, f)
+        os.replace(tmp, self.persist_dir / "current.json")
+        for old in self.persist_dir.glob("generation-*"):
+            if old.name != name:
+                shutil.rmtree(old, ignore_errors=True)
+        return bm25
+
+    def index(self):
+        """The BM25 retriever for the current generation, or None if the collection is empty"""
+        generation = self.generation()
+        if self._index is None or self._index[0] != generation:
+            with self._lock:
+                if self._index is None or self._index[0] != generation:
+                    self._index = (generation, self._load_or_build(generation))
+        return self._index[1]
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        bm25 = self.index()
+        if bm25 is None:
+            return []
+        # bm25s can't return more nodes than it holds
+        bm25.similarity_top_k = min(self.similarity_top_k, int(bm25.bm25.scores["num_docs"]))
+        # Nodes that share no term with the query score 0 and aren't matches
+        return [node for node in bm25.retrieve(query_bundle) if node.score]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense and sparse results merged by reciprocal rank fusion.
+
+    Args:
+        retrievers: Retrievers whose rankings are fused, e.g. the index's retriever and a BM25 one.
+        similarity_top_k: Nodes returned after fusion.
+        rrf_k: RRF constant; larger values flatten the difference between ranks.
+    """
+
+    def __init__(self, retrievers: Sequence[BaseRetriever], similarity_top_k: int = 2, rrf_k: int = RRF_K,
+                 **kwargs: Any):
+        super().__init__(**kwargs)
+        self.retrievers = list(retrievers)
+        self.similarity_top_k = similarity_top_k
+        self.rrf_k = rrf_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        rankings = [retriever.retrieve(query_bundle) for retriever in self.retrievers]
+        return reciprocal_rank_fusion(rankings, self.similarity_top_k, self.rrf_k)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        rankings = await asyncio.gather(*(retriever.aretrieve(query_bundle) for retriever in self.retrievers))
+        return reciprocal_rank_fusion(rankings, self.similarity_top_k, self.rrf_k)
+
+
+class CrossEncoderRerank(BaseNodePostprocessor):
+    """
+    Rescores nodes against the query with a sentence-transformers cross-encoder, batched on CPU.
+
+    The model is loaded on first use. Passages are batched by length, like EmbeddingService
+    batches texts, so short ones aren't padded to a long one.
+    """
+
+    model: str = Field(description="Cross-encoder model id or local path")
+    top_n: int = Field(default=2, gt=0, description="Nodes kept after reranking")
+    batch_size: int = Field(default=32, gt=0, description="Query/passage pairs per forward pass")
+    max_length: int = Field(default=512, gt=0, description="Tokens per query/passage pair")
+    device: str = Field(default="cpu")
+
+    _model: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CrossEncoderRerank"
+
+    def _cross_encoder(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model, device=self.device, max_length=self.max_length)
+        return self._model
+
+    def _postprocess_nodes(self, nodes: List[NodeWithScore],
+                           query_bundle: Optional[QueryBundle] = None) -> List[NodeWithScore]:
+        if query_bundle is None:
+            raise ValueError("CrossEncoderRerank needs the query")
+        if not nodes:
+            return []
+        passages = [node.node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+        model = self._cross_encoder()
+        scores = [0.0] * len(nodes)
+        for batch in length_batches(passages, self.batch_size, bucketing=True):
+            predicted = model.predict([(query_bundle.query_str, passages[i]) for i in batch],
+                                      batch_size=len(batch), show_progress_bar=False)
+            for i, score in zip(batch, predicted):
+                scores[i] = float(score)
+        order = sorted(range(len(nodes)), key=lambda i: -scores[i])[:self.top_n]
+        return [NodeWithScore(node=nodes[i].node, score=scores[i]) for i in order]
+
+
+def rerankers_from_env() -> List[BaseNodePostprocessor]:
+    """[CrossEncoderRerank] when RAG_RERANK_MODEL is set, else []; pass as node_postprocessors"""
+    model = os.environ.get("RAG_RERANK_MODEL")
+    if not model:
+        return []
+    return [CrossEncoderRerank(model=model, top_n=int(os.environ.get("RAG_TOP_K") or 2),
+                               batch_size=int(os.environ.get("RAG_RERANK_BATCH_SIZE") or 32))]
+
+
+def hybrid_retriever_from_env(index: Any, generation: Callable[[], int], persist_dir: str) -> BaseRetriever:
+    """
+    The retriever RAG_RETRIEVAL asks for over `index`, returning RAG_TOP_K nodes, or RAG_CANDIDATES
+    when RAG_RERANK_MODEL is set (the reranker then keeps RAG_TOP_K).
+    """
+    mode = (os.environ.get("RAG_RETRIEVAL") or "hybrid").lower()
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"RAG_RETRIEVAL must be one of {', '.join(RETRIEVAL_MODES)}, got {mode!r}")
+    candidates = int(os.environ.get("RAG_CANDIDATES") or 10)
+    top_k = candidates if os.environ.get("RAG_RERANK_MODEL") else int(os.environ.get("RAG_TOP_K") or 2)
+
+    if mode == "dense":
+        return index.as_retriever(similarity_top_k=top_k)
+    sparse = PersistentBM25Retriever(index.vector_store, persist_dir, generation, similarity_top_k=candidates)
+    if mode == "sparse":
+        sparse.similarity_top_k = top_k
+        return sparse
+    return HybridRetriever([index.as_retriever(similarity_top_k=candidates), sparse], similarity_top_k=top_k)
@@ -0,0 +1,268 @@
+"""
+Query Embedding and Retrieval Cache
+===================================
+
+A ReAct agent often sends the `info_lookup` tool the same question, or nearly
+the same one, several times in one run. `CachedRetriever` sits in front of an
+index's retriever and remembers, for each query:
+
+- its embedding, keyed by the embedding model's settings and the query text;
+- the top-k nodes it retrieved and their scores, keyed by the query text and
+  the ingestion generation.
+
+A repeated query (ignoring extra whitespace) costs no embedding, no vector
+search and no round trip to the store. With a similarity threshold, a new
+query whose embedding has a cosine similarity of at least that much with a
+cached query gets that query's nodes, which saves the vector search.
+
+Results are keyed by `IncrementalIngestion.generation`, which goes up
+whenever an ingestion run changes the collection, so the nodes in a cached
+result can't be out of date. Results from an earlier generation are not
+used again and are evicted as they age out. Embeddings don't
+depend on the collection and are kept.
+
+Storage is an `llm_cache.ResponseCache`: an in-memory LRU, optionally in
+front of a SQLite file, so a restarted process keeps its cache.
+
+Usage:
+    retriever = cached_retriever_from_env(index, embed_model, lambda: ingestion.generation)
+    query_engine = RetrieverQueryEngine.from_args(retriever, llm=llm)
+
+Environment Variables:
+    RAG_QUERY_CACHE - (Optional) off (default), memory or disk
+    RAG_QUERY_CACHE_PATH - (Optional) SQLite file for the disk tier (default ~/.cache/ai-agentic/query_cache.sqlite)
+    RAG_QUERY_CACHE_MAX_BYTES - (Optional) byte bound of the disk tier (default 64 MB)
+    RAG_QUERY_CACHE_SIMILARITY - (Optional) cosine similarity at which queries share results, e.g. 0.95
+"""
+
+import base64
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.storage.docstore.utils import doc_to_json, json_to_doc
+
+from incremental_ingest import transformations_fingerprint
+
+# Shared helpers (llm_cache) live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from llm_cache import ResponseCache, cache_key
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ai-agentic", "query_cache.sqlite")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Queries per generation compared against for near-duplicates; the oldest drop out of that index first
+MAX_SIMILAR_ENTRIES = 256
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.split())
+
+
+class CachedRetriever(BaseRetriever):
+    """
+    Caches a retriever's query embeddings and results until the collection changes.
+
+    Args:
+        retriever: The retriever that serves misses, e.g. `index.as_retriever()`.
+        embed_model: The model `retriever` embeds queries with.
+        generation: Returns the current ingestion generation, e.g. `lambda: ingestion.generation`.
+        cache: Where entries live; its size bounds and eviction apply.
+        similarity: Cosine similarity at which a new query reuses a cached query's nodes,
+            or None for exact matches only.
+        scope: Part of every result key, for what else tells retrievers sharing a cache
+            apart (collection id, top-k).
+    """
+
+    def __init__(
+        self,
+        retriever: BaseRetriever,
+        embed_model: BaseEmbedding,
+        generation: Callable[[], int],
+        cache: ResponseCache,
+        similarity: Optional[float] = None,
+        scope: str = "",
+    ):
+        super().__init__(callback_manager=retriever.callback_manager)
+        self.retriever = retriever
+        self.embed_model = embed_model
+        self.generation = generation
+        self.cache = cache
+        self.similarity = similarity
+        self.scope = scope
+        self.embedding_model_id = transformations_fingerprint([embed_model])
+        self.lookups: Dict[str, int] = {"exact": 0, "similar": 0, "miss": 0}
+        self.embeddings: Dict[str, int] = {"cached": 0, "computed": 0}
+        self._lock = threading.Lock()
+        # (generation, query keys, unit vectors) of the near-duplicate index, loaded on first use
+        self._similar: Optional[Tuple[int, List[str], np.ndarray]] = None
+
+    @property
+    def hit_rate(self) -> float:
+        total = sum(self.lookups.values())
+        return (self.lookups["exact"] + self.lookups["similar"]) / total if total else 0.0
+
+    def _count(self, counter: Dict[str, int], result: str) -> None:
+        with self._lock:
+            counter[result] += 1
+
+    def _key(self, kind: str, generation: Optional[int], value: Any) -> str:
+        return cache_key(self.embedding_model_id, {"kind": kind, "scope": self.scope, "generation": generation}, value)
+
+    # Results
+
+    @staticmethod
+    def _load_nodes(value: bytes) -> List[NodeWithScore]:
+        return [NodeWithScore(node=json_to_doc(node), score=score) for node, score in json.loads(value)]
+
+    def _exact(self, generation: int, text: str) -> Optional[List[NodeWithScore]]:
+        value = self.cache.get(self._key("result", generation, text))
+        if value is None:
+            return None
+        self._count(self.lookups, "exact")
+        return self._load_nodes(value)
+
+    def _similar_index(self, generation: int) -> Tuple[int, List[str], np.ndarray]:
+        if self._similar is None or self._similar[0] != generation:
+            value = self.cache.get(self._key("similar", generation, ""))
+            if value is None:
+                self._similar = (generation, [], np.zeros((0, 0), dtype=np.float32))
+            else:
+                data = json.loads(value)
+                vectors = np.frombuffer(base64.b64decode(data["vectors"]), dtype=np.float32)
+                self._similar = (generation, data["keys"], vectors.reshape(len(data["keys"]), -1))
+        return self._similar
+
+    def _nearest(self, generation: int, text: str, embedding: Sequence[float]) -> Optional[List[NodeWithScore]]:
+        """Nodes of the most similar cached query, if it is similar enough"""
+        if self.similarity is not None:
+            with self._lock:
+                _, keys, vectors = self._similar_index(generation)
+                best = None
+                if keys:
+                    query = np.asarray(embedding, dtype=np.float32)
+                    scores = vectors @ (query / (np.linalg.norm(query) or 1.0))
+                    best = int(np.argmax(scores))
+                    best = keys[best] if scores[best] >= self.similarity else None
+            value = self.cache.get(best) if best else None
+            if value is not None:
+                self._count(self.lookups, "similar")
+                # This exact query hits directly next time
+                self.cache.put(self._key("result", generation, text), value)
+                return self._load_nodes(value)
+        self._count(self.lookups, "miss")
+        return None
+
+    def _store(self, generation: int, text: str, embedding: Sequence[float], nodes: List[NodeWithScore]) -> None:
+        key = self._key("result", generation, text)
+        self.cache.put(key, json.dumps([[doc_to_json(n.node), n.score] for n in nodes]).encode("utf-8"))
+        if self.similarity is None:
+            return
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self._lock:
+            _, keys, vectors = self._similar_index(generation)
+            keys = (keys + [key])[-MAX_SIMILAR_ENTRIES:]
+            vectors = np.vstack([vectors, vector[None, :]] if len(vectors) else [vector[None, :]])
+            vectors = vectors[-MAX_SIMILAR_ENTRIES:]
+            self._similar = (generation, keys, vectors)
+            value = {"keys": keys, "vectors": base64.b64encode(vectors.tobytes()).decode("ascii")}
+            self.cache.put(self._key("similar", generation, ""), json.dumps(value).encode("utf-8"))
+
+    # Embeddings
+
+    def _cached_embedding(self, query_bundle: QueryBundle) -> Tuple[str, Optional[List[float]]]:
+        key = self._key("embedding", None, [normalize_query(s) for s in query_bundle.embedding_strs])
+        value = self.cache.get(key)
+        if value is None:
+            return key, None
+        self._count(self.embeddings, "cached")
+        return key, np.frombuffer(value, dtype=np.float32).tolist()
+
+    def _store_embedding(self, key: str, embedding: List[float]) -> None:
+        self._count(self.embeddings, "computed")
+        self.cache.put(key, np.asarray(embedding, dtype=np.float32).tobytes())
+
+    # Retrieval
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        generation = self.generation()
+        text = normalize_query(query_bundle.query_str)
+        nodes = self._exact(generation, text)
+        if nodes is not None:
+            return nodes
+
+        if query_bundle.embedding is None:
+            key, embedding = self._cached_embedding(query_bundle)
+            if embedding is None:
+                embedding = self.embed_model.get_agg_embedding_from_queries(query_bundle.embedding_strs)
+                self._store_embedding(key, embedding)
+            query_bundle = QueryBundle(query_str=query_bundle.query_str, embedding=embedding,
+                                       custom_embedding_strs=query_bundle.custom_embedding_strs)
+
+        nodes = self._nearest(generation, text, query_bundle.embedding)
+        if nodes is None:
+            nodes = self.retriever.retrieve(query_bundle)
+            self._store(generation, text, query_bundle.embedding, nodes)
+        return nodes
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        generation = self.generation()
+        text = normalize_query(query_bundle.query_str)
+        nodes = self._exact(generation, text)
+        if nodes is not None:
+            return nodes
+
+        if query_bundle.embedding is None:
+            key, embedding = self._cached_embedding(query_bundle)
+            if embedding is None:
+                embedding = await self.embed_model.aget_agg_embedding_from_queries(query_bundle.embedding_strs)
+                self._store_embedding(key, embedding)
+            query_bundle = QueryBundle(query_str=query_bundle.query_str, embedding=embedding,
+                                       custom_embedding_strs=query_bundle.custom_embedding_strs)
+
+        nodes = self._nearest(generation, text, query_bundle.embedding)
+        if nodes is None:
+            nodes = await self.retriever.aretrieve(query_bundle)
+            self._store(generation, text, query_bundle.embedding, nodes)
+        return nodes
+
+
+def cached_retriever_from_env(index: Any, embed_model: BaseEmbedding, generation: Callable[[], int],
+                              collection: Any = None, similarity_top_k: int = 2,
+                              retriever: Optional[BaseRetriever] = None,
+                              **retriever_kwargs: Any) -> BaseRetriever:
+    """
+    `index.as_retriever(...)`, or `retriever` if given, behind a CachedRetriever configured
+    from RAG_QUERY_CACHE*, unless that is off.
+
+    `collection` is the Chroma collection behind the index; its id scopes the cache, so
+    separate collections (or one that was deleted and recreated) don't share results.
+    """
+    if retriever is None:
+        retriever = index.as_retriever(similarity_top_k=similarity_top_k, **retriever_kwargs)
+    else:
+        similarity_top_k = getattr(retriever, "similarity_top_k", similarity_top_k)
+    mode = (os.environ.get("RAG_QUERY_CACHE") or "off").lower()
+    if mode in ("off", "0", "false"):
+        return retriever
+    if mode not in ("memory", "disk"):
+        raise ValueError(f"RAG_QUERY_CACHE must be off, memory or disk, got {mode!r}")
+
+    cache = ResponseCache(
+        path=(os.environ.get("RAG_QUERY_CACHE_PATH") or DEFAULT_PATH) if mode == "disk" else None,
+        max_disk_bytes=int(os.environ.get("RAG_QUERY_CACHE_MAX_BYTES") or DEFAULT_MAX_BYTES),
+    )
+    similarity = os.environ.get("RAG_QUERY_CACHE_SIMILARITY")
+    scope = json.dumps({"collection": str(getattr(collection, "id", "")), "top_k": similarity_top_k,
+                        "retriever": type(retriever).__name__,
+                        **{key: str(value) for key, value in retriever_kwargs.items()}}, sort_keys=True)
+    return CachedRetriever(retriever, embed_model, generation, cache,
+                           similarity=float(similarity) if similarity else None, scope=scope)
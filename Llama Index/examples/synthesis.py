@@ -0,0 +1,251 @@
+"""
+Packed Response Synthesis
+=========================
+
+`tree_summarize`, as the examples used it, answers from the retrieved chunks
+with one LLM call per pack of chunks, one after another, then summarizes the
+answers, again one call at a time. The answer is also cut short: the
+examples' `max_tokens=100` doesn't reach the synthesis calls, which get the
+model's default.
+
+`PackedSynthesizer` keeps the number of sequential calls as low as the
+context budget allows:
+
+- packed: the retrieved chunks are packed into the context budget. If they
+  fit into one prompt, which is the usual case for top-k retrieval, the
+  answer takes one call.
+- map-reduce: otherwise, each pack is answered in its own call, up to
+  `max_concurrency` at a time, and the partial answers are combined in one
+  more call (or, if they don't fit either, in another parallel level).
+
+Every call is given `answer_tokens` as `max_tokens`. Each query's mode, LLM
+calls and wall time are recorded in `reports`, and the latest one is
+`last_report`.
+
+Usage:
+    synthesizer = synthesizer_from_env(llm)
+    query_engine = RetrieverQueryEngine.from_args(retriever, llm=llm, response_synthesizer=synthesizer)
+    response = query_engine.query("...")
+    print(synthesizer.last_report)   # "packed: 2 chunks, 1 LLM call in 1.84 s"
+
+Environment Variables:
+    RAG_SYNTHESIS - (Optional) packed (default) or tree_summarize, the previous behaviour
+    RAG_SYNTHESIS_ANSWER_TOKENS - (Optional) tokens each synthesis call may generate (default 512)
+    RAG_SYNTHESIS_CONTEXT_TOKENS - (Optional) context budget of one call (default: the LLM's context window)
+    RAG_SYNTHESIS_CONCURRENCY - (Optional) calls run at once in map-reduce mode (default 4)
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Deque, List, Optional, Sequence
+
+from llama_index.core.indices.prompt_helper import PromptHelper
+from llama_index.core.llms import LLM
+from llama_index.core.prompts import BasePromptTemplate
+from llama_index.core.prompts.default_prompt_selectors import (
+    DEFAULT_TEXT_QA_PROMPT_SEL,
+    DEFAULT_TREE_SUMMARIZE_PROMPT_SEL,
+)
+from llama_index.core.prompts.mixin import PromptDictType
+from llama_index.core.response_synthesizers import BaseSynthesizer, get_response_synthesizer
+from llama_index.core.types import RESPONSE_TEXT_TYPE
+
+SYNTHESIS_MODES = ("packed", "tree_summarize")
+
+
+@dataclass
+class SynthesisReport:
+    mode: str = "packed"
+    chunks: int = 0
+    # Prompts the chunks were packed into: 1 in packed mode, the map calls in map-reduce mode
+    packs: int = 0
+    llm_calls: int = 0
+    # Rounds of calls, each waiting for the one before; 1 in packed mode
+    levels: int = 0
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        calls = f"{self.llm_calls} LLM call{'s' if self.llm_calls != 1 else ''}"
+        if self.mode == "map-reduce":
+            calls = f"{self.packs} packs, {calls} over {self.levels} levels"
+        return f"{self.mode}: {self.chunks} chunks, {calls} in {self.seconds:.2f} s"
+
+
+class PackedSynthesizer(BaseSynthesizer):
+    """
+    One call when the retrieved chunks fit the context budget, parallel map-reduce when they don't.
+
+    Args:
+        llm: The model that answers.
+        answer_tokens: Tokens each call may generate, passed as `max_tokens` and kept free in the budget.
+        context_tokens: Context budget of one call; defaults to the LLM's context window.
+        max_concurrency: Map calls run at once.
+        text_qa_template: Answers the query from a pack of chunks.
+        summary_template: Combines partial answers into the final one.
+        max_reports: Per-query reports kept in `reports`.
+    """
+
+    def __init__(
+        self,
+        llm: LLM,
+        answer_tokens: Optional[int] = 512,
+        context_tokens: Optional[int] = None,
+        max_concurrency: int = 4,
+        text_qa_template: Optional[BasePromptTemplate] = None,
+        summary_template: Optional[BasePromptTemplate] = None,
+        max_reports: int = 100,
+        **kwargs: Any,
+    ):
+        prompt_helper = PromptHelper(
+            context_window=context_tokens or llm.metadata.context_window,
+            num_output=answer_tokens or llm.metadata.num_output,
+            chunk_overlap_ratio=0.0,
+        )
+        super().__init__(llm=llm, prompt_helper=prompt_helper, **kwargs)
+        if self._streaming or self._output_cls is not None:
+            raise ValueError("PackedSynthesizer doesn't stream or return structured output")
+        self._text_qa_template = text_qa_template or DEFAULT_TEXT_QA_PROMPT_SEL
+        self._summary_template = summary_template or DEFAULT_TREE_SUMMARIZE_PROMPT_SEL
+        self.answer_tokens = answer_tokens
+        self.max_concurrency = max_concurrency
+        self.reports: Deque[SynthesisReport] = deque(maxlen=max_reports)
+        self._lock = threading.Lock()
+
+    def _get_prompts(self) -> PromptDictType:
+        return {"text_qa_template": self._text_qa_template, "summary_template": self._summary_template}
+
+    def _update_prompts(self, prompts: PromptDictType) -> None:
+        if "text_qa_template" in prompts:
+            self._text_qa_template = prompts["text_qa_template"]
+        if "summary_template" in prompts:
+            self._summary_template = prompts["summary_template"]
+
+    @property
+    def last_report(self) -> Optional[SynthesisReport]:
+        return self.reports[-1] if self.reports else None
+
+    def _record(self, report: SynthesisReport, start: float) -> None:
+        report.seconds = time.perf_counter() - start
+        with self._lock:
+            self.reports.append(report)
+
+    # LLM calls, formatted the way LLM.predict formats them, plus the answer budget
+
+    def _llm_kwargs(self) -> dict:
+        return {"max_tokens": self.answer_tokens} if self.answer_tokens else {}
+
+    def _call(self, template: BasePromptTemplate, **prompt_args: Any) -> str:
+        if self._llm.metadata.is_chat_model:
+            messages = self._llm._get_messages(template, **prompt_args)
+            return self._llm.chat(messages, **self._llm_kwargs()).message.content or ""
+        prompt = self._llm._get_prompt(template, **prompt_args)
+        return self._llm.complete(prompt, formatted=True, **self._llm_kwargs()).text
+
+    async def _acall(self, template: BasePromptTemplate, **prompt_args: Any) -> str:
+        if self._llm.metadata.is_chat_model:
+            messages = self._llm._get_messages(template, **prompt_args)
+            return (await self._llm.achat(messages, **self._llm_kwargs())).message.content or ""
+        prompt = self._llm._get_prompt(template, **prompt_args)
+        return (await self._llm.acomplete(prompt, formatted=True, **self._llm_kwargs())).text
+
+    # Packing
+
+    def _pack(self, template: BasePromptTemplate, texts: Sequence[str]) -> List[str]:
+        return self._prompt_helper.repack(template, text_chunks=list(texts), llm=self._llm)
+
+    def _reduce_packs(self, summary: BasePromptTemplate, answers: List[str], previous: int) -> List[str]:
+        packs = self._pack(summary, answers)
+        if len(packs) >= previous:
+            raise ValueError("The partial answers don't fit the context budget; raise context_tokens "
+                             "or lower answer_tokens")
+        return packs
+
+    def get_response(self, query_str: str, text_chunks: Sequence[str], **response_kwargs: Any) -> RESPONSE_TEXT_TYPE:
+        start = time.perf_counter()
+        report = SynthesisReport(chunks=len(text_chunks))
+        text_qa = self._text_qa_template.partial_format(query_str=query_str)
+        summary = self._summary_template.partial_format(query_str=query_str)
+        packs = self._pack(text_qa, text_chunks)
+        report.packs = len(packs)
+        if len(packs) == 1:
+            answer = self._call(text_qa, context_str=packs[0], **response_kwargs)
+            report.llm_calls, report.levels = 1, 1
+            self._record(report, start)
+            return answer
+
+        report.mode = "map-reduce"
+        template = text_qa
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            while True:
+                answers = list(pool.map(lambda pack: self._call(template, context_str=pack, **response_kwargs),
+                                        packs))
+                report.llm_calls += len(packs)
+                report.levels += 1
+                template = summary
+                packs = self._reduce_packs(summary, answers, len(packs))
+                if len(packs) == 1:
+                    break
+        answer = self._call(summary, context_str=packs[0], **response_kwargs)
+        report.llm_calls += 1
+        report.levels += 1
+        self._record(report, start)
+        return answer
+
+    async def aget_response(self, query_str: str, text_chunks: Sequence[str],
+                            **response_kwargs: Any) -> RESPONSE_TEXT_TYPE:
+        start = time.perf_counter()
+        report = SynthesisReport(chunks=len(text_chunks))
+        text_qa = self._text_qa_template.partial_format(query_str=query_str)
+        summary = self._summary_template.partial_format(query_str=query_str)
+        packs = self._pack(text_qa, text_chunks)
+        report.packs = len(packs)
+        if len(packs) == 1:
+            answer = await self._acall(text_qa, context_str=packs[0], **response_kwargs)
+            report.llm_calls, report.levels = 1, 1
+            self._record(report, start)
+            return answer
+
+        report.mode = "map-reduce"
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def call(template: BasePromptTemplate, pack: str) -> str:
+            async with semaphore:
+                return await self._acall(template, context_str=pack, **response_kwargs)
+
+        template = text_qa
+        while True:
+            answers = list(await asyncio.gather(*(call(template, pack) for pack in packs)))
+            report.llm_calls += len(packs)
+            report.levels += 1
+            template = summary
+            packs = self._reduce_packs(summary, answers, len(packs))
+            if len(packs) == 1:
+                break
+        answer = await self._acall(summary, context_str=packs[0], **response_kwargs)
+        report.llm_calls += 1
+        report.levels += 1
+        self._record(report, start)
+        return answer
+
+
+def synthesizer_from_env(llm: LLM, **kwargs: Any) -> BaseSynthesizer:
+    """A PackedSynthesizer configured from RAG_SYNTHESIS*, or tree_summarize when RAG_SYNTHESIS asks for it"""
+    mode = (os.environ.get("RAG_SYNTHESIS") or "packed").lower()
+    if mode not in SYNTHESIS_MODES:
+        raise ValueError(f"RAG_SYNTHESIS must be one of {', '.join(SYNTHESIS_MODES)}, got {mode!r}")
+    if mode == "tree_summarize":
+        return get_response_synthesizer(llm=llm, response_mode="tree_summarize")
+
+    context_tokens = os.environ.get("RAG_SYNTHESIS_CONTEXT_TOKENS")
+    settings = {
+        "answer_tokens": int(os.environ.get("RAG_SYNTHESIS_ANSWER_TOKENS") or 512),
+        "context_tokens": int(context_tokens) if context_tokens else None,
+        "max_concurrency": int(os.environ.get("RAG_SYNTHESIS_CONCURRENCY") or 4),
+    }
+    settings.update(kwargs)
+    return PackedSynthesizer(llm, **settings)
@@ -15,11 +15,19 @@ Requirements:
     pip install langchain-community langchain-text-splitters rank-bm25
 """
 
+import sys
+from pathlib import Path
+
 from langchain_community.docstore.document import Document
 from langchain_community.retrievers import BM25Retriever
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from smolagents import CodeAgent, InferenceClientModel, Tool
 
+# Shared helpers (llm_cache) live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from llm_cache import cache_from_env
+from llm_cache.smolagents_cache import CachedModel
+
 
 class TravelGuideRetrieverTool(Tool):
     """
@@ -102,8 +110,11 @@ docs_processed = text_splitter.split_documents(source_docs)
 # Create the retriever tool
 travel_retriever = TravelGuideRetrieverTool(docs_processed)
 
+# Optional: response cache (LLM_CACHE=memory|disk), so repeated agent steps aren't paid for twice
+llm_cache = cache_from_env()
+
 # Initialize the agent with the retriever tool
-agent = CodeAgent(tools=[travel_retriever], model=InferenceClientModel())
+agent = CodeAgent(tools=[travel_retriever], model=CachedModel.wrap(InferenceClientModel(), llm_cache))
 
 # Run a RAG query
 response = agent.run(
@@ -111,3 +122,6 @@ response = agent.run(
 )
 
 print(response)
+
+if llm_cache:
+    print(f"LLM cache stats: {llm_cache.stats.as_dict()}")
@@ -0,0 +1,21 @@
+"""
+Startup helpers for the LangGraph example scripts.
+
+Nothing here imports a framework at module load. IPython, Langfuse and the
+renderers are only imported when a script actually asks for them, so the
+scripts start quickly and work offline on headless workers:
+
+    graph_runtime.display  opt-in graph rendering (GRAPH_VIEW), local or skipped
+    graph_runtime.tracing  Langfuse callback handler, only when credentials are set
+    graph_runtime.factory  compile-once graphs and per-process shared model clients
+    graph_runtime.server   ASGI server for the compiled graphs, with warm-start metrics
+"""
+
+from .display import GRAPH_VIEWS, show_graph
+from .tracing import langfuse_handler_from_env
+
+__all__ = [
+    "GRAPH_VIEWS",
+    "langfuse_handler_from_env",
+    "show_graph",
+]
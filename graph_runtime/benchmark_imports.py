@@ -0,0 +1,118 @@
+"""
+Import-Time Benchmark
+
+Imports each module in a fresh interpreter under `python -X importtime` and
+reports the cumulative time of the module and of its slowest dependencies,
+so a new eager import in a script shows up before it reaches the workers.
+Each module is imported `--repeat` times and the fastest run is kept.
+
+It also runs `01_basic_graph/graph.py` end to end in headless mode
+(GRAPH_VIEW=off), which needs no API key and no network.
+
+Usage:
+    python -m graph_runtime.benchmark_imports
+    python -m graph_runtime.benchmark_imports --modules langgraph.graph IPython.display --top 5
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+BASIC_GRAPH = ROOT / "LangGraph" / "examples" / "01_basic_graph" / "graph.py"
+
+# What the LangGraph scripts import, and what headless mode defers
+DEFAULT_MODULES = [
+    "graph_runtime",
+    "langgraph.graph",
+    "langchain_anthropic",
+    "langchain_openai",
+    "langfuse.langchain",
+    "IPython.display",
+]
+
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Top-level import: (name, cumulative µs, [(direct dependency, cumulative µs)])
+TopLevel = Tuple[str, int, List[Tuple[str, int]]]
+
+
+def import_times(statement: str) -> Optional[List[TopLevel]]:
+    """Top-level imports of running `statement` in a fresh interpreter, or None if it fails"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            capture_output=True, text=True, cwd=ROOT)
+    if result.returncode != 0:
+        return None
+    top_level = []
+    children = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        name, cumulative, depth = match.group(4), int(match.group(2)), (len(match.group(3)) - 1) // 2
+        # A module is reported once it finishes, so its dependencies come before it
+        if depth == 1:
+            children.append((name, cumulative))
+        elif depth == 0:
+            top_level.append((name, cumulative, children))
+            children = []
+    return top_level
+
+
+def best_times(module: str, repeat: int, startup: set) -> Optional[List[TopLevel]]:
+    """The fastest of `repeat` imports of `module`, without what the interpreter imports at startup"""
+    runs = []
+    for _ in range(repeat):
+        times = import_times(f"import {module}")
+        if times is None:
+            return None
+        runs.append([entry for entry in times if entry[0] not in startup])
+    return min(runs, key=lambda times: sum(cumulative for _, cumulative, _ in times))
+
+
+def run_headless(script: Path, repeat: int) -> float:
+    """Fastest wall time of running `script` with GRAPH_VIEW=off"""
+    env = {**os.environ, "GRAPH_VIEW": "off"}
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(script)], check=True, capture_output=True, env=env, cwd=script.parent)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=3, help="slowest direct dependencies shown per module")
+    args = parser.parse_args()
+
+    startup = {name for name, _, _ in import_times("pass") or []}
+    print(f"{'module':<24}{'ms':>9}  slowest direct dependencies (ms)")
+    for module in args.modules:
+        times = best_times(module, args.repeat, startup)
+        if times is None:
+            print(f"{module:<24}{'-':>9}  not installed")
+            continue
+        total = sum(cumulative for _, cumulative, _ in times)
+        children = sorted((child for _, _, direct in times for child in direct), key=lambda item: -item[1])
+        slowest = ", ".join(f"{name} {cumulative / 1000:.0f}" for name, cumulative in children[:args.top])
+        print(f"{module:<24}{total / 1000:>9.1f}  {slowest}")
+
+    if BASIC_GRAPH.exists():
+        try:
+            seconds = run_headless(BASIC_GRAPH, args.repeat)
+        except subprocess.CalledProcessError as e:
+            print(f"\n01_basic_graph/graph.py failed headless: {e.stderr.decode(errors='replace').strip().splitlines()[-1]}")
+        else:
+            print(f"\n01_basic_graph/graph.py, GRAPH_VIEW=off: {seconds * 1000:.0f} ms end to end")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Opt-in graph rendering.
+
+The scripts used to import IPython.display at load and call
+`draw_mermaid_png()`, which sends the graph to the mermaid.ink web service
+before any work starts. `show_graph` does nothing unless GRAPH_VIEW asks for
+a view, and only the local views are offered without asking for the network:
+
+    off          (default) nothing rendered, nothing imported
+    mermaid      print the Mermaid source; local, no dependencies
+    ascii        print an ASCII drawing; local, needs grandalf
+    png          render a PNG with Graphviz; local, needs pygraphviz
+    mermaid.ink  render a PNG with the mermaid.ink web service (the old behaviour)
+
+PNGs are shown inline in a notebook and written to GRAPH_VIEW_PATH
+(default graph.png) everywhere else.
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import Optional
+
+GRAPH_VIEWS = ("off", "mermaid", "ascii", "png", "mermaid.ink")
+DEFAULT_PATH = "graph.png"
+
+
+def in_notebook() -> bool:
+    """True inside a Jupyter kernel; never imports IPython itself"""
+    ipython = sys.modules.get("IPython")
+    if ipython is None:
+        return False
+    shell = ipython.get_ipython()
+    return shell is not None and type(shell).__name__ == "ZMQInteractiveShell"
+
+
+def show_graph(graph, view: Optional[str] = None, xray: bool = False, path: Optional[str] = None) -> None:
+    """
+    Render a compiled graph as GRAPH_VIEW (or `view`) says.
+
+    Args:
+        graph: A compiled LangGraph graph.
+        view: One of GRAPH_VIEWS; GRAPH_VIEW, or off, when None.
+        xray: Draw subgraphs too.
+        path: Where a PNG goes outside a notebook; GRAPH_VIEW_PATH or graph.png when None.
+    """
+    view = (view or os.environ.get("GRAPH_VIEW") or "off").lower()
+    if view in ("off", "0", "false"):
+        return
+    if view not in GRAPH_VIEWS:
+        raise ValueError(f"GRAPH_VIEW must be one of {', '.join(GRAPH_VIEWS)}, got {view!r}")
+
+    drawable = graph.get_graph(xray=xray)
+    if view == "mermaid":
+        print(drawable.draw_mermaid())
+        return
+    if view == "ascii":
+        print(drawable.draw_ascii())
+        return
+
+    png = drawable.draw_png() if view == "png" else drawable.draw_mermaid_png()
+    if in_notebook():
+        from IPython.display import Image, display
+        display(Image(png))
+        return
+    path = path or os.environ.get("GRAPH_VIEW_PATH") or DEFAULT_PATH
+    Path(path).write_bytes(png)
+    print(f"Graph written to {path}")
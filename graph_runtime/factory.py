@@ -0,0 +1,120 @@
+"""
+Compile-once graph factories and per-process shared clients.
+
+The example scripts used to build their models and compile their graphs
+as module globals at import. A web service embedding them pays that cost in
+every worker process and has nowhere to keep one pooled client. The
+factories (`build_email_graph(config)`, `build_react_graph(config)`) go
+through `ProcessCache` instead:
+
+- values are built on first use, once per key, and reused by every later
+  call and thread in the process;
+- concurrent first calls for the same key wait for one build instead of
+  racing to make several;
+- after a fork the cache starts empty, since HTTP connection pools must
+  not be shared between processes.
+
+Keys must be hashable, so graph configs are frozen dataclasses.
+
+Build times and hits are recorded in `stats` and, given a registry, as
+`graph_factory_build_seconds{cache}` and `graph_factory_lookups_total{cache,result}`.
+
+Usage:
+    graphs = ProcessCache("graphs")
+    graph = graphs.get(config, lambda: build_graph(config))
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from llm_metrics import MetricsRegistry
+
+
+class ProcessCache:
+    """
+    Values built once per key and process.
+
+    Args:
+        name: Label of this cache in stats and metrics.
+        registry: Optional llm_metrics registry for build times and lookups.
+    """
+
+    def __init__(self, name: str, registry: Optional[MetricsRegistry] = None):
+        self.name = name
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._reset()
+        if registry is not None:
+            self._describe(registry)
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._values: Dict[Hashable, Any] = {}
+        self._building: Dict[Hashable, threading.Lock] = {}
+        self.stats = {"builds": 0, "hits": 0, "build_seconds": 0.0}
+
+    @staticmethod
+    def _describe(registry: MetricsRegistry) -> None:
+        registry.describe("graph_factory_build_seconds", "Time to build a cached graph or client", scale=1e-6)
+        registry.describe("graph_factory_lookups_total", "Factory lookups by result: hit or build")
+
+    def bind_registry(self, registry: MetricsRegistry) -> None:
+        """Record into `registry` from now on"""
+        self.registry = registry
+        self._describe(registry)
+
+    def _count(self, result: str, seconds: Optional[float] = None) -> None:
+        if self.registry is None:
+            return
+        self.registry.inc("graph_factory_lookups_total", cache=self.name, result=result)
+        if seconds is not None:
+            self.registry.histogram("graph_factory_build_seconds", cache=self.name).record(seconds * 1e6)
+
+    def get(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """The value for `key`, calling `build()` the first time in this process"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: the parent's clients and pools are not ours to use
+                self._reset()
+            if key in self._values:
+                self.stats["hits"] += 1
+                value = self._values[key]
+                self._count("hit")
+                return value
+            building = self._building.setdefault(key, threading.Lock())
+
+        with building:
+            # Another thread may have built it while we waited
+            with self._lock:
+                if key in self._values:
+                    self.stats["hits"] += 1
+                    self._count("hit")
+                    return self._values[key]
+            start = time.perf_counter()
+            value = build()
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self._values[key] = value
+                self._building.pop(key, None)
+                self.stats["builds"] += 1
+                self.stats["build_seconds"] += seconds
+            self._count("build", seconds)
+            return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """The value for `key` if it has been built in this process, without building it"""
+        with self._lock:
+            if self._pid != os.getpid():
+                return None
+            return self._values.get(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+
+# One of each per process: compiled graphs, and the model clients they share
+graphs = ProcessCache("graphs")
+clients = ProcessCache("clients")
@@ -0,0 +1,266 @@
+"""
+A small ASGI server for the compiled example graphs.
+
+Graphs are registered by name with their factory (`build_email_graph`,
+`build_react_graph`, ...). At startup (the ASGI lifespan) every factory is
+called once, so the first request of each worker finds its graph compiled
+and its model clients connected. Warm-up can be turned off to measure what
+it saves.
+
+Routes:
+    GET  /healthz                 liveness, and whether warm-up has finished
+    GET  /graphs                  registered graphs and whether each is built
+    POST /graphs/{name}/invoke    {"input": {...}, "config": {...}} -> final state
+    GET  /metrics                 Prometheus text
+
+A request's "config" may hold only `configurable.thread_id`, `tags` and
+`metadata`; anything else (callbacks, recursion_limit, other configurable
+keys) is a 400, so clients can't reach settings the graph was built with.
+Graphs compiled with a checkpointer need the thread_id. A failing graph is
+a 500 without the exception's message, which goes to the log instead.
+
+Metrics, besides the factory's own build times and lookups:
+    graph_server_warmup_seconds{graph}
+    graph_requests_total{graph,start,status}   start is "cold" if the request built the graph
+    graph_request_seconds{graph,start}
+
+Usage:
+    server = GraphServer()
+    server.register("email", build_email_graph, to_input=new_email_state)
+    server.run()    # uvicorn, one worker; or point `uvicorn module:app --workers N` at server
+
+Environment Variables:
+    GRAPH_SERVER_HOST - (Optional) bind address (default 127.0.0.1)
+    GRAPH_SERVER_PORT - (Optional) port (default 8000)
+    GRAPH_SERVER_WARMUP - (Optional) 1 (default) to build every graph at startup, 0 to build on first request
+"""
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from llm_metrics import MetricsRegistry, to_prometheus
+
+from .factory import clients, graphs
+
+logger = logging.getLogger(__name__)
+
+# What a request's "config" may set; the rest of a RunnableConfig stays with the server
+CONFIG_KEYS = {"configurable", "tags", "metadata"}
+CONFIGURABLE_KEYS = {"thread_id"}
+
+
+class BadRequest(ValueError):
+    """A request the server answers with 400; the message is safe to send back"""
+
+
+@dataclass
+class _Entry:
+    build: Callable[[], Any]
+    to_input: Optional[Callable[[Any], Any]]
+    built: bool = False
+
+
+def request_config(config: Any, checkpointed: bool) -> Dict[str, Any]:
+    """
+    The RunnableConfig for a request's "config": a copy of its thread_id, tags and metadata.
+
+    Raises:
+        BadRequest: Other fields, wrong types, or no thread_id for a checkpointed graph.
+    """
+    if config is None:
+        config = {}
+    if not isinstance(config, dict):
+        raise BadRequest("config must be an object")
+    unknown = set(config) - CONFIG_KEYS
+    if unknown:
+        raise BadRequest(f"config fields not allowed: {', '.join(sorted(map(str, unknown)))}")
+    configurable = config.get("configurable") or {}
+    if not isinstance(configurable, dict):
+        raise BadRequest("config.configurable must be an object")
+    unknown = set(configurable) - CONFIGURABLE_KEYS
+    if unknown:
+        raise BadRequest(f"config.configurable fields not allowed: {', '.join(sorted(map(str, unknown)))}")
+
+    result: Dict[str, Any] = {}
+    thread_id = configurable.get("thread_id")
+    if thread_id is not None:
+        if not isinstance(thread_id, (str, int)) or isinstance(thread_id, bool) or thread_id == "":
+            raise BadRequest("config.configurable.thread_id must be a non-empty string or an integer")
+        result["configurable"] = {"thread_id": str(thread_id)}
+    elif checkpointed:
+        raise BadRequest("this graph saves checkpoints per thread; set config.configurable.thread_id")
+    tags = config.get("tags")
+    if tags is not None:
+        if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+            raise BadRequest("config.tags must be a list of strings")
+        result["tags"] = list(tags)
+    metadata = config.get("metadata")
+    if metadata is not None:
+        if not isinstance(metadata, dict):
+            raise BadRequest("config.metadata must be an object")
+        result["metadata"] = dict(metadata)
+    return result
+
+
+def _jsonable(value: Any) -> Any:
+    """JSON fallback for graph state: LangChain messages and other pydantic models, else str"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+
+class GraphServer:
+    """
+    ASGI app serving named graphs from their factories.
+
+    Args:
+        registry: Metrics registry; the factory caches record into it as well.
+        warmup: Build every graph at startup (default: GRAPH_SERVER_WARMUP, on).
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None, warmup: Optional[bool] = None):
+        self.registry = registry or MetricsRegistry()
+        self.warmup = os.environ.get("GRAPH_SERVER_WARMUP", "1") != "0" if warmup is None else warmup
+        self.ready = False
+        self._graphs: Dict[str, _Entry] = {}
+        graphs.bind_registry(self.registry)
+        clients.bind_registry(self.registry)
+        self.registry.describe("graph_server_warmup_seconds", "Time to build a graph at startup", scale=1e-6)
+        self.registry.describe("graph_requests_total", "Invoke requests by graph, cold or warm start and status")
+        self.registry.describe("graph_request_seconds", "Invoke request latency by graph and cold or warm start",
+                               scale=1e-6)
+
+    def register(self, name: str, build: Callable[[], Any], to_input: Optional[Callable[[Any], Any]] = None) -> None:
+        """
+        Serve the graph `build()` returns as `name`.
+
+        Args:
+            build: Returns the compiled graph; a cached factory, since it is called per request.
+            to_input: Turns the request's "input" into the graph input (default: used as is).
+        """
+        self._graphs[name] = _Entry(build, to_input)
+
+    def warm(self) -> None:
+        """Build every registered graph now"""
+        for name, entry in self._graphs.items():
+            start = time.perf_counter()
+            entry.build()
+            entry.built = True
+            self.registry.histogram("graph_server_warmup_seconds", graph=name).record(
+                (time.perf_counter() - start) * 1e6)
+
+    async def invoke(self, name: str, body: Dict[str, Any]) -> Any:
+        """
+        Run graph `name` on a request body.
+
+        Raises:
+            BadRequest: The body's "config" isn't allowed (see `request_config`).
+        """
+        entry = self._graphs[name]
+        start_kind = "warm" if entry.built else "cold"
+        start = time.perf_counter()
+        status = "error"
+        try:
+            graph = entry.build()
+            entry.built = True
+            config = request_config(body.get("config"), checkpointed=bool(getattr(graph, "checkpointer", None)))
+            graph_input = body.get("input", {})
+            if entry.to_input is not None:
+                graph_input = entry.to_input(graph_input)
+            result = await graph.ainvoke(graph_input, config=config)
+            status = "ok"
+            return result
+        except BadRequest:
+            status = "bad_request"
+            raise
+        finally:
+            self.registry.inc("graph_requests_total", graph=name, start=start_kind, status=status)
+            self.registry.histogram("graph_request_seconds", graph=name, start=start_kind).record(
+                (time.perf_counter() - start) * 1e6)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        method, path = scope["method"], scope["path"].rstrip("/")
+        if method == "GET" and path == "/healthz":
+            await self._send_json(send, 200, {"status": "ok", "ready": self.ready})
+        elif method == "GET" and path == "/graphs":
+            await self._send_json(send, 200, {name: {"built": entry.built} for name, entry in self._graphs.items()})
+        elif method == "GET" and path == "/metrics":
+            await self._send(send, 200, to_prometheus(self.registry).encode(), b"text/plain; version=0.0.4")
+        elif method == "POST" and path.startswith("/graphs/") and path.endswith("/invoke"):
+            name = path[len("/graphs/"):-len("/invoke")]
+            if name not in self._graphs:
+                await self._send_json(send, 404, {"error": f"unknown graph {name!r}"})
+                return
+            try:
+                body = json.loads(await self._read_body(receive) or b"{}")
+            except ValueError:
+                await self._send_json(send, 400, {"error": "invalid JSON"})
+                return
+            if not isinstance(body, dict):
+                await self._send_json(send, 400, {"error": "body must be a JSON object"})
+                return
+            try:
+                result = await self.invoke(name, body)
+            except BadRequest as e:
+                await self._send_json(send, 400, {"error": str(e)})
+                return
+            except Exception:
+                logger.exception("graph %r failed", name)
+                await self._send_json(send, 500, {"error": "internal error"})
+                return
+            await self._send_json(send, 200, result)
+        else:
+            await self._send_json(send, 404, {"error": "not found"})
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    if self.warmup:
+                        self.warm()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": f"{type(e).__name__}: {e}"})
+                    return
+                self.ready = True
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def _send_json(self, send, status: int, payload: Any) -> None:
+        await self._send(send, status, json.dumps(payload, default=_jsonable).encode(), b"application/json")
+
+    @staticmethod
+    async def _send(send, status: int, body: bytes, content_type: bytes) -> None:
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    def run(self, host: Optional[str] = None, port: Optional[int] = None) -> None:
+        """Serve with uvicorn in this process (GRAPH_SERVER_HOST, GRAPH_SERVER_PORT)"""
+        try:
+            import uvicorn
+        except ImportError as e:
+            raise ImportError("Serving the graphs needs uvicorn: pip install uvicorn") from e
+        uvicorn.run(self, host=host or os.environ.get("GRAPH_SERVER_HOST", "127.0.0.1"),
+                    port=port or int(os.environ.get("GRAPH_SERVER_PORT", "8000")))
@@ -0,0 +1,16 @@
+"""
+Langfuse tracing, imported only when it is configured.
+
+`langfuse` pulls in OpenTelemetry and an HTTP exporter, so importing it is
+slow even when no credentials are set; measure it with benchmark_imports.
+"""
+
+import os
+
+
+def langfuse_handler_from_env():
+    """A Langfuse CallbackHandler when LANGFUSE_PUBLIC_KEY and LANGFUSE_SECRET_KEY are set, otherwise None"""
+    if not (os.environ.get("LANGFUSE_PUBLIC_KEY") and os.environ.get("LANGFUSE_SECRET_KEY")):
+        return None
+    from langfuse.langchain import CallbackHandler
+    return CallbackHandler()
@@ -0,0 +1,21 @@
+"""
+Content-addressed LLM response cache shared by the example projects.
+
+The core has no third-party dependencies. Framework adapters live in their
+own modules so each project only imports the framework it already has:
+
+    llm_cache.langchain_cache    LangChain / LangGraph chat models
+    llm_cache.llama_index_cache  LlamaIndex LLMs
+    llm_cache.smolagents_cache   smolagents models
+"""
+
+from .core import CacheStats, MemoryTier, ResponseCache, SQLiteTier, cache_from_env, cache_key
+
+__all__ = [
+    "CacheStats",
+    "MemoryTier",
+    "ResponseCache",
+    "SQLiteTier",
+    "cache_from_env",
+    "cache_key",
+]
@@ -0,0 +1,296 @@
+"""
+Two-tier, content-addressed response cache.
+
+Keys are SHA-256 digests of a canonical JSON encoding of (model, params,
+messages), so the same request hits the cache no matter which framework
+made it. Values are opaque bytes; each framework adapter serializes its
+own response type.
+
+Lookups go to an in-memory LRU first, then to an optional SQLite file.
+Both tiers honour a TTL and a size bound; the least recently used entries
+are evicted first.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_MEMORY_ENTRIES = 1024
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ai-agentic", "llm_cache.sqlite")
+
+
+def _canonical(value: Any) -> Any:
+    """Make values JSON-encodable in a stable way (bytes, sets, pydantic models, ...)"""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_canonical(v) for v in value)
+    if isinstance(value, bytes):
+        return {"__bytes__": hashlib.sha256(value).hexdigest()}
+    if hasattr(value, "model_dump"):
+        return _canonical(value.model_dump())
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+
+def cache_key(model: str, params: Optional[Dict[str, Any]], messages: Any) -> str:
+    """Content address for one model call"""
+    payload = json.dumps(
+        {"model": model, "params": _canonical(params or {}), "messages": _canonical(messages)},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    # Response bytes that did not have to be fetched from the provider again
+    bytes_saved: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(asdict(self), hits=self.hits, hit_rate=round(self.hit_rate, 4))
+
+
+class MemoryTier:
+    """LRU bounded by entry count and total value bytes"""
+
+    def __init__(self, max_entries: int = DEFAULT_MEMORY_ENTRIES, max_bytes: int = DEFAULT_MEMORY_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+
+    def get(self, key: str, now: float) -> Tuple[Optional[bytes], bool]:
+        """Return (value, expired)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            self._remove(key)
+            return None, True
+        self._entries.move_to_end(key)
+        return value, False
+
+    def put(self, key: str, value: bytes, expires_at: Optional[float]) -> int:
+        """Store a value and return how many entries were evicted to make room"""
+        if key in self._entries:
+            self._remove(key)
+        if len(value) > self.max_bytes:
+            return 0
+        self._entries[key] = (value, expires_at)
+        self.size += len(value)
+        evicted = 0
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            evicted += 1
+        return evicted
+
+    def _remove(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self.size -= len(value)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+
+class SQLiteTier:
+    """On-disk tier bounded by total value bytes, evicting least recently used rows"""
+
+    def __init__(self, path: str = DEFAULT_PATH, max_bytes: int = DEFAULT_DISK_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+            " expires_at REAL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+        self.size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str, now: float) -> Tuple[Optional[bytes], Optional[float], bool]:
+        """Return (value, expires_at, expired)"""
+        row = self._conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None, None, False
+        value, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            self._delete(key)
+            return None, None, True
+        self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        return bytes(value), expires_at, False
+
+    def put(self, key: str, value: bytes, expires_at: Optional[float], now: float) -> int:
+        if len(value) > self.max_bytes:
+            return 0
+        self._delete(key)
+        self._conn.execute(
+            "INSERT INTO responses (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+            (key, value, len(value), expires_at, now),
+        )
+        self.size += len(value)
+        return self._evict(now)
+
+    def _delete(self, key: str) -> None:
+        row = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.size -= row[0]
+
+    def _evict(self, now: float) -> int:
+        if self.size <= self.max_bytes:
+            return 0
+        # Expired rows go first, then least recently used until under budget
+        victims = self._conn.execute(
+            "SELECT key, size FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+        ).fetchall()
+        freed = sum(size for _, size in victims)
+        if self.size - freed > self.max_bytes:
+            expired = {key for key, _ in victims}
+            for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+                if self.size - freed <= self.max_bytes:
+                    break
+                if key not in expired:
+                    victims.append((key, size))
+                    freed += size
+        self._conn.execute("BEGIN")
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key, _ in victims])
+        self._conn.execute("COMMIT")
+        self.size -= freed
+        return len(victims)
+
+    def clear(self) -> None:
+        self._conn.execute("DELETE FROM responses")
+        self.size = 0
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class ResponseCache:
+    """
+    Memory LRU in front of an optional SQLite tier.
+
+    Args:
+        path: SQLite file for the disk tier, or None for memory only.
+        ttl: Seconds an entry stays valid, or None to keep it until evicted.
+        max_memory_entries: Entry bound of the memory tier.
+        max_memory_bytes: Byte bound of the memory tier.
+        max_disk_bytes: Byte bound of the disk tier.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        max_memory_bytes: int = DEFAULT_MEMORY_BYTES,
+        max_disk_bytes: int = DEFAULT_DISK_BYTES,
+    ):
+        self.ttl = ttl
+        self.memory = MemoryTier(max_memory_entries, max_memory_bytes)
+        self.disk = SQLiteTier(path, max_disk_bytes) if path else None
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    key = staticmethod(cache_key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            value, expired = self.memory.get(key, now)
+            if value is not None:
+                self.stats.memory_hits += 1
+                self.stats.bytes_saved += len(value)
+                return value
+            self.stats.expirations += expired
+
+            if self.disk is not None:
+                value, expires_at, expired = self.disk.get(key, now)
+                self.stats.expirations += expired
+                if value is not None:
+                    # Promote so the next lookup stays in memory
+                    self.stats.evictions += self.memory.put(key, value, expires_at)
+                    self.stats.disk_hits += 1
+                    self.stats.bytes_saved += len(value)
+                    return value
+
+            self.stats.misses += 1
+            return None
+
+    def put(self, key: str, value: bytes) -> None:
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self.stats.writes += 1
+            self.stats.evictions += self.memory.put(key, value, expires_at)
+            if self.disk is not None:
+                self.stats.evictions += self.disk.put(key, value, expires_at, now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.memory.clear()
+            if self.disk is not None:
+                self.disk.clear()
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+
+
+def cache_from_env() -> Optional[ResponseCache]:
+    """
+    Build a cache from environment variables, or return None when caching is off.
+
+    LLM_CACHE            off (default), memory, or disk
+    LLM_CACHE_PATH       SQLite file for the disk tier
+    LLM_CACHE_TTL        Entry lifetime in seconds
+    LLM_CACHE_MAX_BYTES  Byte bound of the disk tier
+    """
+    mode = os.environ.get("LLM_CACHE", "off").lower()
+    if mode in ("", "off", "0", "false"):
+        return None
+    if mode not in ("memory", "disk"):
+        raise ValueError(f"LLM_CACHE must be off, memory or disk, got {mode!r}")
+
+    ttl = os.environ.get("LLM_CACHE_TTL")
+    return ResponseCache(
+        path=os.environ.get("LLM_CACHE_PATH", DEFAULT_PATH) if mode == "disk" else None,
+        ttl=float(ttl) if ttl else None,
+        max_disk_bytes=int(os.environ.get("LLM_CACHE_MAX_BYTES", DEFAULT_DISK_BYTES)),
+    )
@@ -0,0 +1,63 @@
+"""
+LangChain adapter.
+
+LangChain chat models accept a `cache=` argument implementing
+`langchain_core.caches.BaseCache`. The `llm_string` LangChain passes in
+already encodes the model name and every call parameter (including bound
+tools), so it is used as the model part of the key.
+
+    from llm_cache import ResponseCache
+    from llm_cache.langchain_cache import LangChainResponseCache
+
+    model = ChatAnthropic(model="claude-haiku-4-5-20251001", cache=LangChainResponseCache(ResponseCache()))
+
+`langchain_cache_from_env()` returns an adapter configured from the
+LLM_CACHE* environment variables, or None when caching is off.
+"""
+
+import json
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from .core import ResponseCache, cache_from_env, cache_key
+
+
+def _encode(generation: Generation) -> dict:
+    # Plain dicts rather than langchain_core.load, so the disk file never revives arbitrary objects
+    data = {"text": generation.text, "generation_info": generation.generation_info}
+    if isinstance(generation, ChatGeneration):
+        data["message"] = message_to_dict(generation.message)
+    return data
+
+
+def _decode(data: dict) -> Generation:
+    if "message" in data:
+        message = messages_from_dict([data["message"]])[0]
+        return ChatGeneration(message=message, generation_info=data["generation_info"])
+    return Generation(text=data["text"], generation_info=data["generation_info"])
+
+
+class LangChainResponseCache(BaseCache):
+    def __init__(self, cache: ResponseCache):
+        self.cache = cache
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        value = self.cache.get(cache_key(llm_string, None, prompt))
+        if value is None:
+            return None
+        return [_decode(generation) for generation in json.loads(value)]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Any]) -> None:
+        value = json.dumps([_encode(generation) for generation in return_val])
+        self.cache.put(cache_key(llm_string, None, prompt), value.encode("utf-8"))
+
+    def clear(self, **kwargs: Any) -> None:
+        self.cache.clear()
+
+
+def langchain_cache_from_env() -> Optional[LangChainResponseCache]:
+    cache = cache_from_env()
+    return LangChainResponseCache(cache) if cache is not None else None
@@ -0,0 +1,139 @@
+"""
+LlamaIndex adapter.
+
+LlamaIndex has no response-cache hook on its LLM classes, so `CachedLLM`
+wraps any `LLM` and is itself an `LLM`: it can be passed to query engines,
+agents and evaluators like the model it wraps. `complete`/`chat` (and their
+async forms) are cached; streaming calls pass straight through.
+
+    from llm_cache import ResponseCache
+    from llm_cache.llama_index_cache import CachedLLM
+
+    llm = CachedLLM.wrap(HuggingFaceInferenceAPI(...), ResponseCache())
+"""
+
+import json
+from typing import Any, Optional, Sequence
+
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+)
+from llama_index.core.llms.llm import LLM
+from pydantic import Field, PrivateAttr, SerializeAsAny
+
+from .core import ResponseCache, cache_key
+
+
+class CachedLLM(LLM):
+    llm: SerializeAsAny[LLM] = Field(description="The wrapped model that serves cache misses.")
+    _cache: ResponseCache = PrivateAttr()
+
+    @classmethod
+    def wrap(cls, llm: LLM, cache: Optional[ResponseCache]) -> LLM:
+        """Return `llm` wrapped with `cache`, or unchanged when caching is off"""
+        if cache is None:
+            return llm
+        wrapped = cls(llm=llm, callback_manager=llm.callback_manager)
+        wrapped._cache = cache
+        return wrapped
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return self.llm.metadata
+
+    @property
+    def cache(self) -> ResponseCache:
+        return self._cache
+
+    def _key(self, kind: str, payload: Any, kwargs: dict) -> str:
+        params = dict(self.llm.metadata.model_dump(), kind=kind, kwargs=kwargs)
+        params["temperature"] = getattr(self.llm, "temperature", None)
+        return cache_key(f"{self.llm.class_name()}:{self.llm.metadata.model_name}", params, payload)
+
+    # Completion
+
+    def _cached_completion(self, key: str) -> Optional[CompletionResponse]:
+        value = self._cache.get(key)
+        if value is None:
+            return None
+        data = json.loads(value)
+        return CompletionResponse(text=data["text"], additional_kwargs=data["additional_kwargs"])
+
+    def _store_completion(self, key: str, response: CompletionResponse) -> None:
+        value = {"text": response.text, "additional_kwargs": response.additional_kwargs}
+        self._cache.put(key, json.dumps(value, default=str).encode("utf-8"))
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        key = self._key("complete", [prompt, formatted], kwargs)
+        response = self._cached_completion(key)
+        if response is None:
+            response = self.llm.complete(prompt, formatted=formatted, **kwargs)
+            self._store_completion(key, response)
+        return response
+
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        key = self._key("complete", [prompt, formatted], kwargs)
+        response = self._cached_completion(key)
+        if response is None:
+            response = await self.llm.acomplete(prompt, formatted=formatted, **kwargs)
+            self._store_completion(key, response)
+        return response
+
+    # Chat
+
+    def _cached_chat(self, key: str) -> Optional[ChatResponse]:
+        value = self._cache.get(key)
+        if value is None:
+            return None
+        data = json.loads(value)
+        return ChatResponse(
+            message=ChatMessage.model_validate(data["message"]),
+            additional_kwargs=data["additional_kwargs"],
+        )
+
+    def _store_chat(self, key: str, response: ChatResponse) -> None:
+        value = {"message": response.message.model_dump(mode="json"), "additional_kwargs": response.additional_kwargs}
+        self._cache.put(key, json.dumps(value, default=str).encode("utf-8"))
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        key = self._key("chat", [m.model_dump(mode="json") for m in messages], kwargs)
+        response = self._cached_chat(key)
+        if response is None:
+            response = self.llm.chat(messages, **kwargs)
+            self._store_chat(key, response)
+        return response
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        key = self._key("chat", [m.model_dump(mode="json") for m in messages], kwargs)
+        response = self._cached_chat(key)
+        if response is None:
+            response = await self.llm.achat(messages, **kwargs)
+            self._store_chat(key, response)
+        return response
+
+    # Streaming is not cached
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        return self.llm.stream_complete(prompt, formatted=formatted, **kwargs)
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        return self.llm.stream_chat(messages, **kwargs)
+
+    async def astream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseAsyncGen:
+        return await self.llm.astream_complete(prompt, formatted=formatted, **kwargs)
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        return await self.llm.astream_chat(messages, **kwargs)
@@ -0,0 +1,88 @@
+"""
+smolagents adapter.
+
+smolagents agents only need `model.generate(...)` (and `model(...)`, which
+calls it), so `CachedModel` subclasses `Model`, forwards everything else to
+the wrapped model, and caches `generate` results by their `ChatMessage`.
+
+    from llm_cache import ResponseCache
+    from llm_cache.smolagents_cache import CachedModel
+
+    agent = CodeAgent(tools=[...], model=CachedModel.wrap(InferenceClientModel(), ResponseCache()))
+"""
+
+import json
+from typing import Any, List, Optional
+
+from smolagents.models import ChatMessage, Model
+
+from .core import ResponseCache, cache_key
+
+
+def _message_dict(message: Any) -> Any:
+    if isinstance(message, ChatMessage):
+        data = message.dict()
+        data.pop("raw", None)
+        data.pop("token_usage", None)
+        return data
+    return message
+
+
+def _tool_signature(tool: Any) -> dict:
+    return {"name": tool.name, "inputs": tool.inputs, "output_type": tool.output_type}
+
+
+class CachedModel(Model):
+    def __init__(self, model: Model, cache: ResponseCache):
+        super().__init__(
+            flatten_messages_as_text=model.flatten_messages_as_text,
+            tool_name_key=model.tool_name_key,
+            tool_arguments_key=model.tool_arguments_key,
+            model_id=model.model_id,
+        )
+        self.model = model
+        self.cache = cache
+
+    @classmethod
+    def wrap(cls, model: Model, cache: Optional[ResponseCache]) -> Model:
+        """Return `model` wrapped with `cache`, or unchanged when caching is off"""
+        return cls(model, cache) if cache is not None else model
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for attributes CachedModel does not define itself
+        model = self.__dict__.get("model")
+        if model is None:
+            raise AttributeError(name)
+        return getattr(model, name)
+
+    def generate(
+        self,
+        messages: List[Any],
+        stop_sequences: Optional[List[str]] = None,
+        response_format: Optional[dict] = None,
+        tools_to_call_from: Optional[List[Any]] = None,
+        **kwargs: Any,
+    ) -> ChatMessage:
+        params = {
+            "class": type(self.model).__name__,
+            "kwargs": self.model.kwargs,
+            "call_kwargs": kwargs,
+            "stop_sequences": stop_sequences,
+            "response_format": response_format,
+            "tools": [_tool_signature(t) for t in tools_to_call_from or []],
+        }
+        key = cache_key(self.model_id or "", params, [_message_dict(m) for m in messages])
+
+        value = self.cache.get(key)
+        if value is not None:
+            return ChatMessage.from_dict(json.loads(value))
+
+        response = self.model.generate(
+            messages,
+            stop_sequences=stop_sequences,
+            response_format=response_format,
+            tools_to_call_from=tools_to_call_from,
+            **kwargs,
+        )
+        self.cache.put(key, json.dumps(_message_dict(response), default=str).encode("utf-8"))
+        return response
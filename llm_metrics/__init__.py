@@ -0,0 +1,25 @@
+"""
+Latency, token and cost metrics for the example graphs.
+
+The histogram, registry and exporters have no third-party dependencies;
+the callback handler needs langchain-core, which every LangGraph example
+already has:
+
+    llm_metrics.histogram  HDR-style log-linear histogram
+    llm_metrics.registry   labelled histograms and counters
+    llm_metrics.callback   LangChain / LangGraph callback handler
+    llm_metrics.export     Prometheus text format and JSON lines
+"""
+
+from .export import export_from_env, iter_records, to_prometheus, write_jsonl
+from .histogram import Histogram
+from .registry import MetricsRegistry
+
+__all__ = [
+    "Histogram",
+    "MetricsRegistry",
+    "export_from_env",
+    "iter_records",
+    "to_prometheus",
+    "write_jsonl",
+]
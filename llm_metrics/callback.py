@@ -0,0 +1,254 @@
+"""
+LangChain / LangGraph instrumentation callback.
+
+`MetricsCallbackHandler` records, for every LangGraph node:
+
+    langgraph_node_duration_seconds{node}   wall time of the node
+    langgraph_node_queue_seconds{node}      time between the previous superstep
+                                            finishing and the node starting
+    langgraph_node_errors_total{node}
+
+and for every chat model / LLM call:
+
+    llm_call_duration_seconds{model}
+    llm_input_tokens{model}, llm_output_tokens{model}
+    llm_cache_read_tokens{model}            input tokens read from the provider's prompt cache
+    llm_cache_write_tokens{model}           input tokens written to it
+    llm_cost_usd_total{model}               estimated from PRICES_PER_MILLION
+    llm_cache_hits_total{model}             calls answered by the LangChain cache
+    llm_call_errors_total{model}
+
+It only uses LangChain's callback interface, so it works with any graph:
+
+    metrics = MetricsCallbackHandler()
+    graph.invoke(state, config={"callbacks": [metrics]})
+    print(to_prometheus(metrics.registry))
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from .histogram import Histogram
+from .registry import MetricsRegistry
+
+# USD per million (input, output) tokens, matched by longest model-name prefix
+PRICES_PER_MILLION: Dict[str, Tuple[float, float]] = {
+    "claude-haiku-4-5": (1.00, 5.00),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-sonnet-4": (3.00, 15.00),
+    "claude-3-7-sonnet": (3.00, 15.00),
+    "claude-opus-4": (15.00, 75.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+# Prompt-cache reads and writes, relative to the input price (Anthropic's 5-minute cache)
+CACHE_READ_PRICE_FACTOR = 0.1
+CACHE_WRITE_PRICE_FACTOR = 1.25
+
+NODE_TAG_PREFIX = "graph:step:"
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int,
+                  prices: Dict[str, Tuple[float, float]] = PRICES_PER_MILLION,
+                  cache_read_tokens: int = 0, cache_write_tokens: int = 0) -> float:
+    """
+    Estimated USD cost of one call, or 0.0 for models without a price.
+
+    `input_tokens` includes the cache reads and writes, as LangChain reports it.
+    """
+    match = max((prefix for prefix in prices if model.startswith(prefix)), key=len, default=None)
+    if match is None:
+        return 0.0
+    input_price, output_price = prices[match]
+    uncached = max(input_tokens - cache_read_tokens - cache_write_tokens, 0)
+    input_cost = input_price * (uncached + cache_read_tokens * CACHE_READ_PRICE_FACTOR
+                                + cache_write_tokens * CACHE_WRITE_PRICE_FACTOR)
+    return (input_cost + output_tokens * output_price) / 1_000_000
+
+
+def _usage(response: LLMResult) -> Tuple[int, int, int, int, bool]:
+    """(input tokens, output tokens, cache read tokens, cache write tokens, cache hit) for a model response"""
+    try:
+        message = response.generations[0][0].message
+        usage = message.usage_metadata
+    except (IndexError, AttributeError):
+        usage = None
+    if usage:
+        details = usage.get("input_token_details") or {}
+        # LangChain zeroes total_cost on responses replayed from its cache
+        return (usage.get("input_tokens", 0), usage.get("output_tokens", 0), details.get("cache_read") or 0,
+                details.get("cache_creation") or 0, usage.get("total_cost") == 0)
+    token_usage = (response.llm_output or {}).get("token_usage") or (response.llm_output or {}).get("usage") or {}
+    return (
+        token_usage.get("prompt_tokens", token_usage.get("input_tokens", 0)),
+        token_usage.get("completion_tokens", token_usage.get("output_tokens", 0)),
+        0,
+        0,
+        False,
+    )
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Aggregates node and model-call metrics into HDR-style histograms.
+
+    Args:
+        registry: Where to record; a new MetricsRegistry by default.
+        prices: USD per million (input, output) tokens by model-name prefix.
+    """
+
+    # Called on the caller's thread/loop instead of a thread pool under ainvoke
+    run_inline = True
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None,
+                 prices: Dict[str, Tuple[float, float]] = PRICES_PER_MILLION):
+        self.registry = registry or MetricsRegistry()
+        self.prices = prices
+        self._lock = threading.Lock()
+        # Runs are keyed by run_id.int: UUID.__hash__ is a Python-level call and
+        # every chain event looks a run up. Single dict operations are atomic,
+        # so the lock only guards the per-step end times.
+        # node run -> (node, start, graph run, step)
+        self._nodes: Dict[int, Tuple[str, float, int, int]] = {}
+        # model run -> (model, start)
+        self._calls: Dict[int, Tuple[str, float]] = {}
+        # graph run -> (start time, {step: time the last node of that step ended})
+        self._graphs: Dict[int, Tuple[float, Dict[int, float]]] = {}
+        # (metric, node or model) -> histogram, saves building label tuples on every event
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+
+        registry = self.registry
+        registry.describe("langgraph_node_duration_seconds", "Wall time of a LangGraph node", scale=1e-6)
+        registry.describe("langgraph_node_queue_seconds", "Time a node waited after its superstep became ready", scale=1e-6)
+        registry.describe("langgraph_node_errors_total", "Nodes that raised")
+        registry.describe("llm_call_duration_seconds", "Wall time of a model call", scale=1e-6)
+        registry.describe("llm_input_tokens", "Input tokens per model call")
+        registry.describe("llm_output_tokens", "Output tokens per model call")
+        registry.describe("llm_cache_read_tokens", "Input tokens per model call read from the prompt cache")
+        registry.describe("llm_cache_write_tokens", "Input tokens per model call written to the prompt cache")
+        registry.describe("llm_cost_usd_total", "Estimated model cost in USD")
+        registry.describe("llm_cache_hits_total", "Model calls answered from the LangChain cache")
+        registry.describe("llm_call_errors_total", "Model calls that raised")
+
+    # Graph and node runs
+
+    def on_chain_start(self, serialized: Optional[Dict[str, Any]], inputs: Any, *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, tags: Optional[list] = None,
+                       metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        now = time.perf_counter()
+        if parent_run_id is None:
+            self._graphs[run_id.int] = (now, {})
+            return
+        # LangGraph tags the run of each node with graph:step:<n>; inner runnables don't get it
+        if not tags:
+            return
+        for tag in tags:
+            if tag.startswith(NODE_TAG_PREFIX):
+                break
+        else:
+            return
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node") or kwargs.get("name") or "unknown"
+        step = metadata.get("langgraph_step", 0)
+        graph_id = parent_run_id.int
+        graph = self._graphs.get(graph_id)
+        if graph is None:
+            graph = self._graphs.setdefault(graph_id, (now, {}))
+        ready = graph[1].get(step - 1, graph[0])
+        self._nodes[run_id.int] = (node, now, graph_id, step)
+        self._histogram("langgraph_node_queue_seconds", "node", node).record((now - ready) * 1e6)
+
+    def _histogram(self, metric: str, label: str, value: str) -> Histogram:
+        histogram = self._histograms.get((metric, value))
+        if histogram is None:
+            histogram = self._histograms[(metric, value)] = self.registry.histogram(metric, **{label: value})
+        return histogram
+
+    def _end_node(self, run_id: UUID, error: bool) -> None:
+        now = time.perf_counter()
+        key = run_id.int
+        run = self._nodes.pop(key, None)
+        if run is None:
+            # A graph finishing, or one of the runnables inside a node
+            self._graphs.pop(key, None)
+            return
+        node, start, graph_id, step = run
+        graph = self._graphs.get(graph_id)
+        if graph is not None:
+            ends = graph[1]
+            with self._lock:
+                if now > ends.get(step, 0.0):
+                    ends[step] = now
+        self._histogram("langgraph_node_duration_seconds", "node", node).record((now - start) * 1e6)
+        if error:
+            self.registry.inc("langgraph_node_errors_total", node=node)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_node(run_id, error=False)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_node(run_id, error=True)
+
+    # Model calls
+
+    def _start_llm(self, run_id: UUID, serialized: Optional[Dict[str, Any]],
+                   metadata: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = (
+            (metadata or {}).get("ls_model_name")
+            or params.get("model") or params.get("model_name")
+            or (serialized or {}).get("name") or "unknown"
+        )
+        self._calls[run_id.int] = (str(model), time.perf_counter())
+
+    def on_chat_model_start(self, serialized: Optional[Dict[str, Any]], messages: Any, *, run_id: UUID,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._start_llm(run_id, serialized, metadata, kwargs)
+
+    def on_llm_start(self, serialized: Optional[Dict[str, Any]], prompts: Any, *, run_id: UUID,
+                     metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._start_llm(run_id, serialized, metadata, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        now = time.perf_counter()
+        run = self._calls.pop(run_id.int, None)
+        if run is None:
+            return
+        model, start = run
+        input_tokens, output_tokens, cache_read, cache_write, cache_hit = _usage(response)
+        self._histogram("llm_call_duration_seconds", "model", model).record((now - start) * 1e6)
+        self._histogram("llm_input_tokens", "model", model).record(input_tokens)
+        self._histogram("llm_output_tokens", "model", model).record(output_tokens)
+        self._histogram("llm_cache_read_tokens", "model", model).record(cache_read)
+        self._histogram("llm_cache_write_tokens", "model", model).record(cache_write)
+        if cache_hit:
+            self.registry.inc("llm_cache_hits_total", model=model)
+        else:
+            cost = estimate_cost(model, input_tokens, output_tokens, self.prices, cache_read, cache_write)
+            self.registry.inc("llm_cost_usd_total", cost, model=model)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        now = time.perf_counter()
+        run = self._calls.pop(run_id.int, None)
+        if run is None:
+            return
+        model, start = run
+        self._histogram("llm_call_duration_seconds", "model", model).record((now - start) * 1e6)
+        self.registry.inc("llm_call_errors_total", model=model)
+
+
+def metrics_handler_from_env() -> Optional[MetricsCallbackHandler]:
+    """A handler when LLM_METRICS is set (prometheus or jsonl), otherwise None"""
+    if os.environ.get("LLM_METRICS", "off").lower() in ("", "off", "0", "false"):
+        return None
+    return MetricsCallbackHandler()
@@ -0,0 +1,96 @@
+"""
+Exporters: Prometheus text exposition format and JSON lines.
+
+Histograms are written as Prometheus summaries (quantiles, _sum and _count)
+because the HDR buckets are far finer than a scrape needs; counters as
+counters. The JSON-lines form has one object per series.
+"""
+
+import json
+import os
+import sys
+import time
+from typing import IO, Any, Dict, Iterator, Optional, Union
+
+from .registry import Labels, MetricsRegistry
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(labels) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def to_prometheus(registry: MetricsRegistry) -> str:
+    lines = []
+    typed = set()
+
+    def header(name: str, kind: str) -> None:
+        if name in typed:
+            return
+        typed.add(name)
+        if name in registry.help:
+            lines.append(f"# HELP {name} {registry.help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for name, labels, histogram in registry.iter_histograms():
+        header(name, "summary")
+        for q in QUANTILES:
+            lines.append(f"{name}{_format_labels(labels, {'quantile': str(q)})} {histogram.percentile(q * 100):.9g}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram.total * histogram.scale:.9g}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+    for name, labels, value in registry.iter_counters():
+        header(name, "counter")
+        lines.append(f"{name}{_format_labels(labels)} {value:.9g}")
+
+    return "\n".join(lines) + "\n"
+
+
+def iter_records(registry: MetricsRegistry) -> Iterator[Dict[str, Any]]:
+    timestamp = time.time()
+    for name, labels, histogram in registry.iter_histograms():
+        yield {"ts": timestamp, "metric": name, "type": "histogram", "labels": dict(labels), **histogram.summary()}
+    for name, labels, value in registry.iter_counters():
+        yield {"ts": timestamp, "metric": name, "type": "counter", "labels": dict(labels), "value": value}
+
+
+def write_jsonl(registry: MetricsRegistry, target: Union[str, IO[str]]) -> None:
+    """Append one JSON object per series to a file path or an open text file"""
+    if isinstance(target, str):
+        with open(target, "a", encoding="utf-8") as f:
+            write_jsonl(registry, f)
+        return
+    for record in iter_records(registry):
+        target.write(json.dumps(record) + "\n")
+
+
+def export_from_env(registry: MetricsRegistry) -> None:
+    """
+    Write metrics as configured by environment variables; does nothing when they're off.
+
+    LLM_METRICS       off (default), prometheus or jsonl
+    LLM_METRICS_PATH  Output file (prometheus: overwritten, jsonl: appended); stdout if unset
+    """
+    mode = os.environ.get("LLM_METRICS", "off").lower()
+    if mode in ("", "off", "0", "false"):
+        return
+    path = os.environ.get("LLM_METRICS_PATH")
+    if mode == "prometheus":
+        text = to_prometheus(registry)
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            sys.stdout.write(text)
+    elif mode == "jsonl":
+        write_jsonl(registry, path or sys.stdout)
+    else:
+        raise ValueError(f"LLM_METRICS must be off, prometheus or jsonl, got {mode!r}")
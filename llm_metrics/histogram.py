@@ -0,0 +1,116 @@
+"""
+HDR-style histogram.
+
+Values are non-negative integers (microseconds, tokens, ...). Small values
+get exact buckets. Larger values share buckets whose width grows with the
+magnitude, so every bucket keeps the same relative precision: with the
+default 8 sub-bucket bits, a reported value is within 1/128 (< 0.8%) of the
+recorded one. Recording is O(1) and memory grows with the log of the range,
+not with the number of samples.
+"""
+
+import threading
+from typing import Dict, Iterator, Tuple
+
+DEFAULT_SUB_BUCKET_BITS = 8
+
+
+class Histogram:
+    """
+    Log-linear histogram of non-negative integers.
+
+    Args:
+        sub_bucket_bits: Precision; each power-of-two range is split into
+            2**(sub_bucket_bits - 1) buckets.
+        scale: Factor applied to values on export (e.g. 1e-6 for microseconds
+            reported as seconds).
+    """
+
+    def __init__(self, sub_bucket_bits: int = DEFAULT_SUB_BUCKET_BITS, scale: float = 1.0):
+        self.bits = sub_bucket_bits
+        self.sub_count = 1 << sub_bucket_bits
+        self.half = self.sub_count >> 1
+        self.scale = scale
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self._lock = threading.Lock()
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_count:
+            return value
+        shift = value.bit_length() - self.bits
+        return self.sub_count + (shift - 1) * self.half + ((value >> shift) - self.half)
+
+    def _bounds(self, index: int) -> Tuple[int, int]:
+        """Lowest and highest value that map to `index`"""
+        if index < self.sub_count:
+            return index, index
+        shift = (index - self.sub_count) // self.half + 1
+        mantissa = (index - self.sub_count) % self.half + self.half
+        low = mantissa << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, value: int) -> None:
+        value = int(value)
+        if value < 0:
+            value = 0
+        index = value if value < self.sub_count else self._index(value)
+        with self._lock:
+            self.counts[index] = self.counts.get(index, 0) + 1
+            self.count += 1
+            self.total += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    def merge(self, other: "Histogram") -> None:
+        if other.bits != self.bits:
+            raise ValueError("Cannot merge histograms with different precision")
+        with self._lock:
+            for index, n in other.counts.items():
+                self.counts[index] = self.counts.get(index, 0) + n
+            self.count += other.count
+            self.total += other.total
+            if other.min is not None:
+                self.min = other.min if self.min is None else min(self.min, other.min)
+                self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def buckets(self) -> Iterator[Tuple[int, int, int]]:
+        """(low, high, count) for every non-empty bucket, in value order"""
+        with self._lock:
+            items = sorted(self.counts.items())
+        for index, n in items:
+            low, high = self._bounds(index)
+            yield low, high, n
+
+    def percentile(self, pct: float) -> float:
+        """Value at `pct` (0-100), scaled; the bucket's upper bound, capped at the max"""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(pct / 100 * self.count))
+        seen = 0
+        for _, high, n in self.buckets():
+            seen += n
+            if seen >= rank:
+                return min(high, self.max) * self.scale
+        return self.max * self.scale
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count * self.scale if self.count else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.total * self.scale,
+            "min": (self.min or 0) * self.scale,
+            "max": (self.max or 0) * self.scale,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
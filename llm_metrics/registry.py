@@ -0,0 +1,56 @@
+"""
+Named histograms and counters with labels.
+
+Series are keyed by (metric name, sorted label pairs), in the same shape a
+Prometheus exporter expects, so `export.py` can write them out directly.
+"""
+
+import threading
+from typing import Dict, Iterator, Tuple
+
+from .histogram import Histogram
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.help: Dict[str, str] = {}
+        self.scales: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str, scale: float = 1.0) -> None:
+        """Register help text and, for histograms, the export scale of a metric"""
+        self.help[name] = help_text
+        self.scales[name] = scale
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        key = (name, _labels(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, Histogram(scale=self.scales.get(name, 1.0)))
+        return histogram
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + amount
+
+    def iter_histograms(self) -> Iterator[Tuple[str, Labels, Histogram]]:
+        with self._lock:
+            items = list(self.histograms.items())
+        for (name, labels), histogram in sorted(items, key=lambda item: item[0]):
+            yield name, labels, histogram
+
+    def iter_counters(self) -> Iterator[Tuple[str, Labels, float]]:
+        with self._lock:
+            items = list(self.counters.items())
+        for (name, labels), value in sorted(items, key=lambda item: item[0]):
+            yield name, labels, value